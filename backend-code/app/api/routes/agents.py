@@ -1,16 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
-from app.core.database import get_db
-from app.utils.dependencies import get_current_active_user
+from app.core.database import get_db, TransactionRoute
+from app.utils.dependencies import conditional_get, get_current_active_user
 from app.models.user import User as UserModel
 from app.schemas.agent import Agent, AgentCreate, AgentUpdate
 from app.models.agent import agent as agent_crud
 
-router = APIRouter()
+router = APIRouter(route_class=TransactionRoute)
 
 
-@router.get("/", response_model=List[Agent])
+@router.get("/", response_model=List[Agent], dependencies=[Depends(conditional_get("agents"))])
 def get_agents(
     skip: int = 0,
     limit: int = 100,
@@ -1,41 +1,45 @@
 import uuid
+import json
+import asyncio
 import logging
-from typing import List
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 
-from app.core.database import get_db
+from app.core.config import settings as app_settings
+from app.core.database import get_db, TransactionRoute
+from app.core.metrics import span
+from app.core.responses import RowSerializer
 from app.db.assistant import assistant_config
 from app.db.diary import diary
 from app.db.goal import goal
 from app.db.schedule import schedule
 from app.db.entertainment import favorite
+from app.db.user import get_user_timezone
 from app.models.chat import ChatMessage
 from app.models.assistant import AssistantConfig
 from app.schemas.chat import (
     ChatMessage, ChatMessageCreate, ChatMessageResponse, ChatRequest, ChatResponse
 )
 from app.schemas.assistant import (
-    AssistantConfigCreate, AssistantConfigUpdate, AssistantConfigResponse
+    AssistantConfigCreate, AssistantConfigUpdate, AssistantConfigResponse,
+    AssistantConfigListItem, ASSISTANT_CONFIG_FIELDS, ASSISTANT_CONFIG_SUMMARY_FIELDS
 )
+from app.schemas.study_plan import StudyPlanBatchRequest
+from app.services.chat_writer import chat_message_writer
 from app.services.openai_service import openai_service
-from app.utils.dependencies import get_current_active_user
+from app.utils.dependencies import field_selection, get_current_active_user
+from app.utils.timezone import to_local_naive
 from app.models.user import User
 
-# 配置日志记录到文件
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('ai_vendor_debug.log', encoding='utf-8'),
-        logging.StreamHandler()  # 同时输出到控制台
-    ]
-)
-
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=TransactionRoute)
+
+chat_message_rows = RowSerializer(ChatMessageResponse)
+assistant_config_rows = RowSerializer(AssistantConfigListItem)
 
 
 async def get_knowledge_context(db: Session, user_id: int, user_message: str) -> str:
@@ -68,19 +72,21 @@ async def get_knowledge_context(db: Session, user_id: int, user_message: str) ->
         upcoming_schedules = schedule.get_upcoming_by_user(db, user_id=user_id, days=3)  # 减少到3天
         
         if today_schedules or upcoming_schedules:
+            # 日程实例的时间为UTC，按用户时区显示
+            tz = get_user_timezone(db, user_id)
             schedule_context = "日程安排：\n"
             
             if today_schedules:
                 schedule_context += "今日日程：\n"
-                for sched in today_schedules[:3]:  # 只取前3个
-                    schedule_context += f"- {sched.start_time.strftime('%H:%M')}: {sched.title}\n"
-                    if sched.description:
-                        schedule_context += f"  详情: {sched.description[:50]}...\n"  # 减少详情长度
+                for item in today_schedules[:3]:  # 只取前3个
+                    schedule_context += f"- {to_local_naive(item['start_time'], tz).strftime('%H:%M')}: {item['title']}\n"
+                    if item["description"]:
+                        schedule_context += f"  详情: {item['description'][:50]}...\n"  # 减少详情长度
             
             if upcoming_schedules:
                 schedule_context += "未来3天日程：\n"
-                for sched in upcoming_schedules[:3]:  # 只取前3个
-                    schedule_context += f"- {sched.start_time.strftime('%m-%d %H:%M')}: {sched.title}\n"
+                for item in upcoming_schedules[:3]:  # 只取前3个
+                    schedule_context += f"- {to_local_naive(item['start_time'], tz).strftime('%m-%d %H:%M')}: {item['title']}\n"
             
             context_parts.append(schedule_context)
         
@@ -122,10 +128,20 @@ async def get_knowledge_context(db: Session, user_id: int, user_message: str) ->
         return ""
 
 
+def get_ai_service(assistant_cfg: AssistantConfig):
+    """根据助手配置获取AI服务实例（有自定义供应商时使用自定义配置）"""
+    api_config = assistant_cfg.config or {}
+    vendor_url = api_config.get("vendor_url")
+    api_key = api_config.get("api_key")
+    if vendor_url and api_key:
+        return openai_service.__class__(api_key=api_key, base_url=vendor_url)
+    return openai_service
+
+
 @router.get("/debug")
 async def debug_route():
     """调试路由 - 确认AI路由正常工作"""
-    print("🔍 [DEBUG] AI路由被访问!")
+    logger.debug("AI调试路由被访问")
     return {"message": "AI路由工作正常", "status": "ok"}
 
 
@@ -135,43 +151,51 @@ async def chat_with_ai(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """与AI聊天"""
+    """与AI聊天
+
+    数据库连接只在读取上下文和保存用户消息时短暂占用：用户消息在调用供应商前
+    用一个短事务提交，供应商调用期间不持有连接，AI回复交给后写队列批量写入。
+    """
     # 获取助手配置
     assistant_cfg = None
-    if chat_request.assistant_config_id:
-        assistant_cfg = assistant_config.get(db, chat_request.assistant_config_id)
-        if not assistant_cfg or assistant_cfg.user_id != current_user.id:
-            raise HTTPException(status_code=404, detail="Assistant config not found")
-    else:
-        # 使用默认配置
-        assistant_cfg = assistant_config.get_default_by_user(db, user_id=current_user.id)
-        if not assistant_cfg:
-            raise HTTPException(status_code=404, detail="No default assistant config found")
+    with span("config_load"):
+        if chat_request.assistant_config_id:
+            assistant_cfg = assistant_config.get(db, chat_request.assistant_config_id)
+            if not assistant_cfg or assistant_cfg.user_id != current_user.id:
+                raise HTTPException(status_code=404, detail="Assistant config not found")
+        else:
+            # 使用默认配置
+            assistant_cfg = assistant_config.get_default_by_user(db, user_id=current_user.id)
+            if not assistant_cfg:
+                raise HTTPException(status_code=404, detail="No default assistant config found")
+
+    # 提交后ORM对象会过期，后续只使用这里取出的普通值，避免重新占用连接
+    user_id = current_user.id
+    assistant_config_id = assistant_cfg.id
+    api_config = assistant_cfg.config or {}
+    vendor_url = api_config.get("vendor_url")
+    api_key = api_config.get("api_key")
+    completion_params = {
+        "model": assistant_cfg.model,
+        "temperature": float(assistant_cfg.temperature),
+        "max_tokens": assistant_cfg.max_tokens,
+        "top_p": float(assistant_cfg.top_p),
+        "frequency_penalty": float(assistant_cfg.frequency_penalty),
+        "presence_penalty": float(assistant_cfg.presence_penalty),
+    }
+    ai_service = get_ai_service(assistant_cfg)
 
     # 生成或使用现有会话ID
     session_id = chat_request.session_id or str(uuid.uuid4())
 
-    # 保存用户消息 - 使用数据库模型而不是Pydantic Schema
-    from datetime import datetime
     from app.models.chat import ChatMessage as ChatMessageModel
-    
-    user_message = ChatMessageModel(
-        user_id=current_user.id,
-        session_id=session_id,
-        assistant_config_id=assistant_cfg.id,
-        role="user",
-        content=chat_request.message,
-        tokens_used=0,  # 用户消息不消耗tokens
-        model=None,  # 用户消息不需要模型
-        created_at=datetime.utcnow()  # 显式设置创建时间
-    )
-    db.add(user_message)
-    db.flush()  # 确保用户消息获得ID
 
-    # 构建对话历史
-    chat_history = db.query(ChatMessageModel).filter(
-        ChatMessageModel.session_id == session_id
-    ).order_by(ChatMessageModel.created_at).limit(20).all()
+    with span("history_query"):
+        # 取当前会话最近的19条历史（加上本次消息共20条），按时间正序
+        chat_history = db.query(ChatMessageModel).filter(
+            ChatMessageModel.session_id == session_id
+        ).order_by(ChatMessageModel.created_at.desc()).limit(19).all()
+        chat_history.reverse()
 
     messages = []
     
@@ -180,7 +204,8 @@ async def chat_with_ai(
     
     # 检查是否启用知识库并获取相关知识
     if chat_request.use_knowledge_base is not False:  # 默认启用知识库
-        knowledge_context = await get_knowledge_context(db, current_user.id, chat_request.message)
+        with span("knowledge_context"):
+            knowledge_context = await get_knowledge_context(db, user_id, chat_request.message)
         if knowledge_context:
             system_prompt += f"\n\n以下是用户的个人数据，请根据这些信息提供更个性化的回答：\n\n{knowledge_context}"
     
@@ -188,68 +213,60 @@ async def chat_with_ai(
 
     for msg in chat_history:
         messages.append({"role": msg.role, "content": msg.content})
+    messages.append({"role": "user", "content": chat_request.message})
+
+    # 保存用户消息：短事务提交后连接立即归还连接池
+    user_message = ChatMessageModel(
+        user_id=user_id,
+        session_id=session_id,
+        assistant_config_id=assistant_config_id,
+        role="user",
+        content=chat_request.message,
+        tokens_used=0,  # 用户消息不消耗tokens
+        model=None,  # 用户消息不需要模型
+        created_at=datetime.utcnow()  # 显式设置创建时间
+    )
+    with span("commit"):
+        try:
+            db.add(user_message)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
 
     try:
-        # 获取用户配置的API信息
-        api_config = assistant_cfg.config or {}
-        vendor_url = api_config.get("vendor_url")
-        api_key = api_config.get("api_key")
-        
-        # 🔍 详细的服务商配置调试信息
-        print(f"\n🔍 [AI聊天] 服务商配置详情:")
-        print(f"   📋 助手配置ID: {assistant_cfg.id}")
-        print(f"   🤖 配置的模型: {assistant_cfg.model}")
-        print(f"   🔗 供应商URL: {vendor_url}")
-        print(f"   🔑 API密钥状态: {'已设置' if api_key else '未设置'}")
-        print(f"   📝 完整API配置: {api_config}")
-        print(f"   👤 用户ID: {current_user.id}")
-        print(f"   💬 会话ID: {session_id}")
-        
-        logger.info(f"调试信息 - 助手配置ID: {assistant_cfg.id}")
-        logger.info(f"调试信息 - 配置的模型: {assistant_cfg.model}")
-        logger.info(f"调试信息 - API配置: {api_config}")
-        logger.info(f"调试信息 - 供应商URL: {vendor_url}")
-        logger.info(f"调试信息 - API密钥: {'已设置' if api_key else '未设置'}")
-        
-        # 创建使用用户配置的服务实例
-        if vendor_url and api_key:
-            print(f"   ✅ 使用自定义供应商: {vendor_url}")
-            logger.info(f"调试信息 - 使用自定义供应商: {vendor_url}")
-            ai_service = openai_service.__class__(api_key=api_key, base_url=vendor_url)
-        else:
-            # 如果没有配置自定义API，使用默认服务
-            print(f"   ⚠️  使用默认OpenAI服务")
-            logger.info(f"调试信息 - 使用默认OpenAI服务")
-            ai_service = openai_service
-        
-        # 调用AI API
-        response = await ai_service.chat_completion(
-            messages=messages,
-            model=assistant_cfg.model,
-            temperature=float(assistant_cfg.temperature),
-            max_tokens=assistant_cfg.max_tokens,
-            top_p=float(assistant_cfg.top_p),
-            frequency_penalty=float(assistant_cfg.frequency_penalty),
-            presence_penalty=float(assistant_cfg.presence_penalty)
+        logger.info(
+            "AI聊天请求",
+            extra={
+                "user_id": user_id,
+                "session_id": session_id,
+                "assistant_config_id": assistant_config_id,
+                "model": completion_params["model"],
+                "vendor_url": vendor_url,
+                "api_key_set": bool(api_key),
+                "custom_vendor": bool(vendor_url and api_key),
+            }
         )
 
+        # 调用AI API（此时不持有数据库连接）
+        with span("vendor_call"):
+            response = await ai_service.chat_completion(messages=messages, **completion_params)
+
         ai_content = response["choices"][0]["message"]["content"]
         tokens_used = response["usage"]["total_tokens"]
         model_used = response["model"]
 
-        # 保存AI回复 - 使用数据库模型而不是Pydantic Schema
-        ai_message = ChatMessageModel(
-            user_id=current_user.id,
-            session_id=session_id,
-            assistant_config_id=assistant_cfg.id,
-            role="assistant",
-            content=ai_content,
-            tokens_used=tokens_used,
-            model=model_used,
-            created_at=datetime.utcnow()  # 显式设置创建时间
-        )
-        db.add(ai_message)
-        db.commit()
+        # 保存AI回复：放入后写队列，由后台任务批量写入
+        chat_message_writer.enqueue({
+            "user_id": user_id,
+            "session_id": session_id,
+            "assistant_config_id": assistant_config_id,
+            "role": "assistant",
+            "content": ai_content,
+            "tokens_used": tokens_used,
+            "model": model_used,
+            "created_at": datetime.utcnow(),  # 入队时确定时间，保证历史顺序与写入时机无关
+        })
 
         return ChatResponse(
             message=ai_content,
@@ -259,18 +276,14 @@ async def chat_with_ai(
         )
 
     except Exception as e:
-        db.rollback()
-        # 🔍 详细的错误信息输出
-        print(f"\n❌ [AI聊天] 异常详情:")
-        print(f"   🔍 错误类型: {type(e).__name__}")
-        print(f"   📝 错误消息: {str(e)}")
-        print(f"   📊 错误详情: {repr(e)}")
-        print(f"   👤 用户ID: {current_user.id}")
-        print(f"   💬 会话ID: {session_id}")
-        print(f"   🤖 助手配置ID: {assistant_cfg.id}")
-        
-        logger.error(f"AI聊天异常 - 类型: {type(e).__name__}, 消息: {str(e)}")
-        logger.error(f"用户ID: {current_user.id}, 会话ID: {session_id}, 配置ID: {assistant_cfg.id}")
+        logger.error(
+            f"AI聊天异常 - 类型: {type(e).__name__}, 消息: {str(e)}",
+            extra={
+                "user_id": user_id,
+                "session_id": session_id,
+                "assistant_config_id": assistant_config_id,
+            }
+        )
         
         raise HTTPException(status_code=500, detail=f"AI service error: {str(e)}")
 
@@ -288,7 +301,7 @@ async def get_chat_history(
         ChatMessageModel.session_id == session_id,
         ChatMessageModel.user_id == current_user.id
     ).order_by(ChatMessageModel.created_at).all()
-    return messages
+    return chat_message_rows(messages)
 
 
 @router.get("/chat/sessions", response_model=List[str])
@@ -312,46 +325,42 @@ async def test_ai_connection(
     db: Session = Depends(get_db)
 ):
     """测试AI连接"""
+    test_messages = [
+        {"role": "user", "content": "Hello, this is a test message."}
+    ]
+
     if test_config:
         # 使用用户提供的配置进行测试
         vendor_url = test_config.get("vendor_url")
         api_key = test_config.get("api_key")
         model = test_config.get("model", "gpt-3.5-turbo")
         
-        # 🔍 测试连接的详细服务商信息
-        print(f"\n🔍 [测试连接] 用户提供的配置:")
-        print(f"   🔗 供应商URL: {vendor_url}")
-        print(f"   🤖 模型名称: {model}")
-        print(f"   🔑 API密钥状态: {'已设置' if api_key else '未设置'}")
-        print(f"   👤 测试用户ID: {current_user.id}")
-        
-        logger.info(f"测试连接 - 用户提供的配置URL: {vendor_url}")
-        logger.info(f"测试连接 - 用户提供的模型: {model}")
-        logger.info(f"测试连接 - API密钥状态: {'已设置' if api_key else '未设置'}")
+        logger.info(
+            "测试连接 - 使用用户提供的配置",
+            extra={
+                "user_id": current_user.id,
+                "vendor_url": vendor_url,
+                "model": model,
+                "api_key_set": bool(api_key),
+            }
+        )
         
         if not vendor_url or not api_key:
-            print(f"   ❌ 测试失败: 缺少供应商地址或API Key")
             return {
                 "status": "error",
                 "message": "请提供供应商地址和API Key"
             }
         
         # 创建临时服务实例进行测试
-        print(f"   🚀 创建临时服务实例进行测试...")
         temp_service = openai_service.__class__(api_key=api_key, base_url=vendor_url)
         
         try:
-            print(f"   📤 发送测试请求到: {vendor_url}")
-            test_messages = [
-                {"role": "user", "content": "Hello, this is a test message."}
-            ]
             response = await temp_service.chat_completion(
                 messages=test_messages,
                 model=model,
                 max_tokens=10
             )
-            print(f"   ✅ 测试成功! 响应模型: {response.get('model')}")
-            print(f"   📊 Token使用: {response.get('usage')}")
+            logger.debug("测试连接成功", extra={"model": response.get("model"), "usage": response.get("usage")})
             return {
                 "status": "success",
                 "message": "API连接成功",
@@ -359,10 +368,7 @@ async def test_ai_connection(
                 "usage": response.get("usage")
             }
         except Exception as e:
-            print(f"   ❌ 测试失败: {str(e)}")
-            print(f"   🔍 错误类型: {type(e).__name__}")
-            print(f"   📊 错误详情: {repr(e)}")
-            logger.error(f"测试连接失败 - 类型: {type(e).__name__}, 消息: {str(e)}")
+            logger.error(f"测试连接失败 - 类型: {type(e).__name__}, 消息: {str(e)}", extra={"user_id": current_user.id})
             return {
                 "status": "error",
                 "message": f"API连接失败: {str(e)}"
@@ -373,45 +379,31 @@ async def test_ai_connection(
             # 获取用户的默认助手配置
             default_config = assistant_config.get_default_by_user(db, user_id=current_user.id)
             if default_config:
-                # 🔍 默认配置测试的详细服务商信息
-                print(f"\n🔍 [测试连接] 使用默认配置:")
-                print(f"   📋 默认配置ID: {default_config.id}")
-                print(f"   🤖 默认配置模型: {default_config.model}")
-                print(f"   👤 用户ID: {current_user.id}")
-                
-                logger.info(f"测试连接 - 默认配置ID: {default_config.id}")
-                logger.info(f"测试连接 - 默认配置模型: {default_config.model}")
-                
                 # 获取用户配置的API信息
                 api_config = default_config.config or {}
                 vendor_url = api_config.get("vendor_url")
                 api_key = api_config.get("api_key")
                 
-                print(f"   🔗 供应商URL: {vendor_url}")
-                print(f"   🔑 API密钥状态: {'已设置' if api_key else '未设置'}")
-                print(f"   📝 完整API配置: {api_config}")
-                
-                logger.info(f"测试连接 - API配置: {api_config}")
-                logger.info(f"测试连接 - 供应商URL: {vendor_url}")
-                logger.info(f"测试连接 - API密钥: {'已设置' if api_key else '未设置'}")
+                logger.info(
+                    "测试连接 - 使用默认配置",
+                    extra={
+                        "user_id": current_user.id,
+                        "assistant_config_id": default_config.id,
+                        "model": default_config.model,
+                        "vendor_url": vendor_url,
+                        "api_key_set": bool(api_key),
+                    }
+                )
                 
                 if vendor_url and api_key:
                     # 使用用户配置的服务实例
-                    print(f"   ✅ 使用自定义供应商进行测试: {vendor_url}")
-                    logger.info(f"测试连接 - 使用自定义供应商: {vendor_url}")
-                    ai_service = openai_service.__class__(api_key=api_key, base_url=vendor_url)
-                    
-                    print(f"   📤 发送测试请求...")
-                    test_messages = [
-                        {"role": "user", "content": "Hello, this is a test message."}
-                    ]
+                    ai_service = get_ai_service(default_config)
                     response = await ai_service.chat_completion(
                         messages=test_messages,
                         model=default_config.model,
                         max_tokens=10
                     )
-                    print(f"   ✅ 默认配置测试成功! 响应模型: {response.get('model')}")
-                    print(f"   📊 Token使用: {response.get('usage')}")
+                    logger.debug("默认配置测试成功", extra={"model": response.get("model"), "usage": response.get("usage")})
                     return {
                         "status": "success",
                         "message": "API连接成功",
@@ -429,14 +421,7 @@ async def test_ai_connection(
                     "message": "未找到默认配置，请在设置中创建并设为默认配置"
                 }
         except Exception as e:
-            print(f"\n❌ [测试连接] 默认配置异常:")
-            print(f"   🔍 错误类型: {type(e).__name__}")
-            print(f"   📝 错误消息: {str(e)}")
-            print(f"   📊 错误详情: {repr(e)}")
-            print(f"   👤 用户ID: {current_user.id}")
-            
-            logger.error(f"默认配置测试异常 - 类型: {type(e).__name__}, 消息: {str(e)}")
-            logger.error(f"用户ID: {current_user.id}")
+            logger.error(f"默认配置测试异常 - 类型: {type(e).__name__}, 消息: {str(e)}", extra={"user_id": current_user.id})
             
             return {
                 "status": "error",
@@ -473,16 +458,19 @@ async def create_assistant_config(
         raise HTTPException(status_code=400, detail=f"创建配置失败: {str(e)}")
 
 
-@router.get("/configs", response_model=List[AssistantConfigResponse])
+@router.get("/configs", response_model=List[AssistantConfigListItem], response_model_exclude_unset=True)
 async def get_assistant_configs(
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[List[str]] = Depends(
+        field_selection(ASSISTANT_CONFIG_FIELDS, ASSISTANT_CONFIG_SUMMARY_FIELDS)
+    ),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """获取用户的助手配置列表"""
-    configs = assistant_config.get_multi_by_user(db, user_id=current_user.id, skip=skip, limit=limit)
-    return configs
+    """获取用户的助手配置列表，支持 ?view=summary 与 ?fields= 只返回部分字段"""
+    configs = assistant_config.get_multi_by_user(db, user_id=current_user.id, skip=skip, limit=limit, fields=fields)
+    return assistant_config_rows(configs, fields)
 
 
 @router.get("/configs/{config_id}", response_model=AssistantConfigResponse)
@@ -545,61 +533,13 @@ async def set_default_config(
         AssistantConfig.user_id == current_user.id
     ).update({"is_default": False})
     
-    # 设置新的默认配置
+    # 设置新的默认配置（与上面的清除在同一个请求事务中提交）
     config.is_default = True
-    db.commit()
     
     return {"message": "Default config set successfully"}
 
 
-@router.post("/generate-study-plan", response_model=dict)
-async def generate_study_plan(
-    request: dict,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
-):
-    """AI生成学习计划"""
-    try:
-        # 获取用户的默认助手配置
-        assistant_cfg = assistant_config.get_default_by_user(db, user_id=current_user.id)
-        if not assistant_cfg:
-            raise HTTPException(status_code=404, detail="No default assistant config found")
-        
-        # 获取用户配置的API信息
-        api_config = assistant_cfg.config or {}
-        vendor_url = api_config.get("vendor_url")
-        api_key = api_config.get("api_key")
-        
-        # 🔍 学习计划生成的详细调试信息
-        print(f"\n🔍 [学习计划生成] 开始生成学习计划:")
-        print(f"   👤 用户ID: {current_user.id}")
-        print(f"   📋 助手配置ID: {assistant_cfg.id}")
-        print(f"   🤖 配置的模型: {assistant_cfg.model}")
-        print(f"   🔗 供应商URL: {vendor_url}")
-        print(f"   🔑 API密钥状态: {'已设置' if api_key else '未设置'}")
-        
-        logger.info(f"学习计划生成 - 用户ID: {current_user.id}")
-        logger.info(f"学习计划生成 - 助手配置ID: {assistant_cfg.id}")
-        logger.info(f"学习计划生成 - 模型: {assistant_cfg.model}")
-        
-        # 创建使用用户配置的服务实例
-        if vendor_url and api_key:
-            print(f"   ✅ 使用自定义供应商: {vendor_url}")
-            logger.info(f"学习计划生成 - 使用自定义供应商: {vendor_url}")
-            ai_service = openai_service.__class__(api_key=api_key, base_url=vendor_url)
-        else:
-            print(f"   ⚠️  使用默认OpenAI服务")
-            logger.info(f"学习计划生成 - 使用默认OpenAI服务")
-            ai_service = openai_service
-        
-        # 获取用户需求
-        user_requirement = request.get("prompt", "请为我生成一个通用的学习计划，适合初学者入门")
-        
-        # 获取用户知识库上下文，提供个性化信息
-        knowledge_context = await get_knowledge_context(db, current_user.id, user_requirement)
-        
-        # 构建优化的学习计划生成系统提示（更简洁）
-        system_prompt = """学习计划生成助手。根据用户需求生成JSON格式学习计划。
+STUDY_PLAN_SYSTEM_PROMPT = """学习计划生成助手。根据用户需求生成JSON格式学习计划。
 
 格式要求：
 {
@@ -613,27 +553,30 @@ async def generate_study_plan(
 
 要求：3-5个任务，总时长2-6小时，循序渐进。只返回JSON，无其他文字。"""
 
-        # 构建消息，包含知识库上下文
-        messages = [
-            {"role": "system", "content": system_prompt}
-        ]
-        
-        # 如果有知识库上下文，添加到用户消息中
-        if knowledge_context:
-            user_content = f"用户需求：{user_requirement}\n\n用户背景信息：\n{knowledge_context}"
-        else:
-            user_content = f"用户需求：{user_requirement}"
-        
-        messages.append({"role": "user", "content": user_content})
-        
-        print(f"   📤 发送学习计划生成请求...")
-        print(f"   📝 用户需求: {user_requirement}")
-        print(f"   📚 知识库上下文: {'有' if knowledge_context else '无'}")
-        
-        # 调用AI API，优化参数设置
+DEFAULT_STUDY_PLAN_PROMPT = "请为我生成一个通用的学习计划，适合初学者入门"
+
+
+def build_study_plan_messages(user_requirement: str, knowledge_context: str) -> List[dict]:
+    """构建学习计划生成的消息列表"""
+    # 如果有知识库上下文，添加到用户消息中
+    if knowledge_context:
+        user_content = f"用户需求：{user_requirement}\n\n用户背景信息：\n{knowledge_context}"
+    else:
+        user_content = f"用户需求：{user_requirement}"
+
+    return [
+        {"role": "system", "content": STUDY_PLAN_SYSTEM_PROMPT},
+        {"role": "user", "content": user_content}
+    ]
+
+
+async def request_study_plan(ai_service, model: str, messages: List[dict]) -> dict:
+    """调用AI生成学习计划并解析结果"""
+    # 调用AI API，优化参数设置
+    with span("vendor_call"):
         response = await ai_service.chat_completion(
             messages=messages,
-            model=assistant_cfg.model,
+            model=model,
             temperature=0.3,  # 稍微提高温度，加快生成速度
             max_tokens=500,   # 减少max_tokens，因为学习计划不需要太长
             top_p=0.9,
@@ -641,74 +584,174 @@ async def generate_study_plan(
             presence_penalty=0.0,
             timeout=120  # 减少超时时间到2分钟，因为优化后应该更快
         )
+
+    ai_content = response["choices"][0]["message"]["content"].strip()
+    tokens_used = response["usage"]["total_tokens"]
+    model_used = response["model"]
+
+    logger.info("学习计划生成成功", extra={"tokens_used": tokens_used, "model": model_used})
+
+    # 尝试解析JSON，如果失败则返回原始内容
+    try:
+        # 清理可能的markdown格式
+        if ai_content.startswith("```json"):
+            ai_content = ai_content.replace("```json", "").replace("```", "").strip()
+
+        parsed_plan = eval(ai_content)  # 使用eval而不是json.parse，因为AI可能返回单引号
+
+        # 验证必要字段
+        if not isinstance(parsed_plan, dict):
+            raise ValueError("返回的不是字典格式")
+
+        if "title" not in parsed_plan or "priority" not in parsed_plan or "tasks" not in parsed_plan:
+            raise ValueError("缺少必要字段")
+
+        if not isinstance(parsed_plan["tasks"], list):
+            raise ValueError("tasks字段不是列表")
+
+        # 验证每个任务
+        for task in parsed_plan["tasks"]:
+            if not isinstance(task, dict) or "title" not in task or "duration" not in task:
+                raise ValueError("任务格式不正确")
+
+        return {
+            "status": "success",
+            "data": parsed_plan,
+            "tokens_used": tokens_used,
+            "model": model_used
+        }
+
+    except Exception as parse_error:
+        logger.error(f"学习计划生成 - JSON解析失败: {str(parse_error)}")
+
+        # 如果解析失败，返回原始内容让前端处理
+        return {
+            "status": "parse_error",
+            "raw_content": ai_content,
+            "tokens_used": tokens_used,
+            "model": model_used,
+            "error": f"JSON解析失败: {str(parse_error)}"
+        }
+
+
+@router.post("/generate-study-plan", response_model=dict)
+async def generate_study_plan(
+    request: dict,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """AI生成学习计划"""
+    try:
+        # 获取用户的默认助手配置
+        with span("config_load"):
+            assistant_cfg = assistant_config.get_default_by_user(db, user_id=current_user.id)
+        if not assistant_cfg:
+            raise HTTPException(status_code=404, detail="No default assistant config found")
         
-        ai_content = response["choices"][0]["message"]["content"].strip()
-        tokens_used = response["usage"]["total_tokens"]
-        model_used = response["model"]
+        logger.info(
+            "学习计划生成请求",
+            extra={
+                "user_id": current_user.id,
+                "assistant_config_id": assistant_cfg.id,
+                "model": assistant_cfg.model,
+            }
+        )
         
-        print(f"   ✅ AI生成成功!")
-        print(f"   📝 生成内容: {ai_content[:200]}...")
-        print(f"   📊 Token使用: {tokens_used}")
-        print(f"   🤖 使用模型: {model_used}")
+        # 创建使用用户配置的服务实例
+        ai_service = get_ai_service(assistant_cfg)
         
-        logger.info(f"学习计划生成成功 - Token使用: {tokens_used}")
-        logger.info(f"学习计划生成成功 - 模型: {model_used}")
+        # 获取用户需求
+        user_requirement = request.get("prompt", DEFAULT_STUDY_PLAN_PROMPT)
         
-        # 尝试解析JSON，如果失败则返回原始内容
-        try:
-            # 清理可能的markdown格式
-            if ai_content.startswith("```json"):
-                ai_content = ai_content.replace("```json", "").replace("```", "").strip()
-            
-            parsed_plan = eval(ai_content)  # 使用eval而不是json.parse，因为AI可能返回单引号
-            
-            # 验证必要字段
-            if not isinstance(parsed_plan, dict):
-                raise ValueError("返回的不是字典格式")
-            
-            if "title" not in parsed_plan or "priority" not in parsed_plan or "tasks" not in parsed_plan:
-                raise ValueError("缺少必要字段")
-            
-            if not isinstance(parsed_plan["tasks"], list):
-                raise ValueError("tasks字段不是列表")
-            
-            # 验证每个任务
-            for task in parsed_plan["tasks"]:
-                if not isinstance(task, dict) or "title" not in task or "duration" not in task:
-                    raise ValueError("任务格式不正确")
-            
-            print(f"   ✅ JSON解析成功，格式正确")
-            
-            return {
-                "status": "success",
-                "data": parsed_plan,
-                "tokens_used": tokens_used,
-                "model": model_used
-            }
-            
-        except Exception as parse_error:
-            print(f"   ⚠️  JSON解析失败: {str(parse_error)}")
-            print(f"   📝 原始内容: {ai_content}")
-            logger.error(f"学习计划生成 - JSON解析失败: {str(parse_error)}")
-            
-            # 如果解析失败，返回原始内容让前端处理
-            return {
-                "status": "parse_error",
-                "raw_content": ai_content,
-                "tokens_used": tokens_used,
-                "model": model_used,
-                "error": f"JSON解析失败: {str(parse_error)}"
-            }
+        # 获取用户知识库上下文，提供个性化信息
+        with span("knowledge_context"):
+            knowledge_context = await get_knowledge_context(db, current_user.id, user_requirement)
         
-    except Exception as e:
-        # 🔍 详细的错误信息输出
-        print(f"\n❌ [学习计划生成] 异常详情:")
-        print(f"   🔍 错误类型: {type(e).__name__}")
-        print(f"   📝 错误消息: {str(e)}")
-        print(f"   📊 错误详情: {repr(e)}")
-        print(f"   👤 用户ID: {current_user.id}")
+        # 构建消息，包含知识库上下文
+        messages = build_study_plan_messages(user_requirement, knowledge_context)
         
-        logger.error(f"学习计划生成异常 - 类型: {type(e).__name__}, 消息: {str(e)}")
-        logger.error(f"用户ID: {current_user.id}")
+        logger.debug(
+            "发送学习计划生成请求",
+            extra={"user_requirement": user_requirement, "has_knowledge_context": bool(knowledge_context)}
+        )
+        
+        return await request_study_plan(ai_service, assistant_cfg.model, messages)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(
+            f"学习计划生成异常 - 类型: {type(e).__name__}, 消息: {str(e)}",
+            extra={"user_id": current_user.id}
+        )
         
-        raise HTTPException(status_code=500, detail=f"学习计划生成失败: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"学习计划生成失败: {str(e)}")
+
+
+@router.post("/generate-study-plan/batch")
+async def generate_study_plans_batch(
+    batch_request: StudyPlanBatchRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """批量生成学习计划
+
+    用户上下文只构建一次，供应商调用在并发上限内同时发出，
+    每个计划完成后立即以NDJSON行的形式推送给客户端。
+    """
+    prompts = batch_request.prompts or [DEFAULT_STUDY_PLAN_PROMPT]
+    if len(prompts) > app_settings.STUDY_PLAN_BATCH_MAX_PROMPTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"一次最多生成 {app_settings.STUDY_PLAN_BATCH_MAX_PROMPTS} 个学习计划"
+        )
+
+    with span("config_load"):
+        assistant_cfg = assistant_config.get_default_by_user(db, user_id=current_user.id)
+    if not assistant_cfg:
+        raise HTTPException(status_code=404, detail="No default assistant config found")
+
+    # 所有数据库读取在开始推送之前完成，之后的生成过程不再访问数据库
+    ai_service = get_ai_service(assistant_cfg)
+    model = assistant_cfg.model
+    with span("knowledge_context"):
+        knowledge_context = await get_knowledge_context(db, current_user.id, "")
+    user_id = current_user.id
+    # 流式生成期间不再访问数据库，提前归还连接
+    db.close()
+
+    logger.info("批量学习计划生成请求", extra={"user_id": user_id, "count": len(prompts)})
+
+    concurrency = max(1, batch_request.concurrency or app_settings.STUDY_PLAN_BATCH_CONCURRENCY)
+    semaphore = asyncio.Semaphore(min(concurrency, app_settings.STUDY_PLAN_BATCH_CONCURRENCY))
+
+    async def generate_one(index: int, prompt: str) -> dict:
+        async with semaphore:
+            try:
+                messages = build_study_plan_messages(prompt, knowledge_context)
+                result = await request_study_plan(ai_service, model, messages)
+            except Exception as e:
+                logger.error(
+                    f"批量学习计划生成异常 - 类型: {type(e).__name__}, 消息: {str(e)}",
+                    extra={"user_id": user_id, "index": index}
+                )
+                result = {"status": "error", "error": f"学习计划生成失败: {str(e)}"}
+        return {"index": index, "prompt": prompt, **result}
+
+    async def stream_plans():
+        tasks = [asyncio.create_task(generate_one(i, p)) for i, p in enumerate(prompts)]
+        succeeded = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                if item["status"] == "success":
+                    succeeded += 1
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+        finally:
+            # 客户端断开时取消尚未完成的供应商调用
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        yield json.dumps({"done": True, "total": len(prompts), "succeeded": succeeded}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream_plans(), media_type="application/x-ndjson")
@@ -3,14 +3,14 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
+from app.core.database import get_db, TransactionRoute
 from app.core.security import create_access_token
 from app.core.config import settings
 from app.db.user import authenticate_user, create_user, user_exists
 from app.schemas.auth import Token, LoginRequest
 from app.schemas.user import UserCreate, UserResponse
 
-router = APIRouter()
+router = APIRouter(route_class=TransactionRoute)
 
 
 @router.post("/register", response_model=dict, status_code=status.HTTP_201_CREATED)
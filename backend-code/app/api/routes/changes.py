@@ -0,0 +1,28 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db, TransactionRoute
+from app.services.change_feed import SSE_HEADERS, event_stream
+from app.utils.dependencies import get_current_active_user
+from app.models.user import User
+
+router = APIRouter(route_class=TransactionRoute)
+
+
+@router.get("/stream")
+async def stream_changes(
+    types: Optional[List[str]] = Query(None, description="只接收这些类型的事件（change、reminder），默认全部"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """以Server-Sent Events推送当前用户的数据变更和日程提醒
+
+    change事件形如 {"type": "change", "changes": [{"resource": "diaries", "action": "updated", "ids": [1]}]}，
+    客户端只需重新获取发生变化的资源；收到resync事件或重新连接后应全量刷新。
+    """
+    user_id = current_user.id
+    # 长连接期间不再访问数据库，提前归还连接
+    db.close()
+    return StreamingResponse(event_stream(user_id, types), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -1,20 +1,51 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi.responses import RedirectResponse, StreamingResponse
 from sqlalchemy.orm import Session
 import json
-import os
-from datetime import datetime, timezone
+import logging
+from datetime import date, datetime, timedelta, timezone
 from dateutil import parser
 
-from app.core.database import get_db
-from app.db.diary import diary as diary_crud
+from app.core.database import get_db, TransactionRoute
+from app.core.responses import RowSerializer
+from app.db.diary import diary as diary_crud, tag as tag_crud
 from app.models.diary import Diary
-from app.schemas.diary import Diary, DiaryCreate, DiaryUpdate, DiaryResponse
-from app.utils.dependencies import get_current_active_user
+from app.schemas.diary import Diary, DiaryCreate, DiaryUpdate, DiaryResponse, DiaryDayCount, DiaryListItem, TagCount, load_tags
+from app.services.storage import attachment_disposition, export_storage
+from app.utils.dependencies import conditional_get, field_selection, get_current_active_user
 from app.models.user import User
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+router = APIRouter(route_class=TransactionRoute)
+
+# 写入存储时的分块大小 (64KB)
+EXPORT_CHUNK_SIZE = 64 * 1024
+# 日历统计单次最多查询的天数
+CALENDAR_MAX_DAYS = 366
+# 列表接口可选的字段，摘要视图用excerpt代替正文
+DIARY_FIELDS = (
+    "id", "user_id", "title", "content", "excerpt", "mood", "tags", "is_private",
+    "created_at", "updated_at", "local_date",
+)
+DIARY_SUMMARY_FIELDS = ("id", "title", "excerpt", "mood", "tags", "is_private", "created_at", "updated_at", "local_date")
+
+diary_rows = RowSerializer(DiaryListItem)
+
+
+async def encode_json_chunks(data, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """增量编码JSON，按块产出UTF-8字节，不在内存中拼接完整文档"""
+    buffer = []
+    buffered = 0
+    for piece in json.JSONEncoder(ensure_ascii=False, indent=2).iterencode(data):
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= chunk_size:
+            yield "".join(buffer).encode("utf-8")
+            buffer, buffered = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
 
 
 @router.post("/", response_model=DiaryResponse)
@@ -27,22 +58,65 @@ async def create_diary(
     return diary_crud.create_with_user(db=db, obj_in=diary, user_id=current_user.id)
 
 
-@router.get("/", response_model=List[DiaryResponse])
+@router.get(
+    "/", response_model=List[DiaryListItem], response_model_exclude_unset=True,
+    dependencies=[Depends(conditional_get("diaries"))]
+)
 async def read_diaries(
     skip: int = 0,
     limit: int = 20,
     keyword: Optional[str] = Query(None, description="搜索关键词"),
+    start_date: Optional[date] = Query(None, description="开始日期（含，用户时区）"),
+    end_date: Optional[date] = Query(None, description="结束日期（不含，用户时区）"),
+    tag: Optional[List[str]] = Query(None, description="按标签筛选，可重复，需同时带有全部标签"),
+    fields: Optional[List[str]] = Depends(field_selection(DIARY_FIELDS, DIARY_SUMMARY_FIELDS)),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """获取日记列表"""
+    """获取日记列表，可按用户时区的本地日期范围过滤
+
+    ?view=summary 只返回摘要字段（excerpt代替正文），?fields= 指定返回的字段，未选的列不会被查询。
+    """
     if keyword:
-        return diary_crud.search_by_keyword(
-            db, user_id=current_user.id, keyword=keyword, skip=skip, limit=limit
+        diaries = diary_crud.search_by_keyword(
+            db, user_id=current_user.id, keyword=keyword, skip=skip, limit=limit,
+            start_date=start_date, end_date=end_date, tags=tag, fields=fields
+        )
+    else:
+        diaries = diary_crud.get_multi_by_user(
+            db, user_id=current_user.id, skip=skip, limit=limit,
+            start_date=start_date, end_date=end_date, tags=tag, fields=fields
+        )
+    return diary_rows(diaries, fields)
+
+
+@router.get("/tags", response_model=List[TagCount], dependencies=[Depends(conditional_get("diaries"))])
+async def read_diary_tags(
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """获取用户的标签及每个标签的日记数（标签云），按日记数降序"""
+    counts = tag_crud.counts_by_user(db, user_id=current_user.id, limit=limit)
+    return [TagCount(name=name, count=count) for name, count in counts]
+
+
+@router.get("/calendar", response_model=List[DiaryDayCount])
+async def read_diary_calendar(
+    start_date: date = Query(..., description="开始日期（含，用户时区）"),
+    end_date: date = Query(..., description="结束日期（不含，用户时区）"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """获取日期范围内每天的日记数（日历视图）"""
+    if end_date <= start_date or end_date - start_date > timedelta(days=CALENDAR_MAX_DAYS):
+        raise HTTPException(
+            status_code=400, detail=f"end_date must be after start_date and within {CALENDAR_MAX_DAYS} days"
         )
-    return diary_crud.get_multi_by_user(
-        db, user_id=current_user.id, skip=skip, limit=limit
+    counts = diary_crud.count_by_local_date(
+        db, user_id=current_user.id, start_date=start_date, end_date=end_date
     )
+    return [DiaryDayCount(day=day, count=count) for day, count in counts]
 
 
 @router.get("/export")
@@ -74,7 +148,7 @@ async def export_diaries(
                 "title": diary.title,
                 "content": diary.content,
                 "mood": diary.mood,
-                "tags": diary.tags if diary.tags else [],
+                "tags": load_tags(diary.tags) or [],
                 "is_private": diary.is_private,
                 "created_at": diary.created_at.isoformat() if diary.created_at else None,
                 "updated_at": diary.updated_at.isoformat() if diary.updated_at else None,
@@ -82,34 +156,39 @@ async def export_diaries(
             }
             export_data["diaries"].append(diary_data)
         
-        # 创建导出目录
-        export_dir = "exports"
-        if not os.path.exists(export_dir):
-            os.makedirs(export_dir)
-        
         # 生成文件名
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"diaries_export_{current_user.username}_{timestamp}.json"
-        filepath = os.path.join(export_dir, filename)
+        key = f"{current_user.id}/{filename}"
         
-        # 写入文件
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(export_data, f, ensure_ascii=False, indent=2)
+        # 流式写入存储（本地磁盘或对象存储），所有副本都能读取
+        await export_storage.put_stream(key, encode_json_chunks(export_data), "application/json")
         
-        print(f"📄 [日记导出] 用户 {current_user.username} 导出了 {len(diaries)} 篇日记")
-        print(f"   📁 导出文件: {filepath}")
+        logger.info("日记导出完成", extra={"user_id": current_user.id, "count": len(diaries), "key": key})
         
-        return FileResponse(
-            filepath,
+        # 对象存储返回预签名URL，由客户端直接下载；本地存储由应用分块返回
+        download_url = export_storage.url(key, download_name=filename)
+        if download_url:
+            return RedirectResponse(download_url, status_code=307)
+        return StreamingResponse(
+            export_storage.iter_bytes(key),
             media_type="application/json",
-            filename=filename
+            headers={"Content-Disposition": attachment_disposition(filename)}
         )
         
     except Exception as e:
-        print(f"❌ [日记导出] 导出失败: {str(e)}")
+        logger.error(f"日记导出失败: {str(e)}", extra={"user_id": current_user.id})
         raise HTTPException(status_code=500, detail=f"导出失败: {str(e)}")
 
 
+def _parse_utc(value: str) -> datetime:
+    """解析ISO时间字符串，没有时区信息时视为UTC"""
+    parsed = parser.isoparse(value)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
 @router.post("/import")
 async def import_diaries(
     file: UploadFile = File(...),
@@ -139,38 +218,24 @@ async def import_diaries(
             raise HTTPException(status_code=400, detail="diaries字段必须是数组")
         
         # 统计信息
-        imported_count = 0
         skipped_count = 0
         error_count = 0
         
-        print(f"📄 [日记导入] 用户 {current_user.username} 开始导入日记")
-        print(f"   📊 导入文件: {file.filename}")
-        print(f"   📝 日记数量: {len(diaries_to_import)}")
+        logger.info(
+            "开始导入日记",
+            extra={"user_id": current_user.id, "import_filename": file.filename, "count": len(diaries_to_import)}
+        )
         
-        # 逐个导入日记
+        # 逐个校验，之后在一个事务中批量写入（重复条目由CRUD层跳过）
+        items = []
         for diary_data in diaries_to_import:
             try:
                 # 验证必需字段
                 if not diary_data.get("title") or not diary_data.get("content"):
-                    print(f"   ⚠️ 跳过日记：缺少标题或内容")
+                    logger.debug("跳过日记：缺少标题或内容")
                     skipped_count += 1
                     continue
                 
-                # 检查重复 - 基于标题和内容
-                existing_diaries = diary_crud.get_multi_by_user(db, user_id=current_user.id, skip=0, limit=10000)
-                is_duplicate = False
-                
-                for existing in existing_diaries:
-                    if (existing.title == diary_data["title"] and
-                        existing.content == diary_data["content"]):
-                        print(f"   ⏭️ 跳过重复日记：{diary_data['title'][:30]}...")
-                        skipped_count += 1
-                        is_duplicate = True
-                        break
-                
-                if is_duplicate:
-                    continue
-                
                 # 创建日记对象
                 diary_create = DiaryCreate(
                     title=diary_data["title"],
@@ -179,52 +244,35 @@ async def import_diaries(
                     tags=diary_data.get("tags", []),
                     is_private=diary_data.get("is_private", False)
                 )
-                
-                # 保存到数据库
-                new_diary = diary_crud.create_with_user(db=db, obj_in=diary_create, user_id=current_user.id)
-                
-                # 如果导入数据包含时间信息，更新创建时间
-                if diary_data.get("created_at"):
-                    try:
-                        # 解析时间字符串，自动处理时区
-                        created_time = parser.isoparse(diary_data["created_at"])
-                        # 确保时间以UTC格式存储
-                        if created_time.tzinfo is None:
-                            # 如果没有时区信息，假设为UTC
-                            created_time = created_time.replace(tzinfo=timezone.utc)
-                        else:
-                            # 转换为UTC
-                            created_time = created_time.astimezone(timezone.utc)
-                        
-                        # 更新数据库中的时间
-                        new_diary.created_at = created_time
-                        if diary_data.get("updated_at"):
-                            updated_time = parser.isoparse(diary_data["updated_at"])
-                            if updated_time.tzinfo is None:
-                                updated_time = updated_time.replace(tzinfo=timezone.utc)
-                            else:
-                                updated_time = updated_time.astimezone(timezone.utc)
-                            new_diary.updated_at = updated_time
-                        
-                        db.commit()
-                        print(f"   ✅ 成功导入日记（含时间）：{diary_data['title'][:30]}...")
-                    except Exception as time_error:
-                        print(f"   ⚠️ 时间解析失败，使用当前时间：{str(time_error)}")
-                        print(f"   ✅ 成功导入日记：{diary_data['title'][:30]}...")
-                else:
-                    print(f"   ✅ 成功导入日记：{diary_data['title'][:30]}...")
-                
-                imported_count += 1
-                
             except Exception as e:
-                print(f"   ❌ 导入日记失败: {str(e)}")
+                logger.warning(f"导入日记失败: {str(e)}")
                 error_count += 1
                 continue
+
+            # 如果导入数据包含时间信息，沿用原来的创建和更新时间（统一转换为UTC）
+            created_time = updated_time = None
+            if diary_data.get("created_at"):
+                try:
+                    created_time = _parse_utc(diary_data["created_at"])
+                    if diary_data.get("updated_at"):
+                        updated_time = _parse_utc(diary_data["updated_at"])
+                except Exception as time_error:
+                    logger.warning(f"时间解析失败，使用当前时间：{str(time_error)}")
+                    created_time = updated_time = None
+            items.append((diary_create, created_time, updated_time))
+
+        imported_count, duplicate_count = diary_crud.import_with_user(db, items=items, user_id=current_user.id)
+        skipped_count += duplicate_count
         
-        print(f"✅ [日记导入] 导入完成:")
-        print(f"   ✅ 成功导入: {imported_count} 篇")
-        print(f"   ⚠️ 跳过: {skipped_count} 篇")
-        print(f"   ❌ 失败: {error_count} 篇")
+        logger.info(
+            "日记导入完成",
+            extra={
+                "user_id": current_user.id,
+                "imported_count": imported_count,
+                "skipped_count": skipped_count,
+                "error_count": error_count,
+            }
+        )
         
         return {
             "message": "日记导入完成",
@@ -237,7 +285,7 @@ async def import_diaries(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ [日记导入] 导入失败: {str(e)}")
+        logger.error(f"日记导入失败: {str(e)}", extra={"user_id": current_user.id})
         raise HTTPException(status_code=500, detail=f"导入失败: {str(e)}")
 
 
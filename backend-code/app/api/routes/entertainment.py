@@ -1,62 +1,158 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Query
+import io
+from typing import List, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
-from app.utils.dependencies import get_current_active_user
+from app.core.database import get_db, TransactionRoute
+from app.db.entertainment import (
+    ENTERTAINMENT_TYPES, FAVORITE_STATUSES, entertainment as entertainment_crud, entertainment_neighbor,
+    favorite as favorite_crud,
+)
+from app.schemas.entertainment import (
+    CatalogueImportResult, EntertainmentPage, FavoriteListItem, RecommendedEntertainment,
+)
+from app.services.catalogue_import import CATALOGUE_FORMATS, detect_format, ingest_catalogue, iter_records
+from app.utils.dependencies import get_current_active_user, get_current_superuser
+from app.utils.pagination import decode_cursor, encode_cursor
 from app.models.user import User
 
-router = APIRouter()
+router = APIRouter(route_class=TransactionRoute)
 
 
-@router.get("/movies")
+def browse_catalogue(
+    db: Session, entertainment_type: str, search: Optional[str], cursor: Optional[str], limit: int
+) -> EntertainmentPage:
+    """按评分浏览或按关键词搜索某一类型的目录，keyset分页"""
+    search = search.strip() if search else None
+    try:
+        after = decode_cursor(cursor, 3 if search else 2) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的cursor")
+    if search:
+        items, next_after = entertainment_crud.search_by_keyword(
+            db, keyword=search, entertainment_type=entertainment_type, after=after, limit=limit
+        )
+    else:
+        items, next_after = entertainment_crud.get_multi_by_type(
+            db, entertainment_type=entertainment_type, after=after, limit=limit
+        )
+    return EntertainmentPage(items=items, next_cursor=encode_cursor(next_after) if next_after else None)
+
+
+@router.get("/movies", response_model=EntertainmentPage)
 async def get_movies(
-    page: int = Query(1, ge=1),
-    search: str = Query(None),
-    current_user: User = Depends(get_current_active_user)
+    search: Optional[str] = Query(None, description="搜索关键词（标题、类型、简介）"),
+    cursor: Optional[str] = Query(None, description="上一页返回的next_cursor"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
-    """获取电影推荐"""
-    # TODO: 实现电影推荐功能
-    return {"message": "Movies endpoint - to be implemented"}
+    """浏览电影目录（按评分排序），或按关键词搜索（按相关度、评分排序）"""
+    return browse_catalogue(db, "movie", search, cursor, limit)
 
 
-@router.get("/books")
+@router.get("/books", response_model=EntertainmentPage)
 async def get_books(
-    page: int = Query(1, ge=1),
-    search: str = Query(None),
-    current_user: User = Depends(get_current_active_user)
+    search: Optional[str] = Query(None, description="搜索关键词（标题、类型、简介）"),
+    cursor: Optional[str] = Query(None, description="上一页返回的next_cursor"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
-    """获取书籍推荐"""
-    # TODO: 实现书籍推荐功能
-    return {"message": "Books endpoint - to be implemented"}
+    """浏览书籍目录（按评分排序），或按关键词搜索（按相关度、评分排序）"""
+    return browse_catalogue(db, "book", search, cursor, limit)
 
 
-@router.get("/games")
+@router.get("/games", response_model=EntertainmentPage)
 async def get_games(
-    page: int = Query(1, ge=1),
-    search: str = Query(None),
-    current_user: User = Depends(get_current_active_user)
+    search: Optional[str] = Query(None, description="搜索关键词（标题、类型、简介）"),
+    cursor: Optional[str] = Query(None, description="上一页返回的next_cursor"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
-    """获取游戏推荐"""
-    # TODO: 实现游戏推荐功能
-    return {"message": "Games endpoint - to be implemented"}
+    """浏览游戏目录（按评分排序），或按关键词搜索（按相关度、评分排序）"""
+    return browse_catalogue(db, "game", search, cursor, limit)
 
 
-@router.get("/music")
+@router.get("/music", response_model=EntertainmentPage)
 async def get_music(
-    page: int = Query(1, ge=1),
-    search: str = Query(None),
-    current_user: User = Depends(get_current_active_user)
+    search: Optional[str] = Query(None, description="搜索关键词（标题、类型、简介）"),
+    cursor: Optional[str] = Query(None, description="上一页返回的next_cursor"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """浏览音乐目录（按评分排序），或按关键词搜索（按相关度、评分排序）"""
+    return browse_catalogue(db, "music", search, cursor, limit)
+
+
+@router.get("/recommendations", response_model=List[RecommendedEntertainment])
+async def get_recommendations(
+    type: Optional[str] = Query(None, description="只推荐该类型（movie, book, game, music）"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
-    """获取音乐推荐"""
-    # TODO: 实现音乐推荐功能
-    return {"message": "Music endpoint - to be implemented"}
+    """根据收藏推荐条目：合并收藏条目的相似条目（离线计算，见 build_recommendations.py）
+
+    还没有收藏或相似度尚未计算时，指定了类型则按评分推荐该类型的条目。
+    """
+    if type is not None and type not in ENTERTAINMENT_TYPES:
+        raise HTTPException(status_code=400, detail=f"type必须是 {', '.join(ENTERTAINMENT_TYPES)} 之一")
+    recommended = entertainment_neighbor.recommend_for_user(
+        db, user_id=current_user.id, entertainment_type=type, limit=limit
+    )
+    if recommended:
+        return [
+            RecommendedEntertainment.model_validate(item).model_copy(update={"score": score})
+            for item, score in recommended
+        ]
+    if type is None:
+        return []
+    items, _ = entertainment_crud.get_multi_by_type(db, entertainment_type=type, limit=limit)
+    return items
+
+
+@router.post("/catalogue/import", response_model=CatalogueImportResult)
+def import_catalogue(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv 或 ndjson，默认按文件扩展名判断"),
+    source: Optional[str] = Query(None, description="记录中没有source时使用的数据来源"),
+    current_user: User = Depends(get_current_superuser),
+    db: Session = Depends(get_db)
+):
+    """导入目录文件（仅超级用户），按 (source, external_id) upsert，在一个事务中写入
+
+    同步处理函数在线程池中执行，逐行解析上传的文件，不阻塞事件循环。大型目录建议使用 import_catalogue.py 命令行导入。
+    """
+    fmt = format or detect_format(file.filename)
+    if fmt not in CATALOGUE_FORMATS:
+        raise HTTPException(status_code=400, detail="只支持CSV或NDJSON格式文件")
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        result = ingest_catalogue(db, iter_records(stream, fmt), default_source=source)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="文件必须是UTF-8编码")
+    finally:
+        stream.detach()
+    return result.to_dict()
 
 
-@router.get("/favorites")
+@router.get("/favorites", response_model=List[FavoriteListItem])
 async def get_favorites(
-    current_user: User = Depends(get_current_active_user)
+    status: Optional[str] = Query(None, description="按状态筛选（want, watching, finished）"),
+    type: Optional[str] = Query(None, description="按条目类型筛选（movie, book, game, music）"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
-    """获取收藏列表"""
-    # TODO: 实现收藏功能
-    return {"message": "Favorites endpoint - to be implemented"}
\ No newline at end of file
+    """获取收藏列表（按收藏时间倒序），每条收藏内嵌条目摘要，一次查询取得"""
+    if status is not None and status not in FAVORITE_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status必须是 {', '.join(FAVORITE_STATUSES)} 之一")
+    if type is not None and type not in ENTERTAINMENT_TYPES:
+        raise HTTPException(status_code=400, detail=f"type必须是 {', '.join(ENTERTAINMENT_TYPES)} 之一")
+    return favorite_crud.get_multi_by_user(
+        db, user_id=current_user.id, skip=skip, limit=limit, status=status, entertainment_type=type
+    )
@@ -1,19 +1,215 @@
-from fastapi import APIRouter, Depends
+from datetime import date, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db, TransactionRoute
+from app.core.responses import RowSerializer
+from app.db.goal import goal as goal_crud, goal_log as goal_log_crud
+from app.db.user import get_user_timezone
+from app.models.goal import Goal
+from app.schemas.common import BULK_MAX_ITEMS, BulkIdsRequest, BulkResult
+from app.schemas.goal import (
+    GoalCreate, GoalUpdate, GoalBulkUpdateItem, GoalResponse, GoalLogCreate, GoalLogResponse,
+    GoalProgress, GoalRollup
+)
 from app.utils.dependencies import get_current_active_user
+from app.utils.timezone import local_today
 from app.models.user import User
 
-router = APIRouter()
+router = APIRouter(route_class=TransactionRoute)
+
+goal_rows = RowSerializer(GoalResponse)
+goal_log_rows = RowSerializer(GoalLogResponse)
+
+
+def get_user_goal(db: Session, goal_id: int, user_id: int) -> Goal:
+    """获取属于当前用户的目标，不存在时返回404"""
+    goal_obj = goal_crud.get(db, goal_id)
+    if not goal_obj or goal_obj.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    return goal_obj
+
+
+def build_goal_progress(db: Session, goal_obj: Goal) -> GoalProgress:
+    """由目标上的聚合字段构造进度信息，不扫描打卡记录"""
+    current_value = goal_obj.current_value or 0
+    log_count = goal_obj.log_count or 0
+    log_sum = goal_obj.log_sum or 0
+
+    # 昨天和今天（用户时区）都没有打卡时，连续天数已中断
+    today = local_today(get_user_timezone(db, goal_obj.user_id))
+    current_streak = goal_obj.current_streak or 0
+    if not goal_obj.last_log_date or goal_obj.last_log_date < today - timedelta(days=1):
+        current_streak = 0
+
+    return GoalProgress(
+        goal_id=goal_obj.id,
+        target_value=goal_obj.target_value,
+        current_value=current_value,
+        unit=goal_obj.unit,
+        progress_percent=round(current_value / goal_obj.target_value * 100, 1) if goal_obj.target_value else None,
+        is_completed=bool(goal_obj.is_completed),
+        log_count=log_count,
+        log_sum=log_sum,
+        average_value=round(log_sum / log_count, 2) if log_count else None,
+        last_value=goal_obj.last_value,
+        last_logged_at=goal_obj.last_logged_at,
+        current_streak=current_streak,
+        longest_streak=goal_obj.longest_streak or 0,
+    )
 
 
-@router.get("/")
-async def get_goals(current_user: User = Depends(get_current_active_user)):
+@router.get("/", response_model=List[GoalResponse])
+async def read_goals(
+    skip: int = 0,
+    limit: int = 20,
+    active_only: bool = Query(False, description="只返回进行中的目标"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
     """获取目标列表"""
-    # TODO: 实现目标管理功能
-    return {"message": "Goals endpoint - to be implemented"}
+    if active_only:
+        return goal_rows(goal_crud.get_active_by_user(db, user_id=current_user.id)[skip:skip + limit])
+    return goal_rows(goal_crud.get_multi_by_user(db, user_id=current_user.id, skip=skip, limit=limit))
 
 
-@router.post("/")
-async def create_goal(current_user: User = Depends(get_current_active_user)):
+@router.post("/", response_model=GoalResponse)
+async def create_goal(
+    goal_in: GoalCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
     """创建新目标"""
-    # TODO: 实现目标创建功能
-    return {"message": "Create goal endpoint - to be implemented"}
\ No newline at end of file
+    return goal_crud.create_with_user(db=db, obj_in=goal_in, user_id=current_user.id)
+
+
+@router.post("/bulk", response_model=List[GoalResponse])
+async def create_goals_bulk(
+    goals_in: List[GoalCreate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """批量创建目标（一条批量INSERT，一次提交）"""
+    return goal_crud.create_multi_with_user(db=db, objs_in=goals_in, user_id=current_user.id)
+
+
+@router.put("/bulk", response_model=List[GoalResponse])
+async def update_goals_bulk(
+    goals_in: List[GoalBulkUpdateItem] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """批量更新目标，每项需包含id（按主键批量UPDATE，一次提交）"""
+    rows = [item.dict(exclude_unset=True) for item in goals_in]
+    goals = goal_crud.update_multi_with_user(db=db, rows=rows, user_id=current_user.id)
+    if goals is None:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    return goals
+
+
+@router.post("/bulk/complete", response_model=BulkResult)
+async def complete_goals_bulk(
+    request: BulkIdsRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """批量标记目标为已完成"""
+    count = goal_crud.update_by_ids(
+        db=db, user_id=current_user.id, ids=request.ids, values={"is_completed": True}
+    )
+    return BulkResult(count=count)
+
+
+@router.get("/{goal_id}", response_model=GoalResponse)
+async def read_goal(
+    goal_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """获取单个目标"""
+    return get_user_goal(db, goal_id, current_user.id)
+
+
+@router.put("/{goal_id}", response_model=GoalResponse)
+async def update_goal(
+    goal_id: int,
+    goal_in: GoalUpdate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """更新目标"""
+    goal_obj = get_user_goal(db, goal_id, current_user.id)
+    return goal_crud.update_with_user(db=db, db_obj=goal_obj, obj_in=goal_in)
+
+
+@router.delete("/{goal_id}")
+async def delete_goal(
+    goal_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """删除目标（连同打卡记录和汇总）"""
+    get_user_goal(db, goal_id, current_user.id)
+    goal_crud.remove(db=db, id=goal_id)
+    return {"message": "Goal deleted successfully"}
+
+
+@router.post("/{goal_id}/logs", response_model=GoalLogResponse)
+async def create_goal_log(
+    goal_id: int,
+    log_in: GoalLogCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """记录目标打卡，同时增量更新进度、汇总和连续天数"""
+    get_user_goal(db, goal_id, current_user.id)
+    return goal_log_crud.create_with_goal(db=db, obj_in=log_in, goal_id=goal_id)
+
+
+@router.get("/{goal_id}/logs", response_model=List[GoalLogResponse])
+async def read_goal_logs(
+    goal_id: int,
+    skip: int = 0,
+    limit: int = 20,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """获取目标的打卡记录"""
+    get_user_goal(db, goal_id, current_user.id)
+    return goal_log_rows(goal_log_crud.get_multi_by_goal(db, goal_id=goal_id, skip=skip, limit=limit))
+
+
+@router.get("/{goal_id}/progress", response_model=GoalProgress)
+async def read_goal_progress(
+    goal_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """获取目标进度与打卡统计"""
+    return build_goal_progress(db, get_user_goal(db, goal_id, current_user.id))
+
+
+@router.get("/{goal_id}/trend", response_model=List[GoalRollup])
+async def read_goal_trend(
+    goal_id: int,
+    period: str = Query("day", pattern="^(day|week)$", description="汇总周期：day 或 week"),
+    start: Optional[date] = Query(None, description="开始日期"),
+    end: Optional[date] = Query(None, description="结束日期"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """获取目标按天/按周的打卡汇总，用于趋势图"""
+    get_user_goal(db, goal_id, current_user.id)
+    return goal_log_crud.get_rollups(db, goal_id=goal_id, period=period, start=start, end=end)
+
+
+@router.post("/{goal_id}/rebuild-aggregates", response_model=GoalProgress)
+async def rebuild_goal_aggregates(
+    goal_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """从打卡记录重建目标的聚合统计"""
+    get_user_goal(db, goal_id, current_user.id)
+    return build_goal_progress(db, goal_log_crud.rebuild_aggregates(db, goal_id=goal_id))
@@ -1,19 +1,285 @@
-from fastapi import APIRouter, Depends
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db, TransactionRoute
+from app.core.responses import RowSerializer
+from app.db.schedule import schedule as schedule_crud, schedule_exception as schedule_exception_crud
+from app.models.schedule import Schedule
+from app.schemas.common import BULK_MAX_ITEMS, BulkIdsRequest, BulkResult
+from app.schemas.schedule import (
+    ScheduleCreate, ScheduleUpdate, ScheduleBulkUpdateItem, ScheduleResponse,
+    ScheduleSyncRequest, ScheduleSyncResponse, ScheduleOccurrence,
+    ScheduleExceptionCreate, ScheduleExceptionResponse
+)
+from app.services.recurrence import MAX_EXPANSION_DAYS, is_occurrence
+from app.services.change_feed import SSE_HEADERS, event_stream
+from app.utils.timezone import get_zone
 from app.utils.dependencies import get_current_active_user
 from app.models.user import User
 
-router = APIRouter()
+router = APIRouter(route_class=TransactionRoute)
+
+schedule_rows = RowSerializer(ScheduleResponse)
+
 
+def get_user_schedule(db: Session, schedule_id: int, user_id: int) -> Schedule:
+    """获取属于当前用户的日程，不存在时返回404"""
+    schedule_obj = schedule_crud.get(db, schedule_id)
+    if not schedule_obj or schedule_obj.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return schedule_obj
 
-@router.get("/")
-async def get_schedule(current_user: User = Depends(get_current_active_user)):
-    """获取日程列表"""
-    # TODO: 实现日程管理功能
-    return {"message": "Schedule endpoint - to be implemented"}
 
+@router.get("/", response_model=List[ScheduleResponse])
+async def read_schedules(
+    start: Optional[datetime] = Query(None, description="开始时间（含）"),
+    end: Optional[datetime] = Query(None, description="结束时间（不含）"),
+    include_completed: bool = Query(True, description="是否包含已完成的日程"),
+    skip: int = 0,
+    limit: int = Query(100, le=500),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """获取日程列表；指定start和end时返回该时间范围内开始的日程（按开始时间升序）"""
+    if start or end:
+        if not (start and end) or end <= start:
+            raise HTTPException(status_code=400, detail="start and end must both be set and end > start")
+        return schedule_rows(schedule_crud.get_by_range(
+            db, user_id=current_user.id, start=start, end=end,
+            include_completed=include_completed, skip=skip, limit=limit
+        ))
+    return schedule_rows(schedule_crud.get_multi_by_user(db, user_id=current_user.id, skip=skip, limit=limit))
 
-@router.post("/")
-async def create_schedule(current_user: User = Depends(get_current_active_user)):
+
+@router.post("/", response_model=ScheduleResponse)
+async def create_schedule(
+    schedule_in: ScheduleCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
     """创建新日程"""
-    # TODO: 实现日程创建功能
-    return {"message": "Create schedule endpoint - to be implemented"}
\ No newline at end of file
+    return schedule_crud.create_with_user(db=db, obj_in=schedule_in, user_id=current_user.id)
+
+
+@router.get("/occurrences", response_model=List[ScheduleOccurrence])
+async def read_schedule_occurrences(
+    start: datetime = Query(..., description="开始时间（含）"),
+    end: datetime = Query(..., description="结束时间（不含）"),
+    include_completed: bool = Query(True, description="是否包含已完成的实例"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """获取时间范围内的日程实例，重复日程只展开该范围内的部分"""
+    if end <= start or end - start > timedelta(days=MAX_EXPANSION_DAYS):
+        raise HTTPException(
+            status_code=400, detail=f"end must be after start and within {MAX_EXPANSION_DAYS} days"
+        )
+    return schedule_crud.get_occurrences(
+        db, user_id=current_user.id, start=start, end=end, include_completed=include_completed
+    )
+
+
+@router.get("/calendar", response_model=List[ScheduleOccurrence])
+async def read_schedule_calendar(
+    start_date: date = Query(..., description="开始日期（含，用户时区）"),
+    end_date: date = Query(..., description="结束日期（不含，用户时区）"),
+    include_completed: bool = Query(True, description="是否包含已完成的实例"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """按用户时区的本地日期获取日程实例（日历视图）"""
+    if end_date <= start_date or end_date - start_date > timedelta(days=MAX_EXPANSION_DAYS):
+        raise HTTPException(
+            status_code=400, detail=f"end_date must be after start_date and within {MAX_EXPANSION_DAYS} days"
+        )
+    return schedule_crud.get_occurrences_by_date(
+        db, user_id=current_user.id, start_date=start_date, end_date=end_date,
+        include_completed=include_completed
+    )
+
+
+@router.get("/today", response_model=List[ScheduleOccurrence])
+async def read_today_schedules(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """获取今日日程（按用户时区，含重复日程的实例）"""
+    return schedule_crud.get_today_by_user(db, user_id=current_user.id)
+
+
+@router.get("/week", response_model=List[ScheduleOccurrence])
+async def read_week_schedules(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """获取本周（周一至周日，按用户时区）的日程"""
+    return schedule_crud.get_week_by_user(db, user_id=current_user.id)
+
+
+@router.get("/upcoming", response_model=List[ScheduleOccurrence])
+async def read_upcoming_schedules(
+    days: int = Query(7, ge=1, le=90),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """获取未来N天未完成的日程（含重复日程的实例）"""
+    return schedule_crud.get_upcoming_by_user(db, user_id=current_user.id, days=days)
+
+
+@router.get("/reminders/stream")
+async def stream_reminders(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """以Server-Sent Events推送当前用户的日程提醒（需在REMINDER_CHANNELS中启用sse）"""
+    user_id = current_user.id
+    # 长连接期间不再访问数据库，提前归还连接
+    db.close()
+    return StreamingResponse(event_stream(user_id, ("reminder",)), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.post("/bulk", response_model=List[ScheduleResponse])
+async def create_schedules_bulk(
+    schedules_in: List[ScheduleCreate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """批量创建日程（一条批量INSERT，一次提交）"""
+    return schedule_crud.create_multi_with_user(db=db, objs_in=schedules_in, user_id=current_user.id)
+
+
+@router.put("/bulk", response_model=List[ScheduleResponse])
+async def update_schedules_bulk(
+    schedules_in: List[ScheduleBulkUpdateItem] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """批量更新日程，每项需包含id（按主键批量UPDATE，一次提交）"""
+    rows = [item.dict(exclude_unset=True) for item in schedules_in]
+    schedules = schedule_crud.update_multi_with_user(db=db, rows=rows, user_id=current_user.id)
+    if schedules is None:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return schedules
+
+
+@router.post("/bulk/complete", response_model=BulkResult)
+async def complete_schedules_bulk(
+    request: BulkIdsRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """批量标记日程为已完成"""
+    count = schedule_crud.update_by_ids(
+        db=db, user_id=current_user.id, ids=request.ids, values={"is_completed": True}
+    )
+    return BulkResult(count=count)
+
+
+@router.post("/bulk/delete", response_model=BulkResult)
+async def delete_schedules_bulk(
+    request: BulkIdsRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """批量删除日程"""
+    count = schedule_crud.remove_by_ids(db=db, user_id=current_user.id, ids=request.ids)
+    return BulkResult(count=count)
+
+
+@router.post("/sync", response_model=ScheduleSyncResponse)
+async def sync_schedules(
+    request: ScheduleSyncRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """同步一批日程变更（新建、修改、删除），在同一事务中一次提交"""
+    result = schedule_crud.sync_by_user(
+        db=db,
+        user_id=current_user.id,
+        create=request.create,
+        update=[item.dict(exclude_unset=True) for item in request.update],
+        delete=request.delete
+    )
+    if result is None:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return result
+
+
+@router.get("/{schedule_id}", response_model=ScheduleResponse)
+async def read_schedule(
+    schedule_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """获取单个日程"""
+    return get_user_schedule(db, schedule_id, current_user.id)
+
+
+@router.put("/{schedule_id}", response_model=ScheduleResponse)
+async def update_schedule(
+    schedule_id: int,
+    schedule_in: ScheduleUpdate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """更新日程"""
+    schedule_obj = get_user_schedule(db, schedule_id, current_user.id)
+    return schedule_crud.update_with_user(db=db, db_obj=schedule_obj, obj_in=schedule_in)
+
+
+@router.delete("/{schedule_id}")
+async def delete_schedule(
+    schedule_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """删除日程"""
+    get_user_schedule(db, schedule_id, current_user.id)
+    schedule_crud.remove(db=db, id=schedule_id)
+    return {"message": "Schedule deleted successfully"}
+
+
+@router.get("/{schedule_id}/exceptions", response_model=List[ScheduleExceptionResponse])
+async def read_schedule_exceptions(
+    schedule_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """获取重复日程的单次修改和取消"""
+    get_user_schedule(db, schedule_id, current_user.id)
+    return schedule_exception_crud.get_multi_by_schedule(db, schedule_id=schedule_id)
+
+
+@router.put("/{schedule_id}/exceptions", response_model=ScheduleExceptionResponse)
+async def upsert_schedule_exception(
+    schedule_id: int,
+    exception_in: ScheduleExceptionCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """修改或取消重复日程中的某一次（以original_start标识），已存在时覆盖"""
+    schedule_obj = get_user_schedule(db, schedule_id, current_user.id)
+    if not schedule_obj.rrule:
+        raise HTTPException(status_code=400, detail="Schedule is not recurring")
+    if not is_occurrence(schedule_obj, exception_in.original_start, get_zone(current_user.timezone)):
+        raise HTTPException(status_code=400, detail="original_start is not an occurrence of this schedule")
+    return schedule_exception_crud.upsert_with_schedule(db=db, obj_in=exception_in, schedule_obj=schedule_obj)
+
+
+@router.delete("/{schedule_id}/exceptions/{exception_id}")
+async def delete_schedule_exception(
+    schedule_id: int,
+    exception_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """撤销单次修改，该实例恢复为重复规则的默认值"""
+    schedule_obj = get_user_schedule(db, schedule_id, current_user.id)
+    exception_obj = schedule_exception_crud.get(db, exception_id)
+    if not exception_obj or exception_obj.schedule_id != schedule_id:
+        raise HTTPException(status_code=404, detail="Schedule exception not found")
+    schedule_exception_crud.remove_with_schedule(db=db, id=exception_id, schedule_obj=schedule_obj)
+    return {"message": "Schedule exception deleted successfully"}
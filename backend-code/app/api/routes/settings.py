@@ -1,16 +1,20 @@
-from typing import List
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
+from app.core.database import get_db, TransactionRoute
+from app.core.responses import RowSerializer
 from app.db.assistant import assistant_config
 from app.schemas.assistant import (
-    AssistantConfig, AssistantConfigCreate, AssistantConfigUpdate, AssistantConfigResponse
+    AssistantConfig, AssistantConfigCreate, AssistantConfigUpdate, AssistantConfigResponse,
+    AssistantConfigListItem, ASSISTANT_CONFIG_FIELDS, ASSISTANT_CONFIG_SUMMARY_FIELDS
 )
-from app.utils.dependencies import get_current_active_user
+from app.utils.dependencies import conditional_get, field_selection, get_current_active_user
 from app.models.user import User
 
-router = APIRouter()
+router = APIRouter(route_class=TransactionRoute)
+
+assistant_config_rows = RowSerializer(AssistantConfigListItem)
 
 
 @router.post("/assistants", response_model=AssistantConfigResponse)
@@ -23,17 +27,24 @@ async def create_assistant_config(
     return assistant_config.create_with_user(db=db, obj_in=config, user_id=current_user.id)
 
 
-@router.get("/assistants", response_model=List[AssistantConfigResponse])
+@router.get(
+    "/assistants", response_model=List[AssistantConfigListItem], response_model_exclude_unset=True,
+    dependencies=[Depends(conditional_get("assistant_configs"))]
+)
 async def read_assistant_configs(
     skip: int = 0,
     limit: int = 20,
+    fields: Optional[List[str]] = Depends(
+        field_selection(ASSISTANT_CONFIG_FIELDS, ASSISTANT_CONFIG_SUMMARY_FIELDS)
+    ),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """获取AI助手配置列表"""
-    return assistant_config.get_multi_by_user(
-        db, user_id=current_user.id, skip=skip, limit=limit
+    """获取AI助手配置列表，支持 ?view=summary 与 ?fields= 只返回部分字段"""
+    configs = assistant_config.get_multi_by_user(
+        db, user_id=current_user.id, skip=skip, limit=limit, fields=fields
     )
+    return assistant_config_rows(configs, fields)
 
 
 @router.get("/assistants/default", response_model=AssistantConfigResponse)
@@ -111,8 +122,7 @@ async def set_default_assistant_config(
         assistant_config.model.user_id == current_user.id
     ).update({"is_default": False})
     
-    # 设置新的默认配置
+    # 设置新的默认配置（与上面的清除在同一个请求事务中提交）
     config.is_default = True
-    db.commit()
     
     return {"message": "Default config set successfully"}
\ No newline at end of file
@@ -1,23 +1,36 @@
 import os
-import uuid
-from datetime import datetime
+import hashlib
+import logging
+import tempfile
+import anyio
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from fastapi.responses import JSONResponse
+from PIL import UnidentifiedImageError
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
-from app.core.database import get_db
+from app.core.database import get_db, TransactionRoute
 from app.core.config import settings
 from app.models.user import User
 from app.utils.dependencies import get_current_user
 from app.schemas.user import UserResponse
+from app.core.static import IMMUTABLE_CACHE_CONTROL
+from app.services.image_service import AVATAR_THUMBNAIL_SIZES, image_service, thumbnail_path
+from app.services.storage import upload_storage
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+router = APIRouter(route_class=TransactionRoute)
 
 # 允许的图片文件类型
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
-# 最大文件大小 (5MB)
-MAX_FILE_SIZE = 5 * 1024 * 1024
+# 流式写入的分块大小 (64KB)
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# multipart表单中文件以外部分（边界、字段头）的上限，请求体上限为 MAX_FILE_SIZE 加上这部分
+MULTIPART_OVERHEAD = 64 * 1024
+# 头像在存储中的目录，通过 /uploads/<key> 访问
+AVATAR_PREFIX = "avatars"
+UPLOADS_URL_PREFIX = "/uploads/"
 
 def validate_image_file(file: UploadFile) -> bool:
     """验证图片文件"""
@@ -39,12 +52,61 @@ def validate_image_file(file: UploadFile) -> bool:
     
     return True
 
-def generate_unique_filename(original_filename: str) -> str:
-    """生成唯一的文件名"""
+def content_hashed_filename(digest: str, original_filename: str) -> str:
+    """根据文件内容哈希生成文件名，内容相同的文件名相同，可被客户端永久缓存"""
     file_ext = os.path.splitext(original_filename)[1].lower()
-    unique_id = str(uuid.uuid4())
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return f"avatar_{timestamp}_{unique_id}{file_ext}"
+    return f"avatar_{digest[:32]}{file_ext}"
+
+def upload_url(key: str) -> str:
+    """存储key对应的访问URL"""
+    return f"{UPLOADS_URL_PREFIX}{key}"
+
+def upload_key(url: Optional[str]) -> Optional[str]:
+    """访问URL对应的存储key，不是本服务上传的文件时返回None"""
+    if not url or not url.startswith(UPLOADS_URL_PREFIX):
+        return None
+    return url[len(UPLOADS_URL_PREFIX):]
+
+def avatar_keys(key: str) -> List[str]:
+    """头像原图及全部缩略图的key"""
+    return [key, *(thumbnail_path(key, size) for size in AVATAR_THUMBNAIL_SIZES)]
+
+async def save_upload_file(file: UploadFile, file_path: str, max_size: int) -> Tuple[int, str]:
+    """分块异步写入上传文件并计算sha256，超过大小限制时中止并删除已写入部分
+
+    请求体在读取阶段已由RequestSizeLimitMiddleware限制（见main.py），这里按文件本身的大小再检查一次。
+    返回 (文件大小, sha256十六进制摘要)
+    """
+    size = 0
+    digest = hashlib.sha256()
+    try:
+        async with await anyio.open_file(file_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                digest.update(chunk)
+                if size > max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"文件过大。请上传小于 {max_size // (1024 * 1024)}MB 的图片"
+                    )
+                await buffer.write(chunk)
+    except BaseException:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    return size, digest.hexdigest()
+
+async def avatar_thumbnail_urls(avatar_url: Optional[str]) -> Dict[str, str]:
+    """头像已生成的缩略图URL {尺寸: URL}"""
+    key = upload_key(avatar_url)
+    if not key:
+        return {}
+    urls = {}
+    for size in AVATAR_THUMBNAIL_SIZES:
+        thumbnail_key = thumbnail_path(key, size)
+        if await upload_storage.exists(thumbnail_key):
+            urls[str(size)] = upload_url(thumbnail_key)
+    return urls
 
 @router.post("/avatar", response_model=dict)
 async def upload_avatar(
@@ -54,63 +116,54 @@ async def upload_avatar(
 ):
     """上传用户头像"""
     try:
-        print(f"🔍 [头像上传] 开始处理头像上传: {file.filename}")
-        print(f"   📊 文件大小: {file.size if hasattr(file, 'size') else '未知'}")
-        print(f"   📄 MIME类型: {file.content_type}")
-        print(f"   👤 用户ID: {current_user.id}")
+        logger.info(
+            "开始处理头像上传",
+            extra={"user_id": current_user.id, "upload_filename": file.filename, "content_type": file.content_type}
+        )
         
         # 验证文件
         if not validate_image_file(file):
-            print(f"   ❌ 文件验证失败: {file.filename}")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="不支持的文件格式。请上传 JPG、PNG、GIF 或 WebP 格式的图片"
             )
         
-        # 检查文件大小
-        file_content = await file.read()
-        file_size = len(file_content)
-        
-        if file_size > MAX_FILE_SIZE:
-            print(f"   ❌ 文件过大: {file_size} bytes")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="文件过大。请上传小于 5MB 的图片"
-            )
-        
-        # 重置文件指针
-        await file.seek(0)
-        
-        # 创建上传目录
-        upload_dir = "uploads/avatars"
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # 生成唯一文件名
-        unique_filename = generate_unique_filename(file.filename)
-        file_path = os.path.join(upload_dir, unique_filename)
-        
-        # 确保使用正斜杠路径分隔符（Web标准）
-        web_path = file_path.replace("\\", "/")
-        
-        print(f"   💾 保存路径: {file_path}")
-        print(f"   🌐 Web路径: {web_path}")
-        
-        # 保存文件
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_content)
-        
-        # 生成访问URL（使用正斜杠）
-        avatar_url = f"/{web_path}"
+        file_ext = os.path.splitext(file.filename)[1].lower()
+        with tempfile.TemporaryDirectory(prefix="avatar_") as temp_dir:
+            # 先写入本地临时文件，边写边计算内容哈希
+            temp_path = os.path.join(temp_dir, f"upload{file_ext}")
+            file_size, digest = await save_upload_file(file, temp_path, settings.MAX_FILE_SIZE)
+            
+            # 按内容哈希命名；相同内容的头像已存在时直接复用（原图最后写入，存在即说明缩略图齐全）
+            unique_filename = content_hashed_filename(digest, file.filename)
+            key = f"{AVATAR_PREFIX}/{unique_filename}"
+            if not await upload_storage.exists(key):
+                # 在线程池中生成WebP缩略图，同时校验文件确实是可解析的图片
+                try:
+                    thumbnails = await image_service.create_thumbnails(temp_path)
+                except (UnidentifiedImageError, OSError, ValueError):
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="无法识别的图片文件，请重新选择"
+                    )
+                for size, path in thumbnails.items():
+                    await upload_storage.put_file(
+                        thumbnail_path(key, size), path, "image/webp", IMMUTABLE_CACHE_CONTROL
+                    )
+                await upload_storage.put_file(key, temp_path, file.content_type, IMMUTABLE_CACHE_CONTROL)
+        
+        avatar_url = upload_url(key)
+        thumbnail_urls = {str(size): upload_url(thumbnail_path(key, size)) for size in AVATAR_THUMBNAIL_SIZES}
         
         # 更新用户头像URL
         current_user.avatar_url = avatar_url
-        db.commit()
-        db.refresh(current_user)
+        db.flush()
         
-        print(f"   ✅ 头像上传成功: {avatar_url}")
+        logger.info("头像上传成功", extra={"user_id": current_user.id, "avatar_url": avatar_url, "size": file_size})
         
         return {
             "url": avatar_url,
+            "thumbnails": thumbnail_urls,
             "message": "头像上传成功",
             "filename": unique_filename
         }
@@ -118,7 +171,7 @@ async def upload_avatar(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"   ❌ 头像上传失败: {str(e)}")
+        logger.error(f"头像上传失败: {str(e)}", extra={"user_id": current_user.id})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"头像上传失败: {str(e)}"
@@ -131,25 +184,25 @@ async def delete_avatar(
 ):
     """删除用户头像"""
     try:
-        print(f"🔍 [头像删除] 开始删除用户头像: {current_user.id}")
-        
         if not current_user.avatar_url:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="用户没有设置头像"
             )
         
-        # 删除文件
-        file_path = current_user.avatar_url.lstrip("/")
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            print(f"   🗑️ 已删除文件: {file_path}")
+        # 文件按内容命名，可能被多个用户共用，只有没有其他用户引用时才删除原图和缩略图
+        shared = db.query(User.id).filter(
+            User.avatar_url == current_user.avatar_url, User.id != current_user.id
+        ).first()
+        key = upload_key(current_user.avatar_url)
+        if key and not shared:
+            await upload_storage.delete(*avatar_keys(key))
         
         # 更新数据库
         current_user.avatar_url = None
-        db.commit()
+        db.flush()
         
-        print(f"   ✅ 头像删除成功")
+        logger.info("头像删除成功", extra={"user_id": current_user.id})
         
         return {
             "message": "头像删除成功"
@@ -158,7 +211,7 @@ async def delete_avatar(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"   ❌ 头像删除失败: {str(e)}")
+        logger.error(f"头像删除失败: {str(e)}", extra={"user_id": current_user.id})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"头像删除失败: {str(e)}"
@@ -173,13 +226,14 @@ async def get_avatar_info(
         avatar_info = {
             "has_avatar": bool(current_user.avatar_url),
             "avatar_url": current_user.avatar_url,
+            "thumbnails": await avatar_thumbnail_urls(current_user.avatar_url),
             "upload_date": current_user.updated_at.isoformat() if current_user.updated_at else None
         }
         
         return avatar_info
         
     except Exception as e:
-        print(f"   ❌ 获取头像信息失败: {str(e)}")
+        logger.error(f"获取头像信息失败: {str(e)}", extra={"user_id": current_user.id})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"获取头像信息失败: {str(e)}"
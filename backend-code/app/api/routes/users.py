@@ -2,16 +2,16 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
+from app.core.database import get_db, TransactionRoute
 from app.models.user import User
 from app.db.user import get_user, get_users, update_user, delete_user
 from app.schemas.user import UserResponse, UserUpdate
-from app.utils.dependencies import get_current_active_user, get_current_superuser
+from app.utils.dependencies import conditional_get, get_current_active_user, get_current_superuser
 
-router = APIRouter()
+router = APIRouter(route_class=TransactionRoute)
 
 
-@router.get("/me", response_model=UserResponse)
+@router.get("/me", response_model=UserResponse, dependencies=[Depends(conditional_get("users"))])
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
     """获取当前用户信息"""
     return current_user
@@ -16,6 +16,8 @@ class Settings(BaseSettings):
 
     # Redis配置
     REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_SOCKET_TIMEOUT: float = 1.0  # 同步客户端读写超时（秒），Redis不可用时请求不会长时间阻塞
+    REDIS_CONNECT_TIMEOUT: float = 0.5  # 同步客户端建立连接的超时（秒）
 
     # JWT配置
     SECRET_KEY: str = "your-secret-key-here"
@@ -29,9 +31,51 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: Optional[str] = None
     OPENAI_BASE_URL: str = "https://api.openai.com/v1"
 
+    # 批量学习计划生成配置
+    STUDY_PLAN_BATCH_CONCURRENCY: int = 4  # 同时进行的供应商调用上限
+    STUDY_PLAN_BATCH_MAX_PROMPTS: int = 10  # 单次批量请求的最大计划数
+
+    # 批量写入配置
+    BULK_BATCH_SIZE: int = 1000  # bulk_create/bulk_update/bulk_delete 每条语句处理的行数
+
+    # 聊天消息后写队列配置
+    CHAT_WRITE_BATCH_SIZE: int = 50  # 攒够多少条消息立即批量写入
+    CHAT_WRITE_FLUSH_INTERVAL: float = 0.5  # 最长等待多少秒后写入
+    CHAT_WRITE_MAX_BACKOFF: float = 30  # 写入失败后重试间隔的上限（秒）
+    CHAT_WRITE_SPOOL_DIR: Optional[str] = "chat_spool"  # 关闭时仍无法写入的消息（每个进程一个文件）和死信文件的目录
+
+    # 日程提醒调度配置
+    REMINDER_ENABLED: bool = True
+    REMINDER_CHANNELS: str = "log"  # 投递渠道，逗号分隔：log, webhook, sse
+    REMINDER_WEBHOOK_URL: Optional[str] = None
+    REMINDER_WEBHOOK_SECRET: Optional[str] = None  # 设置后对请求体做HMAC-SHA256签名
+    REMINDER_LOOKAHEAD_SECONDS: int = 300  # 每次加载未来多少秒内的提醒
+    REMINDER_REFILL_INTERVAL: float = 60  # 重新加载提醒窗口的间隔（秒）
+    REMINDER_CATCHUP_SECONDS: int = 3600  # 重启或故障后补发多久以内错过的提醒
+    REMINDER_MAX_RETRIES: int = 5
+    REMINDER_LOCK_KEY: int = 7238001  # PostgreSQL advisory lock的键，多副本中只有持有者投递提醒
+
+    # 数据变更推送配置（GET /api/changes/stream）
+    CHANGE_FEED_ENABLED: bool = True  # 事务提交后向用户推送数据变更事件
+    CHANGE_FEED_BACKEND: str = "redis"  # redis（经Redis pub/sub在多个worker间分发）或 local（仅单进程）
+
     # 文件上传配置
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    IMAGE_WORKERS: int = 2  # 生成缩略图的线程数
+    UPLOADS_PRECOMPRESSED: bool = False  # 存在 .br/.gz 预压缩文件时优先返回
+    EXPORT_DIR: str = "exports"
+    EXPORT_TTL_SECONDS: int = 24 * 3600  # 导出文件的保留时间（秒），由cleanup_uploads.py删除过期文件，0为不清理
+
+    # 文件存储后端：local（本地磁盘）或 s3（S3兼容对象存储，多副本部署时使用）
+    STORAGE_BACKEND: str = "local"
+    S3_BUCKET: Optional[str] = None
+    S3_ENDPOINT_URL: Optional[str] = None  # MinIO等S3兼容服务的地址，AWS S3留空
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+    S3_REGION: Optional[str] = None
+    S3_PUBLIC_BASE_URL: Optional[str] = None  # 公开读的桶或CDN地址，设置后头像直接使用该地址
+    S3_PRESIGN_EXPIRES: int = 3600  # 预签名URL有效期（秒）
 
     # 分页配置
     DEFAULT_PAGE_SIZE: int = 20
@@ -39,9 +83,20 @@ class Settings(BaseSettings):
 
     # 缓存配置
     CACHE_EXPIRE_TIME: int = 300  # 5分钟
+    SCHEDULE_OCCURRENCE_CACHE_WEEKS: int = 0  # 在Redis中物化每个用户未来N周的日程实例，0为不缓存
+    ENTERTAINMENT_SEARCH_CACHE_TTL: int = 60  # 娱乐目录搜索结果在Redis中的缓存时间（秒），0为不缓存
+
+    # 推荐配置
+    RECOMMENDATION_NEIGHBORS: int = 50  # 离线计算时每个条目保存的相似条目数（top-K）
 
     # 日志配置
     LOG_LEVEL: str = "INFO"
+    LOG_FILE: Optional[str] = None  # 设置后日志同时写入该文件（由后台线程写入）
+    LOG_DEBUG_SAMPLE_RATE: float = 0.1  # DEBUG级别日志的采样比例
+
+    # 监控配置
+    METRICS_ENABLED: bool = True  # 是否开启/metrics端点和请求耗时统计
+    METRICS_TOKEN: Optional[str] = None  # 设置后访问/metrics需携带 Authorization: Bearer <token>，未设置时只允许本机访问
 
     class Config:
         env_file = ".env"
@@ -1,7 +1,12 @@
-from sqlalchemy import create_engine
+import asyncio
+from typing import Callable, List
+
+from fastapi import Request, Response
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
+from app.core.responses import FastRoute
 
 # 创建数据库引擎
 engine = create_engine(settings.DATABASE_URL)
@@ -12,11 +17,91 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # 创建基础模型类
 Base = declarative_base()
 
+_AFTER_COMMIT_KEY = "after_commit"
+_IN_REQUEST_KEY = "in_request_commit"
+_BEFORE_RESPONSE_KEY = "before_response"
+
+
+def get_db(request: Request = None):
+    """获取数据库会话
 
-def get_db():
-    """获取数据库会话"""
+    请求中的会话是一个工作单元：CRUD方法只flush不提交，由TransactionRoute在处理函数返回后、
+    发送响应前统一提交一次；处理函数抛出异常（包括HTTPException）时不提交，关闭会话时回滚。
+    在脚本中直接调用时需自行提交。
+    """
     db = SessionLocal()
+    if request is not None:
+        request.state.db = db
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+class TransactionRoute(FastRoute):
+    """每个请求一个事务的路由类，路由模块以 APIRouter(route_class=TransactionRoute) 使用
+
+    依赖中yield之后的代码在响应发送后才执行，不能在get_db中提交（客户端可能在提交前就读到旧数据），
+    因此在这里包装处理函数：返回后立即提交。响应已经生成，提交时不再使对象过期，
+    流式响应继续读取已加载的属性时不会逐个重新查询。
+    提交时用run_before_response()登记的阻塞回调（如递增Redis中的集合版本）在线程池中执行完后才返回响应。
+    处理函数可以返回RowSerializer的输出，跳过响应模型校验（见FastRoute）。
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            response = await handler(request)
+            db = getattr(request.state, "db", None)
+            if db is not None and db.in_transaction():
+                db.expire_on_commit = False
+                db.info[_IN_REQUEST_KEY] = True
+                try:
+                    db.commit()
+                finally:
+                    db.info.pop(_IN_REQUEST_KEY, None)
+                callbacks = db.info.pop(_BEFORE_RESPONSE_KEY, None)
+                if callbacks:
+                    await asyncio.to_thread(_run_callbacks, callbacks)
+            return response
+
+        return route_handler
+
+
+def after_commit(db: Session, callback: Callable[[], None]) -> None:
+    """登记在当前事务提交后执行的回调（如清除缓存、唤醒后台任务），回滚时丢弃
+
+    同一个回调在一个事务中多次登记只执行一次（如批量写入的每一批都登记同一个缓存失效函数）。
+    """
+    callbacks = db.info.setdefault(_AFTER_COMMIT_KEY, [])
+    if callback not in callbacks:
+        callbacks.append(callback)
+
+
+def run_before_response(db: Session, callback: Callable[[], None]) -> bool:
+    """在after_commit中调用：TransactionRoute的提交由路由在发送响应前于线程池中执行callback，返回True；
+    其他提交（脚本、后台任务）返回False，由调用方立即执行
+
+    用于必须在客户端收到响应之前完成、但会阻塞的网络调用，既不阻塞事件循环，也不让客户端先于它看到结果。
+    """
+    if not db.info.get(_IN_REQUEST_KEY):
+        return False
+    db.info.setdefault(_BEFORE_RESPONSE_KEY, []).append(callback)
+    return True
+
+
+def _run_callbacks(callbacks: List[Callable[[], None]]) -> None:
+    for callback in callbacks:
+        callback()
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _run_after_commit(session: Session) -> None:
+    for callback in session.info.pop(_AFTER_COMMIT_KEY, ()):
+        callback()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_after_commit(session: Session) -> None:
+    session.info.pop(_AFTER_COMMIT_KEY, None)
@@ -0,0 +1,74 @@
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+
+class AdvisoryLock:
+    """基于数据库advisory lock的选主，多副本中同一时刻只有一个持有者
+
+    PostgreSQL的会话级锁绑定在一条专用连接上：连接断开（进程退出、网络故障）时锁自动释放，
+    其他副本下次尝试时即可接管。该连接使用AUTOCOMMIT，心跳查询不会让连接停留在idle in transaction。
+    放弃持有时连接作废（invalidate）而不归还连接池：解锁失败时会话可能仍持有锁，
+    归还后会被其他请求复用，锁在该连接被回收前一直无法释放。
+    SQLite等单机数据库没有advisory lock，视为总是持有。
+    方法都是同步的，在事件循环中应通过线程池调用。
+    """
+
+    def __init__(self, engine: Engine, key: int):
+        self.engine = engine
+        self.key = key
+        self._conn: Optional[Connection] = None
+
+    @property
+    def supported(self) -> bool:
+        return self.engine.dialect.name == "postgresql"
+
+    def acquire(self) -> bool:
+        """尝试获得（或确认仍持有）锁，返回当前是否持有"""
+        if not self.supported:
+            return True
+        if self._conn is not None:
+            try:
+                self._conn.execute(text("SELECT 1"))
+                return True
+            except Exception as e:
+                logger.warning(f"advisory lock连接已断开，放弃持有: {str(e)}", extra={"key": self.key})
+                self._close()
+
+        conn = self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}).scalar()
+        except Exception:
+            # 不确定锁是否已获得，不归还连接池
+            conn.invalidate()
+            conn.close()
+            raise
+        if not acquired:
+            conn.close()
+            return False
+        self._conn = conn
+        logger.info("已获得advisory lock", extra={"key": self.key})
+        return True
+
+    def release(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+        except Exception as e:
+            logger.warning(f"释放advisory lock失败: {str(e)}", extra={"key": self.key})
+        finally:
+            self._close()
+
+    def _close(self) -> None:
+        """作废并关闭持锁连接，底层会话断开后数据库释放它持有的锁"""
+        try:
+            self._conn.invalidate()
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
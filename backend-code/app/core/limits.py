@@ -0,0 +1,85 @@
+import json
+from typing import Dict, Optional
+
+from fastapi import HTTPException, status
+
+
+class RequestSizeLimitMiddleware:
+    """按路径前缀限制请求体大小
+
+    multipart表单在处理函数执行前就被完整读取并写入临时文件，处理函数中的大小检查无法提前中止上传。
+    这里在读取之前按Content-Length拒绝，未声明长度（分块传输）或声明不实时在接收过程中计数，
+    超过上限立即返回413，不再继续读取。
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        # 较长的前缀优先匹配
+        self.limits = sorted(limits.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def _limit_for(self, path: str) -> Optional[int]:
+        for prefix, limit in self.limits:
+            if path.startswith(prefix):
+                return limit
+        return None
+
+    async def __call__(self, scope, receive, send):
+        limit = self._limit_for(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > limit:
+                    await self._reject(send, limit)
+                    return
+                break
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=_detail(limit))
+            return message
+
+        async def send_with_state(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, send_with_state)
+        except HTTPException as e:
+            # 在路由之外读取请求体时超限（如其他中间件），异常未被应用的异常处理器转换为响应
+            if e.status_code != status.HTTP_413_REQUEST_ENTITY_TOO_LARGE or response_started:
+                raise
+            await self._reject(send, limit)
+
+    @staticmethod
+    async def _reject(send, limit: int) -> None:
+        body = json.dumps({"detail": _detail(limit)}, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def _detail(limit: int) -> str:
+    return f"请求体过大，最大 {limit // (1024 * 1024)}MB"
@@ -0,0 +1,169 @@
+import hmac
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.database import engine
+
+# 覆盖从几毫秒的数据库查询到120秒的供应商调用
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0
+)
+
+# 流式响应（SSE、NDJSON）的连接时长，从几秒到数小时
+STREAM_BUCKETS = (1.0, 5.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0, 4 * 3600.0)
+STREAMING_CONTENT_TYPES = ("text/event-stream", "application/x-ndjson")
+
+# 未设置METRICS_TOKEN时允许访问/metrics的客户端地址
+LOOPBACK_HOSTS = {"127.0.0.1", "::1"}
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP请求耗时（按路由模板统计，不含流式响应）",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+STREAM_DURATION = Histogram(
+    "http_stream_duration_seconds",
+    "流式响应（SSE、NDJSON）从请求开始到连接结束的时长",
+    ["method", "route", "status"],
+    buckets=STREAM_BUCKETS,
+)
+
+PHASE_LATENCY = Histogram(
+    "http_request_phase_duration_seconds",
+    "请求内各阶段耗时（认证、配置加载、知识库、历史查询、供应商调用、提交等）",
+    ["route", "phase"],
+    buckets=LATENCY_BUCKETS,
+)
+
+VENDOR_CALLS = Counter(
+    "ai_vendor_calls_total",
+    "AI供应商调用次数",
+    ["endpoint", "outcome"],  # outcome: success, error, cache_hit
+)
+
+VENDOR_LATENCY = Histogram(
+    "ai_vendor_call_duration_seconds",
+    "AI供应商调用耗时（不含缓存命中）",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+
+REDIS_OPERATIONS = Counter(
+    "redis_operations_total",
+    "Redis缓存操作次数",
+    ["operation", "result"],  # result: hit, miss, ok, error
+)
+
+REMINDER_DELIVERIES = Counter(
+    "schedule_reminder_deliveries_total",
+    "日程提醒投递次数",
+    ["channel", "result"],  # result: ok, error
+)
+
+DB_POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts_total",
+    "从连接池取出连接的次数",
+)
+
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "当前被占用的数据库连接数")
+DB_POOL_SIZE = Gauge("db_pool_size", "数据库连接池容量")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "当前溢出连接数")
+
+
+def _pool_stat(name: str) -> float:
+    stat = getattr(engine.pool, name, None)
+    return float(stat()) if callable(stat) else 0.0
+
+
+DB_POOL_CHECKED_OUT.set_function(lambda: _pool_stat("checkedout"))
+DB_POOL_SIZE.set_function(lambda: _pool_stat("size"))
+DB_POOL_OVERFLOW.set_function(lambda: _pool_stat("overflow"))
+
+
+@event.listens_for(engine, "checkout")
+def _on_pool_checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_POOL_CHECKOUTS.inc()
+
+
+# 当前请求已完成的阶段，请求结束时由MetricsMiddleware按路由模板统一记录
+_request_phases: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_phases", default=None)
+
+
+@contextmanager
+def span(phase: str):
+    """记录请求内某个阶段的耗时
+
+    在请求之外使用时（例如后台任务）不做任何记录。
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases = _request_phases.get()
+        if phases is not None:
+            phases.append((phase, time.perf_counter() - start))
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """生成Prometheus文本格式的指标数据"""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def metrics_authorized(authorization: Optional[str], client_host: Optional[str]) -> bool:
+    """设置了METRICS_TOKEN时校验 Authorization: Bearer <token>，未设置时只允许本机访问"""
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}".encode("utf-8")
+        return hmac.compare_digest((authorization or "").encode("utf-8"), expected)
+    return client_host in LOOPBACK_HOSTS
+
+
+class MetricsMiddleware:
+    """统计每个请求的总耗时以及各阶段耗时
+
+    标签使用路由模板（如/api/diary/item/{diary_id}），避免路径参数导致标签基数膨胀。
+    流式响应的耗时是连接时长而不是处理耗时，单独记录在 http_stream_duration_seconds 中，
+    不计入 http_request_duration_seconds，以免拉高延迟分位数。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        phases: List[Tuple[str, float]] = []
+        token = _request_phases.set(phases)
+        status_code = 500
+        streaming = False
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = dict(message.get("headers") or ()).get(b"content-type", b"").decode("latin-1")
+                streaming = content_type.startswith(STREAMING_CONTENT_TYPES)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_phases.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            histogram = STREAM_DURATION if streaming else REQUEST_LATENCY
+            histogram.labels(
+                method=scope["method"], route=route_path, status=str(status_code)
+            ).observe(time.perf_counter() - start)
+            for phase, duration in phases:
+                PHASE_LATENCY.labels(route=route_path, phase=phase).observe(duration)
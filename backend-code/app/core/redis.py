@@ -2,9 +2,15 @@ import redis
 from typing import Optional, Any
 import json
 from app.core.config import settings
+from app.core.metrics import REDIS_OPERATIONS
 
-# 创建Redis连接
-redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+# 创建Redis连接（短超时：Redis不可用时缓存读写快速失败，按未命中处理）
+redis_client = redis.from_url(
+    settings.REDIS_URL,
+    decode_responses=True,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+)
 
 
 class RedisCache:
@@ -16,9 +22,12 @@ class RedisCache:
         try:
             data = redis_client.get(key)
             if data:
+                REDIS_OPERATIONS.labels(operation="get", result="hit").inc()
                 return json.loads(data)
+            REDIS_OPERATIONS.labels(operation="get", result="miss").inc()
             return None
         except Exception:
+            REDIS_OPERATIONS.labels(operation="get", result="error").inc()
             return None
 
     @staticmethod
@@ -27,16 +36,22 @@ class RedisCache:
         try:
             if expire is None:
                 expire = settings.CACHE_EXPIRE_TIME
-            return redis_client.setex(key, expire, json.dumps(value, default=str))
+            result = redis_client.setex(key, expire, json.dumps(value, default=str))
+            REDIS_OPERATIONS.labels(operation="set", result="ok").inc()
+            return result
         except Exception:
+            REDIS_OPERATIONS.labels(operation="set", result="error").inc()
             return False
 
     @staticmethod
     def delete(key: str) -> bool:
         """删除缓存数据"""
         try:
-            return bool(redis_client.delete(key))
+            result = bool(redis_client.delete(key))
+            REDIS_OPERATIONS.labels(operation="delete", result="ok").inc()
+            return result
         except Exception:
+            REDIS_OPERATIONS.labels(operation="delete", result="error").inc()
             return False
 
     @staticmethod
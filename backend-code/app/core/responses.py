@@ -0,0 +1,125 @@
+"""
+响应序列化：orjson默认响应类，以及列表接口的ORM行快速序列化
+
+FastAPI对声明了response_model的接口会先用Pydantic校验返回值（from_attributes逐属性读取并执行校验器），
+再转换为可JSON化的Python对象，最后由json.dumps编码，千行级列表中这三步占据大部分CPU。
+数据库中读出的行是可信数据，RowSerializer按响应模型预先编译好字段表，直接把行映射为字典，
+由ORJSONResponse一次编码为字节，跳过校验和中间转换；其余接口仍走FastAPI的常规流程，只是编码改用orjson。
+"""
+import inspect
+import typing
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Type
+
+import orjson
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+# UTC时间输出为 "Z" 后缀，与Pydantic的JSON序列化一致
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class ORJSONResponse(JSONResponse):
+    """用orjson编码的JSON响应，main.py中作为默认响应类"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class SerializedRows(list):
+    """RowSerializer的输出：已按响应模型转换好的字典列表，FastRoute不再校验"""
+
+
+def _contains_model(annotation: Any) -> bool:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return True
+    return any(_contains_model(arg) for arg in typing.get_args(annotation))
+
+
+class RowSerializer:
+    """按响应模型预编译的ORM行序列化器，路由模块中以模块级实例使用
+
+    只适用于字段都是标量（非嵌套模型）的响应模型。模型上 mode='before' 的字段校验器
+    （如把数据库中的JSON字符串解析为列表）会照常执行，其余校验器跳过：数据库输出视为可信。
+    """
+
+    def __init__(self, schema: Type[BaseModel]):
+        nested = [name for name, field in schema.model_fields.items() if _contains_model(field.annotation)]
+        if nested:
+            raise TypeError(f"{schema.__name__} 含嵌套模型字段 {nested}，不能使用RowSerializer")
+        self.schema = schema
+        self._converters = self._before_validators(schema)
+        self._fields = self._compile(schema.model_fields)
+
+    @staticmethod
+    def _before_validators(schema: Type[BaseModel]) -> Dict[str, Callable[[Any], Any]]:
+        converters = {}
+        for name, decorator in schema.__pydantic_decorators__.field_validators.items():
+            if decorator.info.mode != "before":
+                continue
+            if len(inspect.signature(decorator.func).parameters) != 1:
+                raise TypeError(f"{schema.__name__}.{name} 需要ValidationInfo，不能在RowSerializer中执行")
+            for field_name in decorator.info.fields:
+                converters[field_name] = decorator.func
+        return converters
+
+    def _compile(self, names: Sequence[str]) -> Tuple[Tuple[str, Optional[Callable[[Any], Any]]], ...]:
+        return tuple((name, self._converters.get(name)) for name in names)
+
+    def __call__(self, rows: Sequence[Any], fields: Optional[Sequence[str]] = None) -> SerializedRows:
+        """把ORM对象转换为字典列表；fields为稀疏字段集（只输出这些字段），None时输出模型的全部字段"""
+        compiled = self._fields if fields is None else self._compile(fields)
+        result = SerializedRows()
+        append = result.append
+        for row in rows:
+            item = {}
+            for name, convert in compiled:
+                value = getattr(row, name)
+                item[name] = value if convert is None else convert(value)
+            append(item)
+        return result
+
+
+class _TrustedResponseField:
+    """包装路由的响应字段：SerializedRows原样通过，其他返回值照常校验和序列化"""
+
+    def __init__(self, field: Any):
+        self._field = field
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._field, name)
+
+    def validate(self, value: Any, *args: Any, **kwargs: Any) -> Any:
+        if isinstance(value, SerializedRows):
+            return value, None
+        return self._field.validate(value, *args, **kwargs)
+
+    def serialize(self, value: Any, **kwargs: Any) -> Any:
+        if isinstance(value, SerializedRows):
+            return value
+        return self._field.serialize(value, **kwargs)
+
+
+class FastRoute(APIRoute):
+    """识别RowSerializer输出的路由类：跳过响应模型的校验和转换
+
+    响应仍由FastAPI生成，依赖中设置的响应头（如ETag）、状态码和后台任务照常生效，OpenAPI文档不变。
+    """
+
+    def get_route_handler(self) -> Callable:
+        if self.secure_cloned_response_field is not None and not isinstance(
+            self.secure_cloned_response_field, _TrustedResponseField
+        ):
+            self.secure_cloned_response_field = _TrustedResponseField(self.secure_cloned_response_field)
+        return super().get_route_handler()
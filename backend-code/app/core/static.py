@@ -0,0 +1,84 @@
+import os
+import re
+from mimetypes import guess_type
+from typing import List
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+# 内容寻址的文件名：<前缀>_<32位sha256>[_<尺寸>].<扩展名>
+CONTENT_HASHED_NAME_RE = re.compile(r"_[0-9a-f]{32}(?:_\d+)?\.\w+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# 预压缩文件后缀，按优先级排列
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def parse_if_none_match(value: str) -> List[str]:
+    """解析If-None-Match头，忽略W/前缀（弱比较）"""
+    return [tag.strip().removeprefix("W/") for tag in value.split(",") if tag.strip()]
+
+
+class CachedStaticFiles(StaticFiles):
+    """带缓存头的静态文件服务
+
+    - 内容寻址的文件名内容永不改变，返回一年期的immutable缓存；其他文件每次重新验证
+    - 内容寻址文件的ETag由文件名中的哈希生成（强ETag），支持If-None-Match列表和304
+    - precompressed开启时，若存在 <文件>.br / <文件>.gz 且客户端支持，直接返回预压缩版本
+    """
+
+    def __init__(self, *args, precompressed: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.precompressed = precompressed
+
+    def file_response(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        name = os.path.basename(full_path)
+        immutable = bool(CONTENT_HASHED_NAME_RE.search(name))
+
+        serve_path, encoding = str(full_path), None
+        if self.precompressed:
+            accepted = request_headers.get("accept-encoding", "")
+            for candidate, suffix in PRECOMPRESSED_ENCODINGS:
+                if candidate in accepted and os.path.isfile(f"{full_path}{suffix}"):
+                    serve_path, encoding = f"{full_path}{suffix}", candidate
+                    stat_result = os.stat(serve_path)
+                    break
+
+        response = FileResponse(
+            serve_path,
+            status_code=status_code,
+            stat_result=stat_result,
+            method=scope["method"],
+            media_type=guess_type(name)[0] or "text/plain",
+        )
+        if immutable:
+            stem = os.path.splitext(name)[0]
+            response.headers["etag"] = f'"{stem}-{encoding}"' if encoding else f'"{stem}"'
+        response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+        if self.precompressed:
+            response.headers["vary"] = "Accept-Encoding"
+        if encoding:
+            response.headers["content-encoding"] = encoding
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def is_not_modified(self, response_headers: Headers, request_headers: Headers) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        etag = response_headers.get("etag")
+        if if_none_match is not None and etag is not None:
+            tags = parse_if_none_match(if_none_match)
+            return "*" in tags or etag.removeprefix("W/") in tags
+        return super().is_not_modified(response_headers, request_headers)
@@ -1,7 +1,7 @@
 # 导入所有模型以确保alembic能够检测到它们
 from app.db.user import User
 from app.db.assistant import assistant_config
-from app.db.diary import diary
+from app.db.diary import diary, tag
 from app.db.entertainment import entertainment
 from app.db.goal import goal, goal_log
 from app.db.schedule import schedule
@@ -12,6 +12,7 @@ __all__ = [
     "User",
     "assistant_config",
     "diary",
+    "tag",
     "entertainment",
     "goal",
     "goal_log",
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, Optional, Sequence
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 
@@ -17,17 +17,14 @@ class CRUDAssistantConfig(CRUDBase[AssistantConfig, AssistantConfigCreate, Assis
                 and_(AssistantConfig.user_id == user_id, AssistantConfig.is_default == True)
             ).update({"is_default": False})
 
-        db_obj = self.model(**obj_in_data, user_id=user_id)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        return self._create(db, {**obj_in_data, "user_id": user_id})
 
     def get_multi_by_user(
-        self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100
+        self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100,
+        fields: Optional[Sequence[str]] = None
     ) -> List[AssistantConfig]:
         return (
-            db.query(self.model)
+            self._load_only(db.query(self.model), fields)
             .filter(AssistantConfig.user_id == user_id)
             .order_by(AssistantConfig.is_default.desc(), AssistantConfig.created_at.desc())
             .offset(skip)
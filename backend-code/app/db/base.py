@@ -1,10 +1,14 @@
-from typing import TypeVar, Generic, Type, List, Optional, Dict, Any
-from fastapi.encoders import jsonable_encoder
+from functools import cached_property
+from typing import TypeVar, Generic, Type, List, Optional, Dict, Any, Sequence, Tuple
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.orm import Query, Session, load_only
+from sqlalchemy.orm.interfaces import ONETOMANY
+from sqlalchemy import Column, delete, desc, insert, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 
+from app.core.config import settings
 from app.core.database import Base
+from app.services.change_feed import record_change, record_object_change
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -18,6 +22,33 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """
         self.model = model
 
+    @cached_property
+    def _column_keys(self) -> frozenset:
+        """模型的列属性名，update只写入其中的字段"""
+        return frozenset(attr.key for attr in inspect(self.model).column_attrs)
+
+    @cached_property
+    def _cascade_children(self) -> List[Tuple[Type[Base], Column]]:
+        """ORM中配置了级联删除的一对多子表及其外键列
+
+        单条语句删除父记录时ORM级联不会生效，先按外键用一条DELETE删除子记录，
+        开销与子记录数量无关（SQLite默认不启用外键约束，不能依赖ON DELETE CASCADE）。
+        """
+        return [
+            (rel.mapper.class_, next(iter(rel.remote_side)))
+            for rel in inspect(self.model).relationships
+            if rel.cascade.delete and rel.direction is ONETOMANY
+        ]
+
+    def _load_only(self, query: Query, fields: Optional[Sequence[str]]) -> Query:
+        """只查询指定的列（稀疏字段集），fields为None时加载全部列
+
+        未加载的列设为raiseload：误访问时直接报错，而不是逐行再发一次查询。
+        """
+        if fields is None:
+            return query
+        return query.options(load_only(*(getattr(self.model, name) for name in fields), raiseload=True))
+
     def get(self, db: Session, id: Any) -> Optional[ModelType]:
         return db.query(self.model).filter(self.model.id == id).first()
 
@@ -38,14 +69,39 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             .all()
         )
 
-    def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
-        obj_in_data = jsonable_encoder(obj_in)
-        db_obj = self.model(**obj_in_data)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+    # ---- 写入 ----
+    # CRUD方法只flush不提交：请求中由TransactionRoute在处理函数返回后统一提交一次，
+    # 一个请求中的多步修改要么全部生效要么全部回滚；脚本中调用后需自行提交。
+    # 支持RETURNING的数据库（PostgreSQL、SQLite 3.35+）上单条写入只有一条语句：
+    # INSERT/UPDATE/DELETE ... RETURNING 直接取回整行，之后不再SELECT。
+
+    @staticmethod
+    def _supports_returning(db: Session, kind: str) -> bool:
+        return getattr(db.get_bind().dialect, f"{kind}_returning", False)
+
+    @staticmethod
+    def _returning_in_parameter_order(db: Session) -> bool:
+        """批量INSERT ... RETURNING 是否使用sort_by_parameter_order
+
+        PostgreSQL上用它保证返回顺序与参数顺序一致；SQLite上它会退化为逐行INSERT，
+        改为按自增主键升序排列（同一条多行INSERT中自增主键按VALUES顺序分配）。
+        """
+        return db.get_bind().dialect.name == "postgresql"
+
+    def _create(self, db: Session, values: Dict[str, Any]) -> ModelType:
+        """插入一行（列值字典）"""
+        if not self._supports_returning(db, "insert"):
+            db_obj = self.model(**values)
+            db.add(db_obj)
+            db.flush()
+            return db_obj
+        db_obj = db.scalars(insert(self.model).values(**values).returning(self.model)).one()
+        record_object_change(db, db_obj, "created")
         return db_obj
 
+    def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
+        return self._create(db, obj_in.dict())
+
     def update(
         self,
         db: Session,
@@ -53,23 +109,282 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_obj: ModelType,
         obj_in: UpdateSchemaType | Dict[str, Any]
     ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
+        """只更新传入的列：一条 UPDATE ... SET <变化的列> WHERE id = ... RETURNING"""
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
+        values = {field: value for field, value in update_data.items() if field in self._column_keys}
+        if not values:
+            return db_obj
 
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
-
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        if not self._supports_returning(db, "update"):
+            for field, value in values.items():
+                setattr(db_obj, field, value)
+            db.add(db_obj)
+            db.flush()
+            return db_obj
+        # 先把对象上尚未flush的修改写入，再使对象过期，RETURNING取回的行会填充到同一个对象上
+        # （populate_existing对UPDATE无效）；直接过期会丢弃这些修改
+        id = db_obj.id
+        if db_obj in db.dirty:
+            db.flush()
+        db.expire(db_obj)
+        db_obj = db.scalars(
+            update(self.model)
+            .where(self.model.id == id)
+            .values(**values)
+            .returning(self.model)
+            .execution_options(synchronize_session=False)
+        ).one()
+        record_object_change(db, db_obj, "updated")
         return db_obj
 
-    def remove(self, db: Session, *, id: int) -> ModelType:
-        obj = db.query(self.model).get(id)
-        db.delete(obj)
-        db.commit()
-        return obj
\ No newline at end of file
+    def remove(self, db: Session, *, id: int) -> Optional[ModelType]:
+        """删除一行并返回删除前的对象，不存在时返回None"""
+        self._delete_children(db, self.model.id == id)
+        if not self._supports_returning(db, "delete"):
+            obj = db.get(self.model, id)
+            if obj is not None:
+                db.delete(obj)
+                db.flush()
+            return obj
+        obj = db.scalars(
+            delete(self.model).where(self.model.id == id).returning(self.model)
+        ).one_or_none()
+        if obj is not None:
+            record_object_change(db, obj, "deleted")
+        return obj
+
+    def _delete_children(self, db: Session, *criteria) -> None:
+        """删除满足条件的父记录的级联子记录"""
+        for child, foreign_key in self._cascade_children:
+            db.execute(
+                delete(child)
+                .where(foreign_key.in_(select(self.model.id).where(*criteria)))
+                .execution_options(synchronize_session=False)
+            )
+
+    # ---- 批量操作（按用户隔离）----
+    # _insert_rows/_update_rows/_update_by_ids/_delete_by_ids 只执行语句，
+    # 公开方法在此基础上做归属校验或取回结果。
+    # 批量语句不经过ORM的flush，由这些方法自行登记数据变更，提交后推送给用户。
+
+    def get_multi_by_ids(self, db: Session, *, user_id: int, ids: Sequence[int]) -> List[ModelType]:
+        """按ID读取用户的记录；批量语句不会同步Session中已加载的对象，这里用查询结果覆盖"""
+        if not ids:
+            return []
+        return (
+            db.query(self.model)
+            .filter(self.model.user_id == user_id, self.model.id.in_(ids))
+            .order_by(self.model.id)
+            .populate_existing()
+            .all()
+        )
+
+    def _create_row(self, db: Session, obj_in: CreateSchemaType, user_id: int) -> Dict[str, Any]:
+        """批量插入时由创建模型生成的一行数据，子类可补充派生字段"""
+        return {**obj_in.dict(), "user_id": user_id}
+
+    def _insert_rows(self, db: Session, rows: List[Dict[str, Any]]) -> List[int]:
+        """批量插入（多行VALUES + RETURNING），返回按参数顺序排列的新ID（见_returning_in_parameter_order）
+
+        使用Core语句：ORM批量插入会按值为None的键把行拆成多条INSERT，升序就不再对应参数顺序。
+        """
+        if not rows:
+            return []
+        table = self.model.__table__
+        ordered = self._returning_in_parameter_order(db)
+        ids = list(db.scalars(insert(table).returning(table.c.id, sort_by_parameter_order=ordered), rows))
+        if not ordered:
+            ids.sort()
+        for id, row in zip(ids, rows):
+            record_change(db, self.model.__tablename__, row["user_id"], "created", (id,))
+        return ids
+
+    def _update_rows(self, db: Session, rows: List[Dict[str, Any]], user_id: int) -> None:
+        """按主键批量更新用户的记录，每行是包含id和待更新字段的字典"""
+        if rows:
+            db.execute(update(self.model), rows)
+            record_change(db, self.model.__tablename__, user_id, "updated", [row["id"] for row in rows])
+
+    def _update_by_ids(self, db: Session, user_id: int, ids: Sequence[int], values: Dict[str, Any]) -> int:
+        if not ids:
+            return 0
+        result = db.execute(
+            update(self.model)
+            .where(self.model.user_id == user_id, self.model.id.in_(ids))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        record_change(db, self.model.__tablename__, user_id, "updated", ids)
+        return result.rowcount
+
+    def _delete_by_ids(self, db: Session, user_id: int, ids: Sequence[int]) -> int:
+        if not ids:
+            return 0
+        self._delete_children(db, self.model.user_id == user_id, self.model.id.in_(ids))
+        result = db.execute(
+            delete(self.model)
+            .where(self.model.user_id == user_id, self.model.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        record_change(db, self.model.__tablename__, user_id, "deleted", ids)
+        return result.rowcount
+
+    def create_multi_with_user(
+        self, db: Session, *, objs_in: List[CreateSchemaType], user_id: int
+    ) -> List[ModelType]:
+        """单个事务中批量创建，返回创建的对象（与输入顺序一致）"""
+        rows = [self._create_row(db, obj_in, user_id) for obj_in in objs_in]
+        if not rows or not self._supports_returning(db, "insert"):
+            ids = self._insert_rows(db, rows)
+            by_id = {obj.id: obj for obj in self.get_multi_by_ids(db, user_id=user_id, ids=ids)}
+            return [by_id[id] for id in ids]
+        # RETURNING直接取回整行，按参数顺序排列（见_returning_in_parameter_order）
+        ordered = self._returning_in_parameter_order(db)
+        objs = list(db.scalars(insert(self.model).returning(self.model, sort_by_parameter_order=ordered), rows))
+        if not ordered:
+            objs.sort(key=lambda obj: obj.id)
+        record_change(db, self.model.__tablename__, user_id, "created", [obj.id for obj in objs])
+        return objs
+
+    def update_multi_with_user(
+        self, db: Session, *, rows: List[Dict[str, Any]], user_id: int
+    ) -> Optional[List[ModelType]]:
+        """单个事务中按主键批量更新；有ID不属于该用户时不做任何修改并返回None"""
+        ids = [row["id"] for row in rows]
+        owned = {id for (id,) in db.query(self.model.id).filter(
+            self.model.user_id == user_id, self.model.id.in_(ids)
+        )}
+        if len(owned) != len(set(ids)):
+            return None
+        self._update_rows(db, rows, user_id)
+        return self.get_multi_by_ids(db, user_id=user_id, ids=ids)
+
+    def update_by_ids(self, db: Session, *, user_id: int, ids: Sequence[int], values: Dict[str, Any]) -> int:
+        """用一条UPDATE语句修改用户的多条记录，返回受影响行数"""
+        return self._update_by_ids(db, user_id, ids, values)
+
+    def remove_by_ids(self, db: Session, *, user_id: int, ids: Sequence[int]) -> int:
+        """用一条DELETE语句删除用户的多条记录，返回删除行数"""
+        return self._delete_by_ids(db, user_id, ids)
+
+    # ---- 通用批量写入（脚本、导入、种子数据）----
+    # 按batch_size分批执行，每批一条语句（executemany），与其他写入一样不提交。
+    # 插入使用Core语句：值为None的键写入NULL，行之间不会因None的分布不同而拆成多条语句。
+    # 不限定用户；模型有user_id列时按行的所属用户登记数据变更。
+
+    def _batches(self, rows: Sequence[Any], batch_size: Optional[int]):
+        size = batch_size or settings.BULK_BATCH_SIZE
+        for start in range(0, len(rows), size):
+            yield rows[start:start + size]
+
+    def _returning_columns(self) -> List[Column]:
+        columns = [self.model.id]
+        if "user_id" in self._column_keys:
+            columns.append(self.model.user_id)
+        return columns
+
+    def _record_returned(self, db: Session, action: str, returned: Sequence[Any]) -> None:
+        """按 (id, user_id) 结果登记变更"""
+        if "user_id" not in self._column_keys:
+            return
+        by_user: Dict[int, List[Any]] = {}
+        for id, user_id in returned:
+            by_user.setdefault(user_id, []).append(id)
+        for user_id, ids in by_user.items():
+            record_change(db, self.model.__tablename__, user_id, action, ids)
+
+    def _upsert_statement(
+        self, db: Session, conflict_columns: Sequence[str], update_columns: Optional[Sequence[str]], keys: Sequence[str]
+    ):
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            stmt = postgresql.insert(self.model.__table__)
+        elif dialect == "sqlite":
+            stmt = sqlite.insert(self.model.__table__)
+        else:
+            raise NotImplementedError(f"不支持在 {dialect} 上执行upsert")
+        if update_columns is None:
+            update_columns = [key for key in keys if key not in conflict_columns and key != "id"]
+        if not update_columns:
+            return stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+        set_ = {key: stmt.excluded[key] for key in update_columns}
+        # 与ORM更新一致，维护onupdate为SQL表达式的列（如updated_at）
+        for column in self.model.__table__.columns:
+            if column.onupdate is not None and column.onupdate.is_clause_element and column.key not in set_:
+                set_[column.key] = column.onupdate.arg
+        return stmt.on_conflict_do_update(index_elements=conflict_columns, set_=set_)
+
+    def bulk_create(
+        self,
+        db: Session,
+        rows: Sequence[Dict[str, Any]],
+        *,
+        batch_size: Optional[int] = None,
+        conflict_columns: Optional[Sequence[str]] = None,
+        update_columns: Optional[Sequence[str]] = None,
+    ) -> int:
+        """批量插入列值字典（各行的键必须相同），返回插入或更新的行数
+
+        指定conflict_columns（须有对应的唯一约束）时执行upsert（ON CONFLICT，支持PostgreSQL和SQLite）：
+        冲突的行更新update_columns，默认更新行中除冲突列外的全部列；update_columns为空列表时忽略冲突的行。
+        同一次调用中冲突键重复的行只保留最后一行。
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        if conflict_columns:
+            unique = {tuple(row[key] for key in conflict_columns): row for row in rows}
+            rows = list(unique.values())
+            stmt = self._upsert_statement(db, conflict_columns, update_columns, list(rows[0]))
+            action = "updated"
+        else:
+            stmt = insert(self.model.__table__)
+            action = "created"
+
+        count = 0
+        returning = self._supports_returning(db, "insert")
+        for batch in self._batches(rows, batch_size):
+            if returning:
+                returned = db.execute(stmt.returning(*self._returning_columns()), batch).all()
+                self._record_returned(db, action, returned)
+                count += len(returned)
+            else:
+                count += db.execute(stmt, batch).rowcount
+        return count
+
+    def bulk_update(self, db: Session, rows: Sequence[Dict[str, Any]], *, batch_size: Optional[int] = None) -> int:
+        """按主键批量更新，每行是包含id和待更新字段的字典（各行的键必须相同），返回更新的行数
+
+        有id不存在时抛出StaleDataError，调用方应回滚。
+        """
+        rows = list(rows)
+        count = 0
+        for batch in self._batches(rows, batch_size):
+            ids = [row["id"] for row in batch]
+            if "user_id" in self._column_keys:
+                self._record_returned(
+                    db, "updated", db.execute(select(self.model.id, self.model.user_id).where(self.model.id.in_(ids))).all()
+                )
+            db.execute(update(self.model), batch)
+            count += len(batch)
+        return count
+
+    def bulk_delete(self, db: Session, ids: Sequence[Any], *, batch_size: Optional[int] = None) -> int:
+        """按主键批量删除（连同级联子记录），返回删除的行数"""
+        ids = list(ids)
+        count = 0
+        returning = self._supports_returning(db, "delete")
+        for batch in self._batches(ids, batch_size):
+            self._delete_children(db, self.model.id.in_(batch))
+            stmt = delete(self.model).where(self.model.id.in_(batch)).execution_options(synchronize_session=False)
+            if returning:
+                returned = db.execute(stmt.returning(*self._returning_columns())).all()
+                self._record_returned(db, "deleted", returned)
+                count += len(returned)
+            else:
+                count += db.execute(stmt).rowcount
+        return count
+
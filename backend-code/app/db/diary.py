@@ -1,30 +1,205 @@
 import json
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session, Query
+from sqlalchemy import and_, bindparam, delete, desc, func, insert, select, update
 
 from app.db.base import CRUDBase
-from app.models.diary import Diary
+from app.db.user import get_user_timezone
+from app.models.diary import Diary, DiaryTag, Tag
 from app.schemas.diary import DiaryCreate, DiaryUpdate
+from app.utils.timezone import local_date
+
+
+# 列表摘要的最大字符数
+EXCERPT_LENGTH = 120
+# 标签名的最大长度（与 tags.name 列一致）
+TAG_MAX_LENGTH = 50
+
+
+def make_excerpt(content: Optional[str]) -> Optional[str]:
+    """由正文生成列表摘要：合并空白字符，超出长度时截断并加省略号"""
+    if content is None:
+        return None
+    text = " ".join(content.split())
+    if len(text) <= EXCERPT_LENGTH:
+        return text
+    return text[:EXCERPT_LENGTH] + "…"
+
+
+def normalize_tags(names: Optional[Iterable[str]]) -> List[str]:
+    """去掉首尾空白、空标签和重复标签（保持顺序），超长的标签截断"""
+    if not names:
+        return []
+    return list(dict.fromkeys(name.strip()[:TAG_MAX_LENGTH] for name in names if name and name.strip()))
+
+
+def _filter_tags(query: Query, user_id: int, tags: Optional[Sequence[str]]) -> Query:
+    """只保留带有全部指定标签的日记，走 tags(user_id, name) 和 diary_tags(tag_id, diary_id) 索引"""
+    for name in normalize_tags(tags):
+        query = query.filter(Diary.id.in_(
+            select(DiaryTag.diary_id)
+            .join(Tag, Tag.id == DiaryTag.tag_id)
+            .where(Tag.user_id == user_id, Tag.name == name)
+        ))
+    return query
+
+
+def _filter_local_dates(query: Query, start_date: Optional[date], end_date: Optional[date]) -> Query:
+    """按用户本地日期[start_date, end_date)过滤，走 (user_id, local_date) 索引"""
+    if start_date:
+        query = query.filter(Diary.local_date >= start_date)
+    if end_date:
+        query = query.filter(Diary.local_date < end_date)
+    return query
+
+
+class CRUDTag(CRUDBase[Tag, dict, dict]):
+    """日记标签：标签行和日记数在写入日记时由CRUDDiary同步维护"""
+
+    def ensure(self, db: Session, *, user_id: int, names: Iterable[str]) -> Dict[str, int]:
+        """返回 {标签名: 标签ID}，不存在的标签先创建（并发创建同名标签时忽略冲突）"""
+        names = set(names)
+        if not names:
+            return {}
+        query = select(Tag.name, Tag.id).where(Tag.user_id == user_id, Tag.name.in_(names))
+        ids = dict(db.execute(query).all())
+        missing = names - ids.keys()
+        if missing:
+            self.bulk_create(
+                db, [{"user_id": user_id, "name": name, "diary_count": 0} for name in missing],
+                conflict_columns=["user_id", "name"], update_columns=[]
+            )
+            ids = dict(db.execute(query).all())
+        return ids
+
+    def link(self, db: Session, *, user_id: int, diary_tags: Dict[int, Sequence[str]]) -> None:
+        """为日记添加标签 {日记ID: 标签名列表}（调用方保证这些关联尚不存在），并增加标签的日记数"""
+        ids = self.ensure(db, user_id=user_id, names=(name for names in diary_tags.values() for name in names))
+        links = [
+            {"diary_id": diary_id, "tag_id": ids[name]}
+            for diary_id, names in diary_tags.items()
+            for name in names
+        ]
+        if not links:
+            return
+        db.execute(insert(DiaryTag.__table__), links)
+        added: Dict[int, int] = {}
+        for link in links:
+            added[link["tag_id"]] = added.get(link["tag_id"], 0) + 1
+        db.execute(
+            update(Tag.__table__)
+            .where(Tag.__table__.c.id == bindparam("tag_id"))
+            .values(diary_count=Tag.__table__.c.diary_count + bindparam("added")),
+            [{"tag_id": tag_id, "added": count} for tag_id, count in added.items()]
+        )
+
+    def unlink(self, db: Session, *, diary_id: int, tag_ids: Sequence[int]) -> None:
+        """移除一篇日记的部分标签，并减少这些标签的日记数"""
+        if not tag_ids:
+            return
+        db.execute(
+            delete(DiaryTag)
+            .where(DiaryTag.diary_id == diary_id, DiaryTag.tag_id.in_(tag_ids))
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(
+            update(Tag)
+            .where(Tag.id.in_(tag_ids))
+            .values(diary_count=Tag.diary_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+
+    def unlink_diaries(self, db: Session, diary_ids) -> None:
+        """删除一批日记（diary_ids为ID列表或子查询）的全部标签关联，并按删除的关联数减少日记数"""
+        removed = (
+            select(func.count())
+            .select_from(DiaryTag)
+            .where(DiaryTag.tag_id == Tag.id, DiaryTag.diary_id.in_(diary_ids))
+            .scalar_subquery()
+        )
+        db.execute(
+            update(Tag)
+            .where(Tag.id.in_(select(DiaryTag.tag_id).where(DiaryTag.diary_id.in_(diary_ids))))
+            .values(diary_count=Tag.diary_count - removed)
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(
+            delete(DiaryTag)
+            .where(DiaryTag.diary_id.in_(diary_ids))
+            .execution_options(synchronize_session=False)
+        )
+
+    def get_by_diary(self, db: Session, *, diary_id: int) -> Dict[str, int]:
+        """日记当前的标签 {标签名: 标签ID}"""
+        return dict(db.execute(
+            select(Tag.name, Tag.id).join(DiaryTag, DiaryTag.tag_id == Tag.id).where(DiaryTag.diary_id == diary_id)
+        ).all())
+
+    def counts_by_user(self, db: Session, *, user_id: int, limit: int = 100) -> List[Tuple[str, int]]:
+        """用户最常用的标签及其日记数（标签云），直接读取预先维护的计数"""
+        return (
+            db.query(Tag.name, Tag.diary_count)
+            .filter(Tag.user_id == user_id, Tag.diary_count > 0)
+            .order_by(desc(Tag.diary_count), Tag.name)
+            .limit(limit)
+            .all()
+        )
 
 
 class CRUDDiary(CRUDBase[Diary, DiaryCreate, DiaryUpdate]):
     def create_with_user(self, db: Session, *, obj_in: DiaryCreate, user_id: int) -> Diary:
         obj_in_data = obj_in.dict()
-        if obj_in_data.get("tags"):
-            obj_in_data["tags"] = json.dumps(obj_in_data["tags"])
-        db_obj = self.model(**obj_in_data, user_id=user_id)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        tags = normalize_tags(obj_in_data["tags"])
+        obj_in_data["tags"] = json.dumps(tags) if tags else None
+        obj_in_data["excerpt"] = make_excerpt(obj_in_data["content"])
+        obj_in_data["local_date"] = local_date(datetime.now(timezone.utc), get_user_timezone(db, user_id))
+        db_obj = self._create(db, {**obj_in_data, "user_id": user_id})
+        tag.link(db, user_id=user_id, diary_tags={db_obj.id: tags})
         return db_obj
 
+    def import_with_user(
+        self, db: Session, *, items: List[Tuple[DiaryCreate, Optional[datetime], Optional[datetime]]], user_id: int
+    ) -> Tuple[int, int]:
+        """批量导入 (日记, 创建时间, 更新时间)，单个事务写入，返回 (导入数, 跳过数)
+
+        标题和内容与已有日记（或同批中之前的条目）相同的条目视为重复并跳过；
+        创建时间为空时使用当前时间，本地日期按用户时区由创建时间计算。
+        """
+        tz = get_user_timezone(db, user_id)
+        now = datetime.now(timezone.utc)
+        seen = {tuple(row) for row in db.query(Diary.title, Diary.content).filter(Diary.user_id == user_id)}
+        rows, row_tags = [], []
+        for obj_in, created_at, updated_at in items:
+            key = (obj_in.title, obj_in.content)
+            if key in seen:
+                continue
+            seen.add(key)
+            created_at = created_at or now
+            tags = normalize_tags(obj_in.tags)
+            rows.append({
+                **obj_in.dict(),
+                "tags": json.dumps(tags) if tags else None,
+                "excerpt": make_excerpt(obj_in.content),
+                "user_id": user_id,
+                "created_at": created_at,
+                "updated_at": updated_at,
+                "local_date": local_date(created_at, tz),
+            })
+            row_tags.append(tags)
+        ids = self._insert_rows(db, rows)
+        tag.link(db, user_id=user_id, diary_tags=dict(zip(ids, row_tags)))
+        return len(ids), len(items) - len(rows)
+
     def get_multi_by_user(
-        self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100
+        self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100,
+        start_date: Optional[date] = None, end_date: Optional[date] = None,
+        tags: Optional[Sequence[str]] = None, fields: Optional[Sequence[str]] = None
     ) -> List[Diary]:
+        query = self._load_only(db.query(self.model).filter(Diary.user_id == user_id), fields)
+        query = _filter_tags(query, user_id, tags)
         return (
-            db.query(self.model)
-            .filter(Diary.user_id == user_id)
+            _filter_local_dates(query, start_date, end_date)
             .order_by(desc(Diary.created_at))
             .offset(skip)
             .limit(limit)
@@ -36,25 +211,52 @@ class CRUDDiary(CRUDBase[Diary, DiaryCreate, DiaryUpdate]):
     ) -> Diary:
         update_data = obj_in.dict(exclude_unset=True)
         if "tags" in update_data:
-            update_data["tags"] = json.dumps(update_data["tags"])
+            tags = normalize_tags(update_data["tags"])
+            update_data["tags"] = json.dumps(tags) if tags else None
+            current = tag.get_by_diary(db, diary_id=db_obj.id)
+            tag.unlink(db, diary_id=db_obj.id, tag_ids=[id for name, id in current.items() if name not in tags])
+            tag.link(db, user_id=db_obj.user_id, diary_tags={db_obj.id: [name for name in tags if name not in current]})
+        if update_data.get("content") is not None:
+            update_data["excerpt"] = make_excerpt(update_data["content"])
         return super().update(db, db_obj=db_obj, obj_in=update_data)
 
     def search_by_keyword(
-        self, db: Session, *, user_id: int, keyword: str, skip: int = 0, limit: int = 100
+        self, db: Session, *, user_id: int, keyword: str, skip: int = 0, limit: int = 100,
+        start_date: Optional[date] = None, end_date: Optional[date] = None,
+        tags: Optional[Sequence[str]] = None, fields: Optional[Sequence[str]] = None
     ) -> List[Diary]:
-        return (
-            db.query(self.model)
-            .filter(
-                and_(
-                    Diary.user_id == user_id,
-                    Diary.title.contains(keyword) | Diary.content.contains(keyword)
-                )
+        query = db.query(self.model).filter(
+            and_(
+                Diary.user_id == user_id,
+                Diary.title.contains(keyword) | Diary.content.contains(keyword)
             )
+        )
+        query = _filter_tags(self._load_only(query, fields), user_id, tags)
+        return (
+            _filter_local_dates(query, start_date, end_date)
             .order_by(desc(Diary.created_at))
             .offset(skip)
             .limit(limit)
             .all()
         )
 
+    def _delete_children(self, db: Session, *criteria) -> None:
+        """删除日记前移除其标签关联，并同步标签的日记数"""
+        tag.unlink_diaries(db, select(Diary.id).where(*criteria))
+        super()._delete_children(db, *criteria)
+
+    def count_by_local_date(
+        self, db: Session, *, user_id: int, start_date: date, end_date: date
+    ) -> List[Tuple[date, int]]:
+        """[start_date, end_date)内每个本地日期的日记数，用于日历视图"""
+        query = db.query(Diary.local_date, func.count(Diary.id)).filter(Diary.user_id == user_id)
+        return (
+            _filter_local_dates(query, start_date, end_date)
+            .group_by(Diary.local_date)
+            .order_by(Diary.local_date)
+            .all()
+        )
+
 
+tag = CRUDTag(Tag)
 diary = CRUDDiary(Diary)
\ No newline at end of file
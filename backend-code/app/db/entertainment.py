@@ -1,59 +1,279 @@
+import csv
+import hashlib
+import heapq
+import io
 import json
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy import and_, case, column, delete, desc, func, insert, literal_column, or_, select, table, text
+from sqlalchemy.dialects import postgresql
 
+from app.core.config import settings
+from app.core.database import after_commit
+from app.core.redis import RedisCache, redis_client
 from app.db.base import CRUDBase
-from app.models.entertainment import Entertainment, Favorite
+from app.models.entertainment import (
+    Entertainment, EntertainmentFavoriteSignature, EntertainmentNeighbor, Favorite, POSTGRES_SEARCH_DOCUMENT, UNRATED,
+)
 from app.schemas.entertainment import FavoriteCreate, FavoriteUpdate
 
+logger = logging.getLogger(__name__)
+
+ENTERTAINMENT_TYPES = ("movie", "book", "game", "music")
+# trigram索引至少需要3个字符，更短的关键词退化为LIKE扫描（限定在同一类型内）
+TRIGRAM_MIN_LENGTH = 3
+CATALOGUE_VERSION_KEY = "entertainment_catalogue_version"
+SEARCH_CACHE_KEY = "entertainment_search:{version}:{digest}"
+# 目录导入的去重键（uq_entertainment_source_external_id）和写入的列
+CATALOGUE_KEY = ("source", "external_id")
+CATALOGUE_COLUMNS = (
+    "title", "type", "description", "rating", "year", "genre", "director", "duration", "image_url",
+    "external_id", "source",
+)
+COPY_STAGING_TABLE = "entertainment_staging"
+# 收藏作为隐式反馈的权重：状态决定基础权重，有用户评分（0-5）时再按评分缩放到0.5-1.5倍
+FAVORITE_STATUS_WEIGHTS = {"want": 0.5, "watching": 0.8, "finished": 1.0}
+FAVORITE_MAX_RATING = 5.0
+FAVORITE_STATUSES = tuple(FAVORITE_STATUS_WEIGHTS)
+# 收藏列表中嵌入的条目字段（不加载简介等长文本）
+FAVORITE_ENTERTAINMENT_FIELDS = ("id", "title", "type", "rating", "year", "genre", "director", "image_url")
+
+
+def _before(keys: Sequence[Any], values: Sequence[Any]):
+    """按keys降序排列时严格排在values之后的条件
+
+    展开为 k1 <= v1 AND (k1 < v1 OR ...) 的形式，首列可以作为索引的范围条件（SQLite不会用行值比较做索引范围查找）。
+    """
+    key, value = keys[0], values[0]
+    if len(keys) == 1:
+        return key < value
+    return and_(key <= value, or_(key < value, _before(keys[1:], values[1:])))
+
+
+def favorite_weight(status: Optional[str], rating: Optional[float]) -> float:
+    """一条收藏对用户-条目矩阵的贡献，离线计算相似度和在线合并邻居时使用同一权重"""
+    weight = FAVORITE_STATUS_WEIGHTS.get(status, FAVORITE_STATUS_WEIGHTS["want"])
+    if rating is not None:
+        weight *= 0.5 + min(max(rating, 0.0), FAVORITE_MAX_RATING) / FAVORITE_MAX_RATING
+    return weight
+
+
+def _catalogue_version() -> int:
+    return RedisCache.get(CATALOGUE_VERSION_KEY) or 0
+
+
+def _bump_catalogue_version() -> None:
+    try:
+        redis_client.incr(CATALOGUE_VERSION_KEY)
+    except Exception as exc:
+        logger.warning(f"更新娱乐目录缓存版本失败: {exc}")
+
+
+def catalogue_changed(db: Session) -> None:
+    """目录写入后调用：事务提交后递增目录版本，之前缓存的搜索结果不再命中（随TTL过期）"""
+    if settings.ENTERTAINMENT_SEARCH_CACHE_TTL > 0:
+        after_commit(db, _bump_catalogue_version)
+
 
 class CRUDEntertainment(CRUDBase[Entertainment, dict, dict]):
-    def get_multi_by_type(
-        self, db: Session, *, entertainment_type: str, skip: int = 0, limit: int = 100
-    ) -> List[Entertainment]:
-        return (
-            db.query(self.model)
-            .filter(Entertainment.type == entertainment_type)
-            .order_by(desc(Entertainment.created_at))
-            .offset(skip)
-            .limit(limit)
-            .all()
+    """全局娱乐目录：按类型浏览和全文搜索，均按 (类型, 评分, id) keyset分页
+
+    浏览按评分降序，走 (type, coalesce(rating, -1), id) 索引；搜索由全文索引（SQLite FTS5 trigram /
+    PostgreSQL pg_trgm）取得候选，按标题相关度、评分排序。热门搜索的结果ID缓存在Redis中。
+    """
+
+    # ---- 目录写入：提交后使搜索缓存失效 ----
+
+    def _create(self, db: Session, values: dict) -> Entertainment:
+        catalogue_changed(db)
+        return super()._create(db, values)
+
+    def update(self, db: Session, *, db_obj: Entertainment, obj_in) -> Entertainment:
+        catalogue_changed(db)
+        return super().update(db, db_obj=db_obj, obj_in=obj_in)
+
+    def remove(self, db: Session, *, id: int) -> Optional[Entertainment]:
+        catalogue_changed(db)
+        return super().remove(db, id=id)
+
+    def bulk_create(self, db: Session, rows, **kwargs) -> int:
+        catalogue_changed(db)
+        return super().bulk_create(db, rows, **kwargs)
+
+    def bulk_update(self, db: Session, rows, **kwargs) -> int:
+        catalogue_changed(db)
+        return super().bulk_update(db, rows, **kwargs)
+
+    def bulk_delete(self, db: Session, ids, **kwargs) -> int:
+        catalogue_changed(db)
+        return super().bulk_delete(db, ids, **kwargs)
+
+    def upsert_catalogue(self, db: Session, rows: Sequence[Dict[str, Any]]) -> int:
+        """按 (source, external_id) upsert一批目录条目（每行包含CATALOGUE_COLUMNS的全部键），返回写入的行数
+
+        同一批中重复的键只保留最后一行。PostgreSQL上先用COPY写入临时表，再一条 INSERT ... SELECT ... ON CONFLICT
+        合并；其他数据库使用bulk_create的executemany upsert。
+        """
+        rows = list({tuple(row[key] for key in CATALOGUE_KEY): row for row in rows}.values())
+        if not rows:
+            return 0
+        if db.get_bind().dialect.name != "postgresql":
+            return self.bulk_create(db, rows, batch_size=len(rows), conflict_columns=list(CATALOGUE_KEY))
+        catalogue_changed(db)
+        return self._copy_upsert(db, rows)
+
+    def _copy_upsert(self, db: Session, rows: Sequence[Dict[str, Any]]) -> int:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # CSV格式中未加引号的空字段为NULL，空字符串在解析时已转换为None
+        writer.writerows([row[key] for key in CATALOGUE_COLUMNS] for row in rows)
+        buffer.seek(0)
+
+        cursor = db.connection().connection.cursor()
+        try:
+            # 临时表在事务提交时删除；同一事务中的多批复用并先清空
+            cursor.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {COPY_STAGING_TABLE} ON COMMIT DROP AS "
+                f"SELECT {', '.join(CATALOGUE_COLUMNS)} FROM entertainment WITH NO DATA"
+            )
+            cursor.execute(f"TRUNCATE {COPY_STAGING_TABLE}")
+            cursor.copy_expert(
+                f"COPY {COPY_STAGING_TABLE} ({', '.join(CATALOGUE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        finally:
+            cursor.close()
+
+        staging = table(COPY_STAGING_TABLE, *(column(key) for key in CATALOGUE_COLUMNS))
+        stmt = postgresql.insert(self.model.__table__).from_select(
+            list(CATALOGUE_COLUMNS), select(*staging.columns)
         )
+        set_ = {key: stmt.excluded[key] for key in CATALOGUE_COLUMNS if key not in CATALOGUE_KEY}
+        set_["updated_at"] = func.now()
+        return db.execute(stmt.on_conflict_do_update(index_elements=list(CATALOGUE_KEY), set_=set_)).rowcount
 
-    def search_by_keyword(
-        self, db: Session, *, keyword: str, skip: int = 0, limit: int = 100
-    ) -> List[Entertainment]:
-        return (
-            db.query(self.model)
-            .filter(
-                Entertainment.title.contains(keyword) | 
-                Entertainment.description.contains(keyword) |
-                Entertainment.genre.contains(keyword)
+    # ---- 浏览与搜索 ----
+
+    def get_multi_by_type(
+        self, db: Session, *, entertainment_type: str, after: Optional[Sequence[Any]] = None, limit: int = 20
+    ) -> Tuple[List[Entertainment], Optional[List[Any]]]:
+        """按评分降序浏览某一类型，after为上一页最后一条的 (评分键, id)，返回 (条目, 下一页的after)"""
+        rating_key = Entertainment.rating_key()
+        query = db.query(self.model).filter(Entertainment.type == entertainment_type)
+        if after:
+            query = query.filter(_before((rating_key, Entertainment.id), after))
+        items = query.order_by(desc(rating_key), desc(Entertainment.id)).limit(limit + 1).all()
+        if len(items) <= limit:
+            return items, None
+        items = items[:limit]
+        last = items[-1]
+        return items, [UNRATED if last.rating is None else last.rating, last.id]
+
+    @staticmethod
+    def _match(db: Session, keyword: str):
+        dialect = db.get_bind().dialect.name
+        if dialect == "sqlite" and len(keyword) >= TRIGRAM_MIN_LENGTH:
+            phrase = '"' + keyword.replace('"', '""') + '"'
+            return Entertainment.id.in_(
+                select(literal_column("rowid"))
+                .select_from(text("entertainment_fts"))
+                .where(text("entertainment_fts MATCH :fts_query").bindparams(fts_query=phrase))
             )
-            .order_by(desc(Entertainment.created_at))
-            .offset(skip)
-            .limit(limit)
-            .all()
+        if dialect == "postgresql":
+            pattern = keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            return literal_column(POSTGRES_SEARCH_DOCUMENT).ilike(f"%{pattern}%", escape="\\")
+        return or_(
+            Entertainment.title.contains(keyword, autoescape=True),
+            Entertainment.genre.contains(keyword, autoescape=True),
+            Entertainment.description.contains(keyword, autoescape=True),
         )
 
+    @staticmethod
+    def _relevance(keyword: str):
+        """标题相关度分级：3 完全匹配，2 前缀匹配，1 包含，0 只在类型或简介中出现"""
+        title = func.lower(Entertainment.title)
+        keyword = keyword.lower()
+        return case(
+            (title == keyword, 3),
+            (title.startswith(keyword, autoescape=True), 2),
+            (title.contains(keyword, autoescape=True), 1),
+            else_=0,
+        )
+
+    def _search_ids(
+        self, db: Session, keyword: str, entertainment_type: str, after: Optional[Sequence[Any]], limit: int
+    ) -> Tuple[List[int], Optional[List[Any]]]:
+        relevance = self._relevance(keyword)
+        rating_key = Entertainment.rating_key()
+        query = db.query(Entertainment.id, relevance, rating_key).filter(
+            Entertainment.type == entertainment_type, self._match(db, keyword)
+        )
+        if after:
+            query = query.filter(_before((relevance, rating_key, Entertainment.id), after))
+        rows = query.order_by(desc(relevance), desc(rating_key), desc(Entertainment.id)).limit(limit + 1).all()
+        next_after = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            id, score, key = rows[-1]
+            next_after = [score, key, id]
+        return [row[0] for row in rows], next_after
+
+    def search_by_keyword(
+        self, db: Session, *, keyword: str, entertainment_type: str,
+        after: Optional[Sequence[Any]] = None, limit: int = 20
+    ) -> Tuple[List[Entertainment], Optional[List[Any]]]:
+        """在某一类型中搜索，按相关度、评分降序；after为上一页最后一条的 (相关度, 评分键, id)"""
+        keyword = keyword.strip()
+        ttl = settings.ENTERTAINMENT_SEARCH_CACHE_TTL
+        cached = cache_key = None
+        if ttl > 0:
+            digest = hashlib.sha1(
+                json.dumps([entertainment_type, keyword.lower(), after, limit], ensure_ascii=False).encode("utf-8")
+            ).hexdigest()
+            cache_key = SEARCH_CACHE_KEY.format(version=_catalogue_version(), digest=digest)
+            cached = RedisCache.get(cache_key)
+        if cached is not None:
+            ids, next_after = cached["ids"], cached["next"]
+        else:
+            ids, next_after = self._search_ids(db, keyword, entertainment_type, after, limit)
+            if cache_key:
+                RedisCache.set(cache_key, {"ids": ids, "next": next_after}, expire=ttl)
+        by_id = {obj.id: obj for obj in self.get_multi_by_pk(db, ids)}
+        return [by_id[id] for id in ids if id in by_id], next_after
+
+    def get_multi_by_pk(self, db: Session, ids: Sequence[int]) -> List[Entertainment]:
+        if not ids:
+            return []
+        return db.query(self.model).filter(Entertainment.id.in_(ids)).all()
+
 
 class CRUDFavorite(CRUDBase[Favorite, FavoriteCreate, FavoriteUpdate]):
     def create_with_user(self, db: Session, *, obj_in: FavoriteCreate, user_id: int) -> Favorite:
-        obj_in_data = obj_in.dict()
-        db_obj = self.model(**obj_in_data, user_id=user_id)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        return self._create(db, {**obj_in.dict(), "user_id": user_id})
 
     def get_multi_by_user(
-        self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100
+        self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100,
+        status: Optional[str] = None, entertainment_type: Optional[str] = None
     ) -> List[Favorite]:
-        return (
+        """用户的收藏，按收藏时间倒序
+
+        条目在同一条JOIN查询中加载（只加载FAVORITE_ENTERTAINMENT_FIELDS），访问fav.entertainment不会逐行再查询；
+        走 (user_id, status, created_at) 索引。
+        """
+        query = (
             db.query(self.model)
+            .join(Favorite.entertainment)
+            .options(contains_eager(Favorite.entertainment).load_only(
+                *(getattr(Entertainment, name) for name in FAVORITE_ENTERTAINMENT_FIELDS)
+            ))
             .filter(Favorite.user_id == user_id)
-            .order_by(desc(Favorite.created_at))
+        )
+        if status:
+            query = query.filter(Favorite.status == status)
+        if entertainment_type:
+            query = query.filter(Entertainment.type == entertainment_type)
+        return (
+            query.order_by(desc(Favorite.created_at), desc(Favorite.id))
             .offset(skip)
             .limit(limit)
             .all()
@@ -80,5 +300,89 @@ class CRUDFavorite(CRUDBase[Favorite, FavoriteCreate, FavoriteUpdate]):
         return super().update(db, db_obj=db_obj, obj_in=update_data)
 
 
+class CRUDEntertainmentNeighbor(CRUDBase[EntertainmentNeighbor, dict, dict]):
+    """离线计算的相似条目：写入由推荐任务（app.services.recommender）执行，请求中只读取和合并"""
+
+    def replace(
+        self, db: Session, *, entertainment_ids: Optional[Sequence[int]], rows: Sequence[Dict[str, Any]]
+    ) -> None:
+        """替换这些条目的邻居列表（rows为 {"entertainment_id", "neighbor_id", "score"}），entertainment_ids为None时替换全部"""
+        if entertainment_ids is None:
+            db.execute(delete(EntertainmentNeighbor))
+        for batch in self._batches(list(entertainment_ids or ()), None):
+            db.execute(
+                delete(EntertainmentNeighbor)
+                .where(EntertainmentNeighbor.entertainment_id.in_(batch))
+                .execution_options(synchronize_session=False)
+            )
+        for batch in self._batches(list(rows), None):
+            db.execute(insert(EntertainmentNeighbor.__table__), batch)
+
+    def listed_by(self, db: Session, *, neighbor_ids: Iterable[int]) -> set:
+        """邻居列表中包含这些条目的条目ID"""
+        found = set()
+        for batch in self._batches(list(neighbor_ids), None):
+            found.update(db.scalars(
+                select(EntertainmentNeighbor.entertainment_id)
+                .where(EntertainmentNeighbor.neighbor_id.in_(batch))
+                .distinct()
+            ))
+        return found
+
+    def recommend_for_user(
+        self, db: Session, *, user_id: int, entertainment_type: Optional[str] = None, limit: int = 20
+    ) -> List[Tuple[Entertainment, float]]:
+        """合并用户收藏条目的邻居列表：得分为 Σ 收藏权重 × 相似度，已收藏的条目不推荐
+
+        只读取用户收藏条目的top-K邻居（收藏数 × K 行），不在请求中计算相似度。
+        """
+        weights: Dict[int, float] = {}
+        for entertainment_id, status, rating in db.execute(
+            select(Favorite.entertainment_id, Favorite.status, Favorite.rating).where(Favorite.user_id == user_id)
+        ):
+            weights[entertainment_id] = max(weights.get(entertainment_id, 0.0), favorite_weight(status, rating))
+        if not weights:
+            return []
+
+        query = select(
+            EntertainmentNeighbor.entertainment_id, EntertainmentNeighbor.neighbor_id, EntertainmentNeighbor.score
+        ).where(EntertainmentNeighbor.entertainment_id.in_(list(weights)))
+        if entertainment_type:
+            query = query.join(Entertainment, Entertainment.id == EntertainmentNeighbor.neighbor_id).where(
+                Entertainment.type == entertainment_type
+            )
+        scores: Dict[int, float] = {}
+        for entertainment_id, neighbor_id, score in db.execute(query):
+            if neighbor_id not in weights:
+                scores[neighbor_id] = scores.get(neighbor_id, 0.0) + weights[entertainment_id] * score
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+
+        by_id = {obj.id: obj for obj in entertainment.get_multi_by_pk(db, [id for id, _ in top])}
+        return [(by_id[id], score) for id, score in top if id in by_id]
+
+
+class CRUDFavoriteSignature(CRUDBase[EntertainmentFavoriteSignature, dict, dict]):
+    def get_all(self, db: Session) -> Dict[int, str]:
+        return dict(db.execute(
+            select(EntertainmentFavoriteSignature.entertainment_id, EntertainmentFavoriteSignature.signature)
+        ).all())
+
+    def replace(self, db: Session, *, signatures: Dict[int, str], removed: Sequence[int]) -> None:
+        """写入变化的收藏摘要，删除已经没有收藏的条目的摘要"""
+        rows = [{"entertainment_id": id, "signature": value} for id, value in signatures.items()]
+        if rows:
+            stmt = self._upsert_statement(db, ["entertainment_id"], None, ["entertainment_id", "signature"])
+            for batch in self._batches(rows, None):
+                db.execute(stmt, batch)
+        for batch in self._batches(list(removed), None):
+            db.execute(
+                delete(EntertainmentFavoriteSignature)
+                .where(EntertainmentFavoriteSignature.entertainment_id.in_(batch))
+                .execution_options(synchronize_session=False)
+            )
+
+
 entertainment = CRUDEntertainment(Entertainment)
+entertainment_neighbor = CRUDEntertainmentNeighbor(EntertainmentNeighbor)
+favorite_signature = CRUDFavoriteSignature(EntertainmentFavoriteSignature)
 favorite = CRUDFavorite(Favorite)
\ No newline at end of file
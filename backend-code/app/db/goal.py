@@ -1,21 +1,37 @@
 import json
+from datetime import date, datetime, timedelta, timezone
 from typing import List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, desc
 
 from app.db.base import CRUDBase
-from app.models.goal import Goal, GoalLog
+from app.db.user import get_user_timezone
+from app.models.goal import Goal, GoalLog, GoalLogRollup
 from app.schemas.goal import GoalCreate, GoalUpdate, GoalLogCreate
+from app.utils.timezone import local_date
+
+ROLLUP_PERIODS = ("day", "week")
+
+
+def period_start(day: date, period: str) -> date:
+    """汇总周期的起始日期：按天为当天，按周为当周周一"""
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def next_streak(last_log_date: Optional[date], current_streak: int, day: date) -> int:
+    """在day打卡后的连续天数"""
+    if last_log_date == day:
+        return current_streak
+    if last_log_date == day - timedelta(days=1):
+        return current_streak + 1
+    return 1
 
 
 class CRUDGoal(CRUDBase[Goal, GoalCreate, GoalUpdate]):
     def create_with_user(self, db: Session, *, obj_in: GoalCreate, user_id: int) -> Goal:
-        obj_in_data = obj_in.dict()
-        db_obj = self.model(**obj_in_data, user_id=user_id)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        return self._create(db, {**obj_in.dict(), "user_id": user_id})
 
     def get_multi_by_user(
         self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100
@@ -54,13 +70,116 @@ class CRUDGoal(CRUDBase[Goal, GoalCreate, GoalUpdate]):
 
 class CRUDGoalLog(CRUDBase[GoalLog, GoalLogCreate, dict]):
     def create_with_goal(self, db: Session, *, obj_in: GoalLogCreate, goal_id: int) -> GoalLog:
-        obj_in_data = obj_in.dict()
-        db_obj = self.model(**obj_in_data, goal_id=goal_id)
+        """写入打卡记录，并在同一事务中增量更新目标的聚合值、按天/按周汇总和连续天数
+
+        连续天数和汇总按用户时区中的日期计算。
+        """
+        # 锁定目标行，保证并发打卡时聚合值不丢失更新（SQLite下为空操作，写事务本身串行）
+        goal_obj = db.query(Goal).filter(Goal.id == goal_id).with_for_update().one()
+
+        logged_at = datetime.now(timezone.utc)
+        obj_in_data = obj_in.dict(exclude={"goal_id"})
+        db_obj = self.model(**obj_in_data, goal_id=goal_id, created_at=logged_at)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+
+        day = local_date(logged_at, get_user_timezone(db, goal_obj.user_id))
+        self._apply_to_goal(goal_obj, db_obj.value, logged_at, day)
+        for period in ROLLUP_PERIODS:
+            self._apply_to_rollup(db, goal_id, period, day, db_obj.value)
+
+        db.flush()
         return db_obj
 
+    @staticmethod
+    def _apply_to_goal(goal_obj: Goal, value: float, logged_at: datetime, day: date) -> None:
+        """day为logged_at在用户时区中的日期"""
+        goal_obj.log_count = (goal_obj.log_count or 0) + 1
+        goal_obj.log_sum = (goal_obj.log_sum or 0) + value
+        goal_obj.last_value = value
+        goal_obj.last_logged_at = logged_at
+        goal_obj.current_streak = next_streak(goal_obj.last_log_date, goal_obj.current_streak or 0, day)
+        goal_obj.longest_streak = max(goal_obj.longest_streak or 0, goal_obj.current_streak)
+        goal_obj.last_log_date = day
+        goal_obj.current_value = (goal_obj.current_value or 0) + value
+        if goal_obj.target_value and goal_obj.current_value >= goal_obj.target_value:
+            goal_obj.is_completed = True
+
+    @staticmethod
+    def _apply_to_rollup(db: Session, goal_id: int, period: str, day: date, value: float) -> None:
+        start = period_start(day, period)
+        rollup = (
+            db.query(GoalLogRollup)
+            .filter(
+                GoalLogRollup.goal_id == goal_id,
+                GoalLogRollup.period == period,
+                GoalLogRollup.period_start == start
+            )
+            .first()
+        )
+        if rollup is None:
+            db.add(GoalLogRollup(
+                goal_id=goal_id, period=period, period_start=start,
+                count=1, sum=value, min_value=value, max_value=value, last_value=value
+            ))
+            return
+        rollup.count += 1
+        rollup.sum += value
+        rollup.min_value = min(rollup.min_value, value)
+        rollup.max_value = max(rollup.max_value, value)
+        rollup.last_value = value
+
+    def rebuild_aggregates(self, db: Session, *, goal_id: int) -> Goal:
+        """从打卡记录全量重建聚合值（删除或导入打卡记录后用于修复），current_value重置为打卡值之和"""
+        goal_obj = db.query(Goal).filter(Goal.id == goal_id).with_for_update().one()
+        db.query(GoalLogRollup).filter(GoalLogRollup.goal_id == goal_id).delete(synchronize_session=False)
+
+        goal_obj.log_count = 0
+        goal_obj.log_sum = 0
+        goal_obj.last_value = None
+        goal_obj.last_logged_at = None
+        goal_obj.last_log_date = None
+        goal_obj.current_streak = 0
+        goal_obj.longest_streak = 0
+        goal_obj.current_value = 0
+
+        tz = get_user_timezone(db, goal_obj.user_id)
+        rollups = {}
+        logs = db.query(GoalLog).filter(GoalLog.goal_id == goal_id).order_by(GoalLog.created_at, GoalLog.id)
+        for log in logs:
+            day = local_date(log.created_at, tz)
+            self._apply_to_goal(goal_obj, log.value, log.created_at, day)
+            for period in ROLLUP_PERIODS:
+                key = (period, period_start(day, period))
+                rollup = rollups.get(key)
+                if rollup is None:
+                    rollups[key] = GoalLogRollup(
+                        goal_id=goal_id, period=period, period_start=key[1],
+                        count=1, sum=log.value, min_value=log.value, max_value=log.value, last_value=log.value
+                    )
+                else:
+                    rollup.count += 1
+                    rollup.sum += log.value
+                    rollup.min_value = min(rollup.min_value, log.value)
+                    rollup.max_value = max(rollup.max_value, log.value)
+                    rollup.last_value = log.value
+        db.add_all(rollups.values())
+        db.flush()
+        return goal_obj
+
+    def get_rollups(
+        self, db: Session, *, goal_id: int, period: str = "day",
+        start: Optional[date] = None, end: Optional[date] = None
+    ) -> List[GoalLogRollup]:
+        query = db.query(GoalLogRollup).filter(
+            GoalLogRollup.goal_id == goal_id,
+            GoalLogRollup.period == period
+        )
+        if start:
+            query = query.filter(GoalLogRollup.period_start >= period_start(start, period))
+        if end:
+            query = query.filter(GoalLogRollup.period_start <= end)
+        return query.order_by(GoalLogRollup.period_start).all()
+
     def get_multi_by_goal(
         self, db: Session, *, goal_id: int, skip: int = 0, limit: int = 100
     ) -> List[GoalLog]:
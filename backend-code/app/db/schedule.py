@@ -1,23 +1,100 @@
 import json
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
-from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, desc, or_
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 
+from app.core.config import settings
+from app.core.database import after_commit
+from app.core.redis import RedisCache
 from app.db.base import CRUDBase
-from app.models.schedule import Schedule
-from app.schemas.schedule import ScheduleCreate, ScheduleUpdate
+from app.db.user import get_user_timezone
+from app.models.schedule import Schedule, ScheduleException
+from app.schemas.schedule import (
+    ScheduleCreate, ScheduleUpdate, ScheduleExceptionBase, ScheduleExceptionCreate
+)
+from app.services.change_feed import record_change
+from app.services.recurrence import decode_occurrence, expand_schedule, recurrence_until, single_occurrence
+from app.services.reminders import reminder_dispatcher
+from app.utils.timezone import as_utc, local_date, local_day_start, local_today, week_start
+
+OCCURRENCE_CACHE_KEY = "schedule_occurrences:{user_id}"
+# 修改后需要重新安排提醒的字段
+REMINDER_FIELDS = ("start_time", "reminder_time", "rrule")
+
+
+def occurrence_cache_window(tz: ZoneInfo) -> Optional[Tuple[date, date]]:
+    """物化缓存覆盖的本地日期范围：从用户的今天起 SCHEDULE_OCCURRENCE_CACHE_WEEKS 周，未开启时返回None"""
+    weeks = settings.SCHEDULE_OCCURRENCE_CACHE_WEEKS
+    if weeks <= 0:
+        return None
+    today = local_today(tz)
+    return today, today + timedelta(weeks=weeks)
+
+
+def invalidate_occurrence_cache(user_id: int) -> None:
+    """用户的日程或例外发生变化后清除物化的实例缓存"""
+    if settings.SCHEDULE_OCCURRENCE_CACHE_WEEKS > 0:
+        RedisCache.delete(OCCURRENCE_CACHE_KEY.format(user_id=user_id))
+
+
+def schedules_changed(db: Session, user_id: int) -> None:
+    """日程或例外写入后调用：事务提交后清除实例缓存，并通知提醒调度器重新加载
+
+    在提交前清除缓存时，并发请求可能在提交前用旧数据重新填充缓存。
+    """
+    def callback() -> None:
+        invalidate_occurrence_cache(user_id)
+        reminder_dispatcher.notify()
+
+    after_commit(db, callback)
 
 
 class CRUDSchedule(CRUDBase[Schedule, ScheduleCreate, ScheduleUpdate]):
+    def _create_row(self, db: Session, obj_in: ScheduleCreate, user_id: int) -> Dict[str, Any]:
+        row = super()._create_row(db, obj_in, user_id)
+        tz = get_user_timezone(db, user_id)
+        row["local_date"] = local_date(row["start_time"], tz)
+        row["recurrence_until"] = recurrence_until(row["rrule"], row["start_time"], tz)
+        # 创建时已经过去的提醒不再补发
+        row["reminder_sent_until"] = datetime.now(timezone.utc)
+        return row
+
+    def _fill_derived(self, db: Session, rows: List[Dict[str, Any]], user_id: int) -> List[Dict[str, Any]]:
+        """修改了开始时间或重复规则的行重新计算local_date和recurrence_until，并重新安排提醒"""
+        now = datetime.now(timezone.utc)
+        for row in rows:
+            if any(name in row for name in REMINDER_FIELDS):
+                row["reminder_sent_until"] = now
+        ids = [row["id"] for row in rows if "rrule" in row or "start_time" in row]
+        if not ids:
+            return rows
+        tz = get_user_timezone(db, user_id)
+        current = {
+            id: (rule, start_time) for id, rule, start_time in
+            db.query(Schedule.id, Schedule.rrule, Schedule.start_time).filter(Schedule.id.in_(ids))
+        }
+        for row in rows:
+            if row["id"] in current:
+                rule, start_time = current[row["id"]]
+                start_time = row.get("start_time") or start_time
+                row["local_date"] = local_date(start_time, tz)
+                row["recurrence_until"] = recurrence_until(row.get("rrule", rule), start_time, tz)
+        return rows
+
     def create_with_user(self, db: Session, *, obj_in: ScheduleCreate, user_id: int) -> Schedule:
-        obj_in_data = obj_in.dict()
-        db_obj = self.model(**obj_in_data, user_id=user_id)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        db_obj = self._create(db, self._create_row(db, obj_in, user_id))
+        schedules_changed(db, user_id)
         return db_obj
 
+    def create_multi_with_user(
+        self, db: Session, *, objs_in: List[ScheduleCreate], user_id: int
+    ) -> List[Schedule]:
+        schedules = super().create_multi_with_user(db, objs_in=objs_in, user_id=user_id)
+        schedules_changed(db, user_id)
+        return schedules
+
     def get_multi_by_user(
         self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100
     ) -> List[Schedule]:
@@ -32,48 +109,233 @@ class CRUDSchedule(CRUDBase[Schedule, ScheduleCreate, ScheduleUpdate]):
 
     def get_upcoming_by_user(
         self, db: Session, *, user_id: int, days: int = 7
-    ) -> List[Schedule]:
-        start_date = datetime.utcnow()
-        end_date = start_date + timedelta(days=days)
-        
-        return (
-            db.query(self.model)
-            .filter(
-                and_(
-                    Schedule.user_id == user_id,
-                    Schedule.start_time >= start_date,
-                    Schedule.start_time <= end_date,
-                    Schedule.is_completed == False
-                )
-            )
-            .order_by(Schedule.start_time)
-            .all()
+    ) -> List[Dict[str, Any]]:
+        """未来N天未完成的日程实例（重复日程按窗口展开）
+
+        按覆盖[现在, 现在+N天]的本地日期范围查询（可命中物化缓存），再按开始时间精确过滤。
+        """
+        tz = get_user_timezone(db, user_id)
+        now = datetime.now(timezone.utc)
+        end = now + timedelta(days=days)
+        occurrences = self.get_occurrences_by_date(
+            db, user_id=user_id, start_date=local_date(now, tz),
+            end_date=local_date(end, tz) + timedelta(days=1), include_completed=False
         )
+        return [item for item in occurrences if now <= item["start_time"] <= end]
 
     def get_today_by_user(
         self, db: Session, *, user_id: int
-    ) -> List[Schedule]:
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = today_start + timedelta(days=1)
-        
-        return (
+    ) -> List[Dict[str, Any]]:
+        """用户时区中今天的日程实例（重复日程按窗口展开）"""
+        today = local_today(get_user_timezone(db, user_id))
+        return self.get_occurrences_by_date(
+            db, user_id=user_id, start_date=today, end_date=today + timedelta(days=1)
+        )
+
+    def get_week_by_user(
+        self, db: Session, *, user_id: int
+    ) -> List[Dict[str, Any]]:
+        """用户时区中本周（周一到周日）的日程实例"""
+        monday = week_start(local_today(get_user_timezone(db, user_id)))
+        return self.get_occurrences_by_date(
+            db, user_id=user_id, start_date=monday, end_date=monday + timedelta(days=7)
+        )
+
+    def get_occurrences(
+        self, db: Session, *, user_id: int, start: datetime, end: datetime, include_completed: bool = True
+    ) -> List[Dict[str, Any]]:
+        """[start, end)内开始的日程实例，按开始时间升序
+
+        单次日程走 (user_id, start_time) 索引，重复日程只取出与窗口相交的规则后在内存中展开，
+        开销为 O(规则数 + 窗口内实例数)。
+        """
+        tz = get_user_timezone(db, user_id)
+        occurrences = self._expand_occurrences(db, user_id, tz, as_utc(start), as_utc(end))
+        if not include_completed:
+            occurrences = [item for item in occurrences if not item["is_completed"]]
+        return occurrences
+
+    def get_occurrences_by_date(
+        self, db: Session, *, user_id: int, start_date: date, end_date: date, include_completed: bool = True
+    ) -> List[Dict[str, Any]]:
+        """用户时区中本地日期在[start_date, end_date)内的日程实例
+
+        单次日程按 (user_id, local_date) 索引做范围查询；范围落在物化缓存内时直接读缓存。
+        """
+        tz = get_user_timezone(db, user_id)
+        window = occurrence_cache_window(tz)
+        if window and window[0] <= start_date and end_date <= window[1]:
+            occurrences = [
+                item for item in self._get_cached_occurrences(db, user_id, tz, *window)
+                if start_date <= item["local_date"] < end_date
+            ]
+        else:
+            occurrences = self._expand_occurrences(
+                db, user_id, tz, local_day_start(start_date, tz), local_day_start(end_date, tz),
+                dates=(start_date, end_date)
+            )
+        if not include_completed:
+            occurrences = [item for item in occurrences if not item["is_completed"]]
+        return occurrences
+
+    def _expand_occurrences(
+        self, db: Session, user_id: int, tz: ZoneInfo, start: datetime, end: datetime,
+        dates: Optional[Tuple[date, date]] = None
+    ) -> List[Dict[str, Any]]:
+        singles = db.query(self.model).filter(Schedule.user_id == user_id, Schedule.rrule.is_(None))
+        if dates:
+            singles = singles.filter(Schedule.local_date >= dates[0], Schedule.local_date < dates[1])
+        else:
+            singles = singles.filter(Schedule.start_time >= start, Schedule.start_time < end)
+        rules = (
             db.query(self.model)
+            .options(selectinload(Schedule.exceptions))
             .filter(
-                and_(
-                    Schedule.user_id == user_id,
-                    Schedule.start_time >= today_start,
-                    Schedule.start_time < today_end
-                )
+                Schedule.user_id == user_id,
+                Schedule.rrule.isnot(None),
+                Schedule.start_time < end,
+                or_(Schedule.recurrence_until.is_(None), Schedule.recurrence_until >= start)
             )
-            .order_by(Schedule.start_time)
             .all()
         )
+        occurrences = [single_occurrence(schedule_obj) for schedule_obj in singles]
+        for rule in rules:
+            occurrences.extend(expand_schedule(rule, start, end, tz))
+        occurrences.sort(key=lambda item: (item["start_time"], item["id"]))
+        return occurrences
+
+    def _get_cached_occurrences(
+        self, db: Session, user_id: int, tz: ZoneInfo, start_date: date, end_date: date
+    ) -> List[Dict[str, Any]]:
+        key = OCCURRENCE_CACHE_KEY.format(user_id=user_id)
+        # 日期或用户时区变化后缓存自动失效
+        window = f"{tz.key}:{start_date.isoformat()}"
+        cached = RedisCache.get(key)
+        if cached and cached.get("window") == window:
+            return [decode_occurrence(item) for item in cached["items"]]
+        occurrences = self._expand_occurrences(
+            db, user_id, tz, local_day_start(start_date, tz), local_day_start(end_date, tz),
+            dates=(start_date, end_date)
+        )
+        RedisCache.set(key, {"window": window, "items": occurrences})
+        return occurrences
+
+    def get_by_range(
+        self, db: Session, *, user_id: int, start: datetime, end: datetime,
+        include_completed: bool = True, skip: int = 0, limit: int = 500
+    ) -> List[Schedule]:
+        """获取开始时间在[start, end)内的日程，走 (user_id, start_time) 索引"""
+        query = db.query(self.model).filter(
+            and_(
+                Schedule.user_id == user_id,
+                Schedule.start_time >= start,
+                Schedule.start_time < end
+            )
+        )
+        if not include_completed:
+            query = query.filter(Schedule.is_completed == False)
+        return query.order_by(Schedule.start_time).offset(skip).limit(limit).all()
 
     def update_with_user(
         self, db: Session, *, db_obj: Schedule, obj_in: ScheduleUpdate
     ) -> Schedule:
         update_data = obj_in.dict(exclude_unset=True)
-        return super().update(db, db_obj=db_obj, obj_in=update_data)
+        if "rrule" in update_data or "start_time" in update_data:
+            tz = get_user_timezone(db, db_obj.user_id)
+            start_time = update_data.get("start_time") or db_obj.start_time
+            update_data["local_date"] = local_date(start_time, tz)
+            update_data["recurrence_until"] = recurrence_until(update_data.get("rrule", db_obj.rrule), start_time, tz)
+        if any(name in update_data for name in REMINDER_FIELDS):
+            update_data["reminder_sent_until"] = datetime.now(timezone.utc)
+        schedule_obj = super().update(db, db_obj=db_obj, obj_in=update_data)
+        schedules_changed(db, schedule_obj.user_id)
+        return schedule_obj
+
+    def update_multi_with_user(
+        self, db: Session, *, rows: List[Dict[str, Any]], user_id: int
+    ) -> Optional[List[Schedule]]:
+        schedules = super().update_multi_with_user(
+            db, rows=self._fill_derived(db, rows, user_id), user_id=user_id
+        )
+        schedules_changed(db, user_id)
+        return schedules
+
+    def update_by_ids(self, db: Session, *, user_id: int, ids: Sequence[int], values: Dict[str, Any]) -> int:
+        if any(name in values for name in REMINDER_FIELDS):
+            values = {**values, "reminder_sent_until": datetime.now(timezone.utc)}
+        count = super().update_by_ids(db, user_id=user_id, ids=ids, values=values)
+        schedules_changed(db, user_id)
+        return count
+
+    def remove(self, db: Session, *, id: int) -> Schedule:
+        schedule_obj = super().remove(db, id=id)
+        schedules_changed(db, schedule_obj.user_id)
+        return schedule_obj
+
+    def remove_by_ids(self, db: Session, *, user_id: int, ids: Sequence[int]) -> int:
+        count = super().remove_by_ids(db, user_id=user_id, ids=ids)
+        schedules_changed(db, user_id)
+        return count
+
+    def sync_by_user(
+        self, db: Session, *, user_id: int, create: List[ScheduleCreate],
+        update: List[Dict[str, Any]], delete: List[int]
+    ) -> Optional[Dict[str, List[int]]]:
+        """在一个事务中批量创建、更新和删除日程；有ID不属于该用户时不做任何修改并返回None"""
+        touched = {row["id"] for row in update} | set(delete)
+        owned = {id for (id,) in db.query(Schedule.id).filter(
+            Schedule.user_id == user_id, Schedule.id.in_(touched)
+        )} if touched else set()
+        if owned != touched:
+            return None
+
+        created = self._insert_rows(db, [self._create_row(db, obj_in, user_id) for obj_in in create])
+        self._update_rows(db, self._fill_derived(db, update, user_id), user_id)
+        self._delete_by_ids(db, user_id, delete)
+        schedules_changed(db, user_id)
+        return {"created": created, "updated": [row["id"] for row in update], "deleted": list(delete)}
+
+
+schedule = CRUDSchedule(Schedule)
+
+
+class CRUDScheduleException(CRUDBase[ScheduleException, ScheduleExceptionCreate, ScheduleExceptionBase]):
+    def get_multi_by_schedule(self, db: Session, *, schedule_id: int) -> List[ScheduleException]:
+        return (
+            db.query(self.model)
+            .filter(ScheduleException.schedule_id == schedule_id)
+            .order_by(ScheduleException.original_start)
+            .all()
+        )
+
+    def upsert_with_schedule(
+        self, db: Session, *, obj_in: ScheduleExceptionCreate, schedule_obj: Schedule
+    ) -> ScheduleException:
+        """按原始开始时间新增或覆盖重复日程中某个实例的修改"""
+        data = obj_in.dict()
+        data["original_start"] = as_utc(data["original_start"])
+        db_obj = (
+            db.query(self.model)
+            .filter(
+                ScheduleException.schedule_id == schedule_obj.id,
+                ScheduleException.original_start == data["original_start"]
+            )
+            .first()
+        )
+        # 单次修改属于日程的一部分，按日程推送变更
+        record_change(db, "schedules", schedule_obj.user_id, "updated", (schedule_obj.id,))
+        if db_obj is None:
+            db_obj = self._create(db, {**data, "schedule_id": schedule_obj.id})
+        else:
+            db_obj = self.update(db, db_obj=db_obj, obj_in=data)
+        schedules_changed(db, schedule_obj.user_id)
+        return db_obj
+
+    def remove_with_schedule(self, db: Session, *, id: int, schedule_obj: Schedule) -> ScheduleException:
+        record_change(db, "schedules", schedule_obj.user_id, "updated", (schedule_obj.id,))
+        exception_obj = self.remove(db, id=id)
+        schedules_changed(db, schedule_obj.user_id)
+        return exception_obj
 
 
-schedule = CRUDSchedule(Schedule)
\ No newline at end of file
+schedule_exception = CRUDScheduleException(ScheduleException)
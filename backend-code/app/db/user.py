@@ -1,8 +1,13 @@
+from zoneinfo import ZoneInfo
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import bindparam, or_, update
+from app.models.diary import Diary
+from app.models.schedule import Schedule
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
+from app.services.change_feed import record_change
 from app.core.security import get_password_hash, verify_password
+from app.utils.timezone import get_zone, local_date
 
 
 def get_user(db: Session, user_id: int) -> User | None:
@@ -10,6 +15,31 @@ def get_user(db: Session, user_id: int) -> User | None:
     return db.query(User).filter(User.id == user_id).first()
 
 
+def get_user_timezone(db: Session, user_id: int) -> ZoneInfo:
+    """用户的时区；当前请求已加载该用户时直接从Session的identity map读取，不发查询"""
+    user = db.get(User, user_id)
+    return get_zone(user.timezone if user else None)
+
+
+def refresh_local_dates(db: Session, user_id: int, tz: ZoneInfo) -> None:
+    """用户修改时区后，按新时区重算日程和日记的local_date"""
+    for model, column in ((Schedule, Schedule.start_time), (Diary, Diary.created_at)):
+        rows = [
+            {"row_id": id, "new_local_date": local_date(value, tz)}
+            for id, value in db.query(model.id, column).filter(model.user_id == user_id)
+        ]
+        if rows:
+            table = model.__table__
+            # 显式保留updated_at，时区变化不算内容修改
+            db.execute(
+                update(table)
+                .where(table.c.id == bindparam("row_id"))
+                .values(local_date=bindparam("new_local_date"), updated_at=table.c.updated_at),
+                rows
+            )
+            record_change(db, table.name, user_id, "updated", [row["row_id"] for row in rows])
+
+
 def get_user_by_username(db: Session, username: str) -> User | None:
     """根据用户名获取用户"""
     return db.query(User).filter(User.username == username).first()
@@ -34,11 +64,11 @@ def create_user(db: Session, user: UserCreate) -> User:
         hashed_password=hashed_password,
         full_name=user.full_name,
         bio=user.bio,
-        avatar_url=user.avatar_url
+        avatar_url=user.avatar_url,
+        timezone=user.timezone
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    db.flush()
     return db_user
 
 
@@ -52,11 +82,15 @@ def update_user(db: Session, user_id: int, user_update: UserUpdate) -> User | No
     if "password" in update_data:
         update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
 
+    if "timezone" in update_data and update_data["timezone"] is None:
+        del update_data["timezone"]
+    timezone_changed = "timezone" in update_data and update_data["timezone"] != db_user.timezone
     for field, value in update_data.items():
         setattr(db_user, field, value)
+    if timezone_changed:
+        refresh_local_dates(db, user_id, get_zone(db_user.timezone))
 
-    db.commit()
-    db.refresh(db_user)
+    db.flush()
     return db_user
 
 
@@ -67,7 +101,7 @@ def delete_user(db: Session, user_id: int) -> bool:
         return False
 
     db.delete(db_user)
-    db.commit()
+    db.flush()
     return True
 
 
@@ -1,9 +1,9 @@
 from .user import User
 from .assistant import AssistantConfig
-from .diary import Diary
-from .entertainment import Entertainment, Favorite
-from .goal import Goal, GoalLog
-from .schedule import Schedule
+from .diary import Diary, DiaryTag, Tag
+from .entertainment import Entertainment, EntertainmentFavoriteSignature, EntertainmentNeighbor, Favorite
+from .goal import Goal, GoalLog, GoalLogRollup
+from .schedule import Schedule, ScheduleException
 from .chat import ChatMessage
 from .agent import Agent, agent
 
@@ -11,11 +11,17 @@ __all__ = [
     "User",
     "AssistantConfig",
     "Diary",
+    "DiaryTag",
+    "Tag",
     "Entertainment",
+    "EntertainmentNeighbor",
+    "EntertainmentFavoriteSignature",
     "Favorite",
     "Goal",
     "GoalLog",
+    "GoalLogRollup",
     "Schedule",
+    "ScheduleException",
     "ChatMessage",
     "Agent",
     "agent"
@@ -25,13 +25,12 @@ class Agent(Base):
         return f"<Agent(id={self.id}, name='{self.name}', user_id={self.user_id})>"
 
 
-# Agent CRUD 操作
+# Agent CRUD 操作（只flush，由请求事务统一提交）
 class AgentCRUD:
     def create(self, db, obj_in):
         db_obj = Agent(**obj_in)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        db.flush()
         return db_obj
 
     def get(self, db, id: int):
@@ -52,15 +51,14 @@ class AgentCRUD:
     def update(self, db, db_obj, obj_in):
         for field, value in obj_in.items():
             setattr(db_obj, field, value)
-        db.commit()
-        db.refresh(db_obj)
+        db.flush()
         return db_obj
 
     def delete(self, db, id: int):
         obj = db.query(Agent).filter(Agent.id == id).first()
         if obj:
             db.delete(obj)
-            db.commit()
+            db.flush()
         return obj
 
     def set_default(self, db, agent_id: int, user_id: int):
@@ -71,8 +69,7 @@ class AgentCRUD:
         agent = db.query(Agent).filter(Agent.id == agent_id, Agent.user_id == user_id).first()
         if agent:
             agent.is_default = True
-            db.commit()
-            db.refresh(agent)
+            db.flush()
         return agent
 
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Date, DateTime, Text, ForeignKey, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -6,16 +6,49 @@ from app.core.database import Base
 
 class Diary(Base):
     __tablename__ = "diaries"
+    __table_args__ = (
+        # 按用户本地日期查询（某天、某周的日记，日历统计）
+        Index("ix_diaries_user_id_local_date", "user_id", "local_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     title = Column(String(200), nullable=False)
     content = Column(Text, nullable=False)
+    excerpt = Column(String(200))  # 正文摘要，写入时由content生成，列表接口只读取它而不读取正文
     mood = Column(String(20), default="neutral")  # happy, sad, angry, neutral, etc.
-    tags = Column(Text)  # JSON字符串存储标签
+    tags = Column(Text)  # 标签名列表的JSON副本，列表展示直接读取；按标签筛选和统计使用diary_tags
     is_private = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    local_date = Column(Date)  # created_at在用户时区中的日期，写入时维护
 
     # 关系
-    user = relationship("User", back_populates="diaries")
\ No newline at end of file
+    user = relationship("User", back_populates="diaries")
+
+
+class Tag(Base):
+    """用户的日记标签，diary_count为使用该标签的日记数（写入日记时增量维护），用于标签云"""
+    __tablename__ = "tags"
+    __table_args__ = (
+        UniqueConstraint("user_id", "name", name="uq_tags_user_id_name"),
+        # 标签云按使用次数排序
+        Index("ix_tags_user_id_diary_count", "user_id", "diary_count"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    name = Column(String(50), nullable=False)
+    diary_count = Column(Integer, default=0, nullable=False, server_default="0")
+
+
+class DiaryTag(Base):
+    """日记与标签的关联"""
+    __tablename__ = "diary_tags"
+    __table_args__ = (
+        # 按标签筛选日记
+        Index("ix_diary_tags_tag_id_diary_id", "tag_id", "diary_id"),
+    )
+
+    diary_id = Column(Integer, ForeignKey("diaries.id"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id"), primary_key=True)
@@ -1,8 +1,11 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Float
+from sqlalchemy import Column, DDL, Integer, Index, String, DateTime, Text, ForeignKey, Boolean, Float, event, literal_column
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 
+# 浏览排序键：未评分的条目排在最后（NULL在PostgreSQL和SQLite中的排序位置不同，统一映射为-1）
+UNRATED = -1
+
 
 class Entertainment(Base):
     __tablename__ = "entertainment"
@@ -22,12 +25,65 @@ class Entertainment(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        # 按类型浏览、按评分降序的keyset分页；表达式须与查询中的rating_key()一致才能走索引
+        Index("ix_entertainment_type_rating_id", type, func.coalesce(rating, literal_column(str(UNRATED))), id),
+        # 目录导入按 (来源, 外部ID) 去重upsert；两者之一为空的条目不受约束
+        Index("uq_entertainment_source_external_id", source, external_id, unique=True),
+    )
+
     # 关系
     favorites = relationship("Favorite", back_populates="entertainment")
 
+    @classmethod
+    def rating_key(cls):
+        return func.coalesce(cls.rating, literal_column(str(UNRATED)))
+
+
+# 全文检索索引（标题、类型、简介的子串匹配，中文可用）：
+# SQLite 使用 FTS5 trigram 外部内容表，由触发器与 entertainment 表同步；PostgreSQL 使用 pg_trgm GIN 索引。
+# create_all 时由这里创建，已有数据库由迁移创建。
+SQLITE_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS entertainment_fts USING fts5("
+    "title, genre, description, content='entertainment', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS entertainment_fts_ai AFTER INSERT ON entertainment BEGIN "
+    "INSERT INTO entertainment_fts(rowid, title, genre, description) "
+    "VALUES (new.id, new.title, new.genre, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS entertainment_fts_ad AFTER DELETE ON entertainment BEGIN "
+    "INSERT INTO entertainment_fts(entertainment_fts, rowid, title, genre, description) "
+    "VALUES ('delete', old.id, old.title, old.genre, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS entertainment_fts_au AFTER UPDATE OF title, genre, description ON entertainment BEGIN "
+    "INSERT INTO entertainment_fts(entertainment_fts, rowid, title, genre, description) "
+    "VALUES ('delete', old.id, old.title, old.genre, old.description); "
+    "INSERT INTO entertainment_fts(rowid, title, genre, description) "
+    "VALUES (new.id, new.title, new.genre, new.description); END",
+)
+# 查询中的检索文档表达式须与索引表达式一致
+POSTGRES_SEARCH_DOCUMENT = (
+    "(entertainment.title || ' ' || coalesce(entertainment.genre, '') || ' ' || coalesce(entertainment.description, ''))"
+)
+POSTGRES_SEARCH_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_entertainment_search_trgm ON entertainment USING gin "
+    "((title || ' ' || coalesce(genre, '') || ' ' || coalesce(description, '')) gin_trgm_ops)",
+)
+
+for _statement in SQLITE_SEARCH_DDL:
+    event.listen(Entertainment.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+for _statement in POSTGRES_SEARCH_DDL:
+    event.listen(Entertainment.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+event.listen(
+    Entertainment.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS entertainment_fts").execute_if(dialect="sqlite")
+)
+
 
 class Favorite(Base):
     __tablename__ = "favorites"
+    __table_args__ = (
+        # 收藏列表：按用户（和状态）筛选、按收藏时间倒序
+        Index("ix_favorites_user_id_status_created_at", "user_id", "status", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -40,4 +96,25 @@ class Favorite(Base):
 
     # 关系
     user = relationship("User", back_populates="favorites")
-    entertainment = relationship("Entertainment", back_populates="favorites")
\ No newline at end of file
+    entertainment = relationship("Entertainment", back_populates="favorites")
+
+
+class EntertainmentNeighbor(Base):
+    """条目的相似条目（item-item协同过滤的top-K邻居），由离线任务根据收藏计算"""
+    __tablename__ = "entertainment_neighbors"
+    __table_args__ = (
+        # 增量计算时查找把某些条目列为邻居的条目
+        Index("ix_entertainment_neighbors_neighbor_id", "neighbor_id"),
+    )
+
+    entertainment_id = Column(Integer, ForeignKey("entertainment.id"), primary_key=True)
+    neighbor_id = Column(Integer, ForeignKey("entertainment.id"), primary_key=True)
+    score = Column(Float, nullable=False)  # 余弦相似度
+
+
+class EntertainmentFavoriteSignature(Base):
+    """上次计算相似度时每个条目的收藏摘要，摘要变化的条目在下次增量计算时重新计算"""
+    __tablename__ = "entertainment_favorite_signatures"
+
+    entertainment_id = Column(Integer, ForeignKey("entertainment.id"), primary_key=True)
+    signature = Column(String(40), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Float
+from sqlalchemy import Column, Integer, String, DateTime, Date, Text, ForeignKey, Boolean, Float, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -6,6 +6,9 @@ from app.core.database import Base
 
 class Goal(Base):
     __tablename__ = "goals"
+    __table_args__ = (
+        Index("ix_goals_user_id_created_at", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -23,13 +26,26 @@ class Goal(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # 打卡记录的增量聚合，由 CRUDGoalLog.create_with_goal 维护
+    log_count = Column(Integer, default=0, nullable=False, server_default="0")
+    log_sum = Column(Float, default=0, nullable=False, server_default="0")
+    last_value = Column(Float)
+    last_logged_at = Column(DateTime(timezone=True))
+    last_log_date = Column(Date)  # 最近一次打卡在用户时区中的日期，用于计算连续天数
+    current_streak = Column(Integer, default=0, nullable=False, server_default="0")
+    longest_streak = Column(Integer, default=0, nullable=False, server_default="0")
+
     # 关系
     user = relationship("User", back_populates="goals")
     logs = relationship("GoalLog", back_populates="goal", cascade="all, delete-orphan")
+    rollups = relationship("GoalLogRollup", back_populates="goal", cascade="all, delete-orphan")
 
 
 class GoalLog(Base):
     __tablename__ = "goal_logs"
+    __table_args__ = (
+        Index("ix_goal_logs_goal_id_created_at", "goal_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     goal_id = Column(Integer, ForeignKey("goals.id"), nullable=False)
@@ -38,4 +54,24 @@ class GoalLog(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # 关系
-    goal = relationship("Goal", back_populates="logs")
\ No newline at end of file
+    goal = relationship("Goal", back_populates="logs")
+
+class GoalLogRollup(Base):
+    """打卡记录按天/按周的汇总，用于趋势图"""
+    __tablename__ = "goal_log_rollups"
+    __table_args__ = (
+        UniqueConstraint("goal_id", "period", "period_start", name="uq_goal_log_rollups_goal_period"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    goal_id = Column(Integer, ForeignKey("goals.id"), nullable=False)
+    period = Column(String(10), nullable=False)  # day, week
+    period_start = Column(Date, nullable=False)  # 当天或当周周一
+    count = Column(Integer, default=0, nullable=False)
+    sum = Column(Float, default=0, nullable=False)
+    min_value = Column(Float)
+    max_value = Column(Float)
+    last_value = Column(Float)
+
+    # 关系
+    goal = relationship("Goal", back_populates="rollups")
@@ -1,11 +1,25 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Date, DateTime, Text, ForeignKey, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from app.core.database import Base
 
 
 class Schedule(Base):
     __tablename__ = "schedules"
+    __table_args__ = (
+        # 按用户和时间范围查询（今日、未来N天、按周同步）
+        Index("ix_schedules_user_id_start_time", "user_id", "start_time"),
+        # 按用户本地日期查询（今天、本周、日历）
+        Index("ix_schedules_user_id_local_date", "user_id", "local_date"),
+        # 提醒调度器按时间窗口加载到期提醒
+        Index("ix_schedules_reminder_time", "reminder_time"),
+        # 只索引重复日程，按窗口展开时先取出用户的全部规则
+        Index(
+            "ix_schedules_user_id_recurring", "user_id", "recurrence_until",
+            postgresql_where=text("rrule IS NOT NULL"),
+            sqlite_where=text("rrule IS NOT NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -19,8 +33,39 @@ class Schedule(Base):
     is_all_day = Column(Boolean, default=False)
     is_completed = Column(Boolean, default=False)
     reminder_time = Column(DateTime(timezone=True))  # 提醒时间
+    reminder_sent_until = Column(DateTime(timezone=True))  # 该时间点及之前的提醒已发送（或创建、修改时已过期）
+    local_date = Column(Date)  # start_time在用户时区中的日期，写入时维护
+    # 重复规则（RFC 5545 RRULE，如 FREQ=WEEKLY;BYDAY=MO,WE），为空表示单次日程；
+    # start_time/end_time/reminder_time 是第一个实例的时间
+    rrule = Column(String(500))
+    recurrence_until = Column(DateTime(timezone=True))  # 最后一个实例的开始时间，无限重复为空
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # 关系
-    user = relationship("User", back_populates="schedules")
\ No newline at end of file
+    user = relationship("User", back_populates="schedules")
+    exceptions = relationship("ScheduleException", back_populates="schedule", cascade="all, delete-orphan")
+
+
+class ScheduleException(Base):
+    """重复日程中单个实例的修改或取消，以实例原本的开始时间标识"""
+    __tablename__ = "schedule_exceptions"
+    __table_args__ = (
+        UniqueConstraint("schedule_id", "original_start", name="uq_schedule_exceptions_schedule_start"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    schedule_id = Column(Integer, ForeignKey("schedules.id", ondelete="CASCADE"), nullable=False)
+    original_start = Column(DateTime(timezone=True), nullable=False)
+    is_cancelled = Column(Boolean, default=False, nullable=False)
+    # 以下字段为空表示沿用重复日程的值
+    title = Column(String(200))
+    description = Column(Text)
+    start_time = Column(DateTime(timezone=True))
+    end_time = Column(DateTime(timezone=True))
+    location = Column(String(200))
+    is_completed = Column(Boolean)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    schedule = relationship("Schedule", back_populates="exceptions")
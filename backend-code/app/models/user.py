@@ -16,6 +16,7 @@ class User(Base):
     is_superuser = Column(Boolean, default=False)
     avatar_url = Column(String(500))
     bio = Column(Text)
+    timezone = Column(String(50), default="UTC", server_default="UTC", nullable=False)  # IANA时区名，决定“今天”等按天统计的边界
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -50,4 +50,35 @@ class AssistantConfig(AssistantConfigBase):
 
 
 class AssistantConfigResponse(AssistantConfig):
-    pass
\ No newline at end of file
+    pass
+
+
+# 列表接口可选的字段（/api/settings/assistants 与 /api/ai/configs 共用）
+ASSISTANT_CONFIG_FIELDS = tuple(AssistantConfig.model_fields)
+ASSISTANT_CONFIG_SUMMARY_FIELDS = (
+    "id", "name", "description", "model", "icon", "is_default", "is_active", "created_at", "updated_at",
+)
+
+
+class AssistantConfigListItem(BaseModel):
+    """助手配置列表项：按 view/fields 只返回请求的字段（摘要视图不含prompt和config）"""
+    id: Optional[int] = None
+    user_id: Optional[int] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+    prompt: Optional[str] = None
+    model: Optional[str] = None
+    temperature: Optional[str] = None
+    max_tokens: Optional[int] = None
+    top_p: Optional[str] = None
+    frequency_penalty: Optional[str] = None
+    presence_penalty: Optional[str] = None
+    icon: Optional[str] = None
+    is_default: Optional[bool] = None
+    is_active: Optional[bool] = None
+    config: Optional[Dict[str, Any]] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
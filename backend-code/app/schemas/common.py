@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+# 单次批量请求的最大条目数
+BULK_MAX_ITEMS = 500
+
+
+class BulkIdsRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class BulkResult(BaseModel):
+    count: int
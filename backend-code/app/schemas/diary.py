@@ -1,6 +1,6 @@
 from pydantic import BaseModel, field_validator
 from typing import Optional, List, Union
-from datetime import datetime
+from datetime import date, datetime
 import json
 
 
@@ -24,28 +24,68 @@ class DiaryUpdate(BaseModel):
     is_private: Optional[bool] = None
 
 
+def load_tags(v):
+    """把数据库中的标签JSON字符串解析为列表"""
+    if v is None:
+        return None
+    if isinstance(v, str):
+        try:
+            return json.loads(v)
+        except (json.JSONDecodeError, TypeError):
+            # 如果解析失败，返回空列表或原字符串
+            return []
+    return v
+
+
 class Diary(DiaryBase):
     id: int
     user_id: int
+    excerpt: Optional[str] = None  # 正文摘要
     created_at: datetime
     updated_at: Optional[datetime] = None
+    local_date: Optional[date] = None  # 创建时间在用户时区中的日期
 
     @field_validator('tags', mode='before')
     @classmethod
     def parse_tags(cls, v):
-        if v is None:
-            return None
-        if isinstance(v, str):
-            try:
-                return json.loads(v)
-            except (json.JSONDecodeError, TypeError):
-                # 如果解析失败，返回空列表或原字符串
-                return []
-        return v
+        return load_tags(v)
 
     class Config:
         from_attributes = True
 
 
 class DiaryResponse(Diary):
-    pass
\ No newline at end of file
+    pass
+
+
+class DiaryListItem(BaseModel):
+    """日记列表项：按 view/fields 只返回请求的字段，未请求的字段不出现在响应中"""
+    id: Optional[int] = None
+    user_id: Optional[int] = None
+    title: Optional[str] = None
+    content: Optional[str] = None
+    excerpt: Optional[str] = None
+    mood: Optional[str] = None
+    tags: Optional[List[str]] = None
+    is_private: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    local_date: Optional[date] = None
+
+    @field_validator('tags', mode='before')
+    @classmethod
+    def parse_tags(cls, v):
+        return load_tags(v)
+
+    class Config:
+        from_attributes = True
+
+
+class TagCount(BaseModel):
+    name: str
+    count: int  # 带有该标签的日记数
+
+
+class DiaryDayCount(BaseModel):
+    day: date  # 用户时区中的日期
+    count: int
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -30,6 +30,25 @@ class EntertainmentResponse(Entertainment):
     pass
 
 
+class EntertainmentPage(BaseModel):
+    """目录浏览/搜索的一页，next_cursor为空表示没有下一页"""
+    items: List[EntertainmentResponse]
+    next_cursor: Optional[str] = None
+
+
+class RecommendedEntertainment(EntertainmentResponse):
+    """推荐条目，score为合并相似度得到的推荐得分（没有收藏时按评分推荐，得分为空）"""
+    score: Optional[float] = None
+
+
+class CatalogueImportResult(BaseModel):
+    processed: int
+    upserted: int
+    skipped: int
+    elapsed_seconds: float
+    rows_per_second: float
+
+
 class FavoriteBase(BaseModel):
     status: str = "want"  # want, watching, finished
     rating: Optional[float] = None
@@ -59,4 +78,30 @@ class Favorite(FavoriteBase):
 
 
 class FavoriteResponse(Favorite):
-    pass
\ No newline at end of file
+    pass
+
+
+class EntertainmentSummary(BaseModel):
+    """收藏列表中嵌入的条目摘要（字段与 app.db.entertainment.FAVORITE_ENTERTAINMENT_FIELDS 一致）"""
+    id: int
+    title: str
+    type: str
+    rating: Optional[float] = None
+    year: Optional[int] = None
+    genre: Optional[str] = None
+    director: Optional[str] = None
+    image_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class FavoriteListItem(FavoriteBase):
+    id: int
+    entertainment_id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    entertainment: EntertainmentSummary
+
+    class Config:
+        from_attributes = True
\ No newline at end of file
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
-from datetime import datetime
+from datetime import date, datetime
 
 
 class GoalBase(BaseModel):
@@ -34,6 +34,10 @@ class GoalUpdate(BaseModel):
     is_completed: Optional[bool] = None
 
 
+class GoalBulkUpdateItem(GoalUpdate):
+    id: int
+
+
 class Goal(GoalBase):
     id: int
     user_id: int
@@ -55,7 +59,7 @@ class GoalLogBase(BaseModel):
 
 
 class GoalLogCreate(GoalLogBase):
-    goal_id: int
+    goal_id: Optional[int] = None  # 通过 /api/goals/{goal_id}/logs 创建时取路径参数
 
 
 class GoalLog(GoalLogBase):
@@ -68,4 +72,34 @@ class GoalLog(GoalLogBase):
 
 
 class GoalLogResponse(GoalLog):
-    pass
\ No newline at end of file
+    pass
+
+
+class GoalProgress(BaseModel):
+    """目标进度与打卡统计（直接读取增量聚合值）"""
+    goal_id: int
+    target_value: Optional[float] = None
+    current_value: float
+    unit: Optional[str] = None
+    progress_percent: Optional[float] = None
+    is_completed: bool
+    log_count: int
+    log_sum: float
+    average_value: Optional[float] = None
+    last_value: Optional[float] = None
+    last_logged_at: Optional[datetime] = None
+    current_streak: int
+    longest_streak: int
+
+
+class GoalRollup(BaseModel):
+    period: str
+    period_start: date
+    count: int
+    sum: float
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+    last_value: Optional[float] = None
+
+    class Config:
+        from_attributes = True
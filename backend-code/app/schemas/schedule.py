@@ -1,6 +1,15 @@
-from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
+from datetime import date, datetime
+
+from app.schemas.common import BULK_MAX_ITEMS
+from app.services.recurrence import normalize_rrule
+
+
+def _validate_rrule(value: Optional[str]) -> Optional[str]:
+    if value is None or not value.strip():
+        return None
+    return normalize_rrule(value)
 
 
 class ScheduleBase(BaseModel):
@@ -13,6 +22,9 @@ class ScheduleBase(BaseModel):
     priority: str = "medium"  # high, medium, low
     is_all_day: bool = False
     reminder_time: Optional[datetime] = None
+    rrule: Optional[str] = Field(None, description="重复规则，如 FREQ=WEEKLY;BYDAY=MO,WE,FR")
+
+    _normalize_rrule = field_validator('rrule')(_validate_rrule)
 
 
 class ScheduleCreate(ScheduleBase):
@@ -30,12 +42,33 @@ class ScheduleUpdate(BaseModel):
     is_all_day: Optional[bool] = None
     is_completed: Optional[bool] = None
     reminder_time: Optional[datetime] = None
+    rrule: Optional[str] = None  # 传空字符串或null取消重复
+
+    _normalize_rrule = field_validator('rrule')(_validate_rrule)
+
+
+class ScheduleBulkUpdateItem(ScheduleUpdate):
+    id: int
+
+
+class ScheduleSyncRequest(BaseModel):
+    """一次提交的日程变更：新建、修改和删除在同一事务中完成"""
+    create: List[ScheduleCreate] = Field(default_factory=list, max_length=BULK_MAX_ITEMS)
+    update: List[ScheduleBulkUpdateItem] = Field(default_factory=list, max_length=BULK_MAX_ITEMS)
+    delete: List[int] = Field(default_factory=list, max_length=BULK_MAX_ITEMS)
+
+
+class ScheduleSyncResponse(BaseModel):
+    created: List[int]
+    updated: List[int]
+    deleted: List[int]
 
 
 class Schedule(ScheduleBase):
     id: int
     user_id: int
     is_completed: bool
+    local_date: Optional[date] = None  # 开始时间在用户时区中的日期
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -44,4 +77,37 @@ class Schedule(ScheduleBase):
 
 
 class ScheduleResponse(Schedule):
-    pass
\ No newline at end of file
+    pass
+
+
+class ScheduleOccurrence(ScheduleResponse):
+    """日程实例：单次日程本身，或重复日程在查询窗口内展开的一次发生
+
+    id为日程ID，(id, occurrence_start) 唯一标识一个实例。
+    """
+    occurrence_start: datetime
+    is_exception: bool = False
+
+
+class ScheduleExceptionBase(BaseModel):
+    is_cancelled: bool = False
+    title: Optional[str] = None
+    description: Optional[str] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    location: Optional[str] = None
+    is_completed: Optional[bool] = None
+
+
+class ScheduleExceptionCreate(ScheduleExceptionBase):
+    original_start: datetime
+
+
+class ScheduleExceptionResponse(ScheduleExceptionCreate):
+    id: int
+    schedule_id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
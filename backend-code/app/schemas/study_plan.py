@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+from typing import Optional, List
+
+
+class StudyPlanBatchRequest(BaseModel):
+    prompts: List[str]
+    concurrency: Optional[int] = None  # 不超过服务端配置的并发上限
@@ -1,7 +1,13 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, field_validator
 from typing import Optional
 from datetime import datetime
 
+from app.utils.timezone import DEFAULT_TIMEZONE, validate_timezone
+
+
+def _validate_timezone(value: Optional[str]) -> Optional[str]:
+    return validate_timezone(value) if value is not None else None
+
 
 class UserBase(BaseModel):
     username: str
@@ -9,6 +15,9 @@ class UserBase(BaseModel):
     full_name: Optional[str] = None
     bio: Optional[str] = None
     avatar_url: Optional[str] = None
+    timezone: str = DEFAULT_TIMEZONE  # IANA时区名，如 Asia/Shanghai
+
+    _check_timezone = field_validator('timezone')(_validate_timezone)
 
 
 class UserCreate(UserBase):
@@ -21,8 +30,11 @@ class UserUpdate(BaseModel):
     full_name: Optional[str] = None
     bio: Optional[str] = None
     avatar_url: Optional[str] = None
+    timezone: Optional[str] = None
     password: Optional[str] = None
 
+    _check_timezone = field_validator('timezone')(_validate_timezone)
+
 
 class User(UserBase):
     id: int
@@ -0,0 +1,150 @@
+"""
+娱乐目录批量导入：流式解析CSV/NDJSON目录文件，按 (source, external_id) 分批upsert
+
+文件逐行读取、逐批写入，内存占用与批大小有关，与文件大小无关。每条记录需要 title、type、external_id，
+source 可以由记录提供，也可以对整个文件指定默认值；缺少必填字段或字段格式错误的记录跳过并计数。
+"""
+import csv
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from sqlalchemy.orm import Session
+
+from app.db.entertainment import CATALOGUE_COLUMNS, ENTERTAINMENT_TYPES, entertainment as entertainment_crud
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_FORMATS = ("csv", "ndjson")
+# 每批upsert的行数；PostgreSQL上每批一次COPY
+INGEST_BATCH_SIZE = 10000
+# 最多在日志中记录的无效记录数
+MAX_LOGGED_ERRORS = 20
+
+# 各列的最大长度（与 entertainment 表一致），超长的值截断
+_MAX_LENGTHS = {
+    "title": 200, "type": 20, "genre": 100, "director": 100, "duration": 50, "image_url": 500,
+    "external_id": 100, "source": 50,
+}
+_NUMERIC_COLUMNS = {"rating": float, "year": int}
+
+
+@dataclass
+class IngestResult:
+    processed: int = 0
+    upserted: int = 0
+    skipped: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return round(self.processed / self.elapsed_seconds, 1) if self.elapsed_seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "elapsed_seconds": round(self.elapsed_seconds, 3), "rows_per_second": self.rows_per_second}
+
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    """按扩展名判断文件格式（.csv / .ndjson / .jsonl），无法判断时返回None"""
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+def iter_records(stream: TextIO, fmt: str) -> Iterator[Optional[Dict[str, Any]]]:
+    """逐条产出原始记录；NDJSON中无法解析的行产出None（计为跳过）"""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield None
+            continue
+        yield record if isinstance(record, dict) else None
+
+
+def _text(value: Any, key: str) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value[:_MAX_LENGTHS.get(key, len(value))] or None
+
+
+def _number(value: Any, cast: Callable[[Any], Any]) -> Any:
+    if value is None or value == "":
+        return None
+    return cast(value)
+
+
+def normalize_record(record: Dict[str, Any], default_source: Optional[str] = None) -> Dict[str, Any]:
+    """转换为 entertainment 的列值字典（包含CATALOGUE_COLUMNS的全部键），记录无效时抛出ValueError"""
+    row = {
+        key: _number(record.get(key), _NUMERIC_COLUMNS[key]) if key in _NUMERIC_COLUMNS else _text(record.get(key), key)
+        for key in CATALOGUE_COLUMNS
+    }
+    row["source"] = row["source"] or default_source
+    row["type"] = row["type"] and row["type"].lower()
+    for key in ("title", "type", "external_id", "source"):
+        if not row[key]:
+            raise ValueError(f"缺少{key}")
+    if row["type"] not in ENTERTAINMENT_TYPES:
+        raise ValueError(f"未知的type: {row['type']}")
+    return row
+
+
+def ingest_catalogue(
+    db: Session,
+    records: Iterable[Optional[Dict[str, Any]]],
+    *,
+    default_source: Optional[str] = None,
+    batch_size: int = INGEST_BATCH_SIZE,
+    commit_batches: bool = False,
+    on_batch: Optional[Callable[[IngestResult], None]] = None,
+) -> IngestResult:
+    """分批upsert目录记录，返回处理、写入和跳过的行数及耗时
+
+    commit_batches为True时每批写入后提交（命令行导入，中断后重新执行即可，upsert是幂等的）；
+    否则只flush，由调用方（请求的工作单元）统一提交。
+    """
+    result = IngestResult()
+    start = time.perf_counter()
+    batch: List[Dict[str, Any]] = []
+
+    def flush_batch() -> None:
+        result.upserted += entertainment_crud.upsert_catalogue(db, batch)
+        batch.clear()
+        if commit_batches:
+            db.commit()
+        result.elapsed_seconds = time.perf_counter() - start
+        if on_batch:
+            on_batch(result)
+
+    for record in records:
+        result.processed += 1
+        try:
+            if record is None:
+                raise ValueError("无法解析的记录")
+            batch.append(normalize_record(record, default_source))
+        except (ValueError, TypeError) as exc:
+            result.skipped += 1
+            if result.skipped <= MAX_LOGGED_ERRORS:
+                logger.warning(f"跳过目录记录: {exc}", extra={"record_number": result.processed})
+            continue
+        if len(batch) >= batch_size:
+            flush_batch()
+    if batch:
+        flush_batch()
+
+    result.elapsed_seconds = time.perf_counter() - start
+    logger.info("目录导入完成", extra=result.to_dict())
+    return result
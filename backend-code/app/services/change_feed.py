@@ -0,0 +1,325 @@
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, run_before_response
+from app.core.metrics import REDIS_OPERATIONS
+from app.core.redis import redis_client
+from app.services.versions import collection_versions
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "changes:"
+# 不针对用户的进程间信号（如唤醒提醒调度器），频道为 signals:<name>
+SIGNAL_PREFIX = "signals:"
+# 每个连接最多积压的事件数，超出后清空并要求客户端全量刷新
+QUEUE_SIZE = 100
+# SSE连接空闲时发送注释行的间隔，防止代理断开连接
+SSE_KEEPALIVE_SECONDS = 15
+# 禁止缓存和反向代理（nginx）缓冲事件流
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+LISTEN_RETRY_MAX_DELAY = 30.0
+# 关闭时等待后台线程发完已提交事务的事件的最长秒数
+OUTBOX_DRAIN_TIMEOUT = 5.0
+
+# 变更以 (资源名, 标识字段, 所属用户字段) 上报，默认为 (表名, "id", "user_id")；聊天消息按会话上报
+RESOURCE_KEYS = {
+    "chat_messages": ("chat_sessions", "session_id", "user_id"),
+    "users": ("users", "id", "id"),
+}
+
+_PENDING_KEY = "pending_changes"
+
+
+class Outbox:
+    """在后台线程中按提交顺序执行提交后的Redis写入
+
+    after_commit回调运行在提交所在的线程中，TransactionRoute在事件循环中提交，
+    同步的Redis网络调用放在这里执行，不阻塞事件循环。
+    """
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, job: Callable[[], None]) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="change-feed-outbox", daemon=True)
+                self._thread.start()
+        self._queue.put(job)
+
+    def drain(self, timeout: float) -> bool:
+        """等待已提交的任务执行完，返回是否在超时前完成"""
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                job()
+            except Exception as e:
+                logger.warning(f"提交后的变更推送失败 - 类型: {type(e).__name__}, 消息: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+
+class ChangeFeed:
+    """按用户分发的事件流（数据变更、日程提醒）
+
+    publish()可在任意线程中调用：redis模式下发布到 changes:<user_id> 频道，
+    每个worker用一条pub/sub连接订阅 changes:* 后分发给本进程的SSE连接；
+    local模式直接在进程内分发，只适用于单worker部署。
+    事务提交后的发布由outbox在后台线程中执行（见_publish_committed）。
+    signal()/on_signal() 在worker之间广播不带数据的信号，经同一条pub/sub连接接收。
+    """
+
+    def __init__(self, backend: str = "redis"):
+        if backend not in ("redis", "local"):
+            raise ValueError(f"不支持的变更推送后端: {backend}")
+        self.backend = backend
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._signal_handlers: Dict[str, List[Callable[[], None]]] = {}
+        self.outbox = Outbox()
+
+    def start(self) -> None:
+        """在当前事件循环中启动Redis订阅任务（重复调用无副作用）"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._subscribers = {}
+            self._task = None
+        if self.backend == "redis" and (self._task is None or self._task.done()):
+            self._task = loop.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if not await asyncio.to_thread(self.outbox.drain, OUTBOX_DRAIN_TIMEOUT):
+            logger.warning("关闭时仍有未发布的变更事件")
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        self.start()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+
+    def publish(self, user_id: int, payload: Dict[str, Any]) -> bool:
+        """发布一个事件（必须包含type字段），返回是否发布成功"""
+        if self.backend == "local":
+            loop = self._loop
+            if loop is None or loop.is_closed():
+                return True
+            try:
+                loop.call_soon_threadsafe(self._dispatch, user_id, payload)
+            except RuntimeError:
+                pass
+            return True
+        try:
+            redis_client.publish(f"{CHANNEL_PREFIX}{user_id}", json.dumps(payload, ensure_ascii=False, default=str))
+            REDIS_OPERATIONS.labels(operation="publish", result="ok").inc()
+            return True
+        except Exception:
+            REDIS_OPERATIONS.labels(operation="publish", result="error").inc()
+            return False
+
+    async def publish_async(self, user_id: int, payload: Dict[str, Any]) -> bool:
+        """在事件循环中发布：redis模式下同步的publish在线程池中执行，不阻塞事件循环"""
+        if self.backend == "local":
+            return self.publish(user_id, payload)
+        return await asyncio.to_thread(self.publish, user_id, payload)
+
+    def on_signal(self, name: str, handler: Callable[[], None]) -> None:
+        """登记信号的处理函数（在订阅任务所在的事件循环中调用，重复登记只保留一个）"""
+        handlers = self._signal_handlers.setdefault(name, [])
+        if handler not in handlers:
+            handlers.append(handler)
+
+    def signal(self, name: str) -> None:
+        """向所有worker（包括本进程）广播信号；可在任意线程中调用，发布由outbox在后台线程中执行
+
+        local模式只有一个进程，调用方已在本进程内处理，不做任何事。
+        """
+        if self.backend == "local":
+            return
+
+        def publish() -> None:
+            try:
+                redis_client.publish(f"{SIGNAL_PREFIX}{name}", "")
+                REDIS_OPERATIONS.labels(operation="publish", result="ok").inc()
+            except Exception:
+                REDIS_OPERATIONS.labels(operation="publish", result="error").inc()
+
+        self.outbox.submit(publish)
+
+    def _dispatch(self, user_id: int, payload: Dict[str, Any]) -> None:
+        for queue in self._subscribers.get(user_id, ()):
+            try:
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                # 客户端读取过慢，丢弃积压的事件，要求其全量刷新
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync"})
+
+    async def _listen(self) -> None:
+        import redis.asyncio as aioredis
+
+        delay = 1.0
+        while True:
+            client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*", f"{SIGNAL_PREFIX}*")
+                delay = 1.0
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    if message["channel"].startswith(SIGNAL_PREFIX):
+                        for handler in self._signal_handlers.get(message["channel"][len(SIGNAL_PREFIX):], ()):
+                            handler()
+                        continue
+                    user_id = int(message["channel"][len(CHANNEL_PREFIX):])
+                    if user_id in self._subscribers:
+                        self._dispatch(user_id, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"变更事件订阅中断，{delay:.0f}秒后重连 - 类型: {type(e).__name__}, 消息: {str(e)}")
+            finally:
+                try:
+                    await pubsub.aclose()
+                    await client.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, LISTEN_RETRY_MAX_DELAY)
+
+
+change_feed = ChangeFeed(settings.CHANGE_FEED_BACKEND)
+
+
+async def event_stream(user_id: int, types: Optional[Iterable[str]] = None) -> AsyncIterator[str]:
+    """把用户的事件编码为Server-Sent Events，types为空时推送全部类型"""
+    types = set(types) if types else None
+    queue = change_feed.subscribe(user_id)
+    try:
+        yield "event: ready\ndata: {}\n\n"
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if types is not None and payload["type"] not in types and payload["type"] != "resync":
+                continue
+            data = json.dumps(payload, ensure_ascii=False, default=str)
+            yield f"event: {payload['type']}\ndata: {data}\n\n"
+    finally:
+        change_feed.unsubscribe(user_id, queue)
+
+
+# ---- 数据变更采集 ----
+# ORM写入在after_flush中按对象采集，批量语句由CRUD层调用record_change()登记；
+# 事务提交后递增相应的集合版本（ETag），再按用户合并为一个change事件发布，回滚则丢弃。
+# 请求中的提交在发送响应前（线程池中）递增版本，客户端拿到响应后再读取不会命中旧的ETag；
+# redis模式下事件由后台线程发布。
+
+def record_change(db: Session, resource: str, user_id: int, action: str, ids: Iterable[Any]) -> None:
+    """登记当前事务中的变更（action: created, updated, deleted），提交后推送"""
+    if not settings.CHANGE_FEED_ENABLED:
+        return
+    pending: Dict[Tuple[int, str, str], Set[Any]] = db.info.setdefault(_PENDING_KEY, {})
+    pending.setdefault((user_id, resource, action), set()).update(ids)
+
+
+def record_object_change(db: Session, obj, action: str) -> None:
+    """登记单个ORM对象的变更（用于不经过flush的 INSERT/UPDATE/DELETE ... RETURNING）"""
+    key = _change_key(obj)
+    if key is not None:
+        resource, user_id, id = key
+        record_change(db, resource, user_id, action, (id,))
+
+
+def _change_key(obj) -> Optional[Tuple[str, int, Any]]:
+    table = obj.__tablename__
+    resource, key, user_field = RESOURCE_KEYS.get(table, (table, "id", "user_id"))
+    user_id = getattr(obj, user_field, None)
+    if user_id is None:
+        return None
+    return resource, user_id, getattr(obj, key)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_flushed(session: Session, flush_context) -> None:
+    if not settings.CHANGE_FEED_ENABLED:
+        return
+    for action, objects in (("created", session.new), ("updated", session.dirty), ("deleted", session.deleted)):
+        for obj in objects:
+            key = _change_key(obj)
+            if key is not None:
+                resource, user_id, id = key
+                record_change(session, resource, user_id, action, (id,))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publish_committed(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    versions = {(user_id, resource) for user_id, resource, _ in pending}
+    by_user: Dict[int, List[Dict[str, Any]]] = {}
+    for (user_id, resource, action), ids in pending.items():
+        by_user.setdefault(user_id, []).append({"resource": resource, "action": action, "ids": sorted(ids)})
+
+    def publish() -> None:
+        for user_id, changes in by_user.items():
+            change_feed.publish(user_id, {"type": "change", "changes": changes})
+
+    def deliver() -> None:
+        # 先递增版本再发布：客户端收到事件后重新请求时能拿到新的ETag
+        collection_versions.bump(versions)
+        if change_feed.backend == "local":
+            publish()
+        else:
+            change_feed.outbox.submit(publish)
+
+    if not run_before_response(session, deliver):
+        deliver()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,235 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.chat import ChatMessage
+from app.services.change_feed import record_change
+
+logger = logging.getLogger(__name__)
+
+SPOOL_PREFIX = "spool-"
+DEAD_LETTER_PREFIX = "dead-letter-"
+SPOOL_SUFFIX = ".ndjson"
+
+
+def is_transient_error(error: Exception) -> bool:
+    """重试可能成功的数据库错误：连接断开、数据库不可用或被锁定"""
+    if isinstance(error, (OperationalError, InterfaceError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+class ChatMessageWriter:
+    """聊天消息的批量后写队列
+
+    请求只负责把待写入的消息放入内存队列，后台任务在攒够batch_size条或
+    距上次写入超过flush_interval秒时，用一个短事务批量插入。
+    临时错误时该批消息留在队首，按指数退避（最长max_backoff秒）一直重试；约束错误等无法重试的消息
+    写入spool_dir下的死信文件（dead-letter-<pid>.ndjson），不阻塞后续消息。
+    应用关闭时调用stop()把队列中剩余的消息全部写入；重试max_retries次仍失败的消息
+    写入spool_dir下本进程的spool文件，下次start()时重新入队。
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 50,
+        flush_interval: float = 0.5,
+        max_retries: int = 3,
+        max_backoff: float = 30.0,
+        spool_dir: Optional[str] = None,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.spool_dir = spool_dir
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        """在当前事件循环中启动后台写入任务（重复调用无副作用）"""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        for message in self._load_spool():
+            self._queue.put_nowait(message)
+        self._task = loop.create_task(self._run())
+
+    def enqueue(self, message: Dict[str, Any]) -> None:
+        """加入一条待写入的消息（ChatMessage的列值字典）"""
+        # 未经启动事件（如脚本中直接调用）时在当前事件循环中懒启动
+        self.start()
+        self._queue.put_nowait(message)
+
+    async def stop(self) -> None:
+        """停止后台任务并写入队列中剩余的消息"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        remaining = []
+        while not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        if remaining:
+            unwritten = await self._flush(remaining, max_attempts=self.max_retries)
+            if unwritten:
+                self._spool(unwritten)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        batch: List[Dict[str, Any]] = []
+        try:
+            while True:
+                # 等待第一条消息，然后在flush_interval内尽量攒满一批
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                await self._flush(batch)
+                batch = []
+        except asyncio.CancelledError:
+            # 尚未写入的消息放回队首（保持写入顺序），由stop()统一写入
+            if batch:
+                queued = []
+                while not self._queue.empty():
+                    queued.append(self._queue.get_nowait())
+                for message in batch + queued:
+                    self._queue.put_nowait(message)
+            raise
+
+    async def _flush(self, batch: List[Dict[str, Any]], max_attempts: Optional[int] = None) -> List[Dict[str, Any]]:
+        """写入一批消息，返回未能写入的消息
+
+        临时错误（连接断开、数据库锁定等）按指数退避重试，max_attempts为None时一直重试直到成功；
+        其他错误（如用户或助手配置已删除导致外键约束失败）重试无用，拆分批次找出出错的消息写入死信文件，
+        其余消息照常写入，不阻塞后续消息。
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await asyncio.to_thread(self._write, batch)
+                return []
+            except Exception as e:
+                if not is_transient_error(e):
+                    return await self._isolate(batch, e, max_attempts)
+                logger.error(
+                    f"聊天消息批量写入失败 - 类型: {type(e).__name__}, 消息: {str(e)}",
+                    extra={"count": len(batch), "attempt": attempt}
+                )
+            if max_attempts is not None and attempt >= max_attempts:
+                return batch
+            await asyncio.sleep(min(self.flush_interval * 2 ** (attempt - 1), self.max_backoff))
+
+    async def _isolate(
+        self, batch: List[Dict[str, Any]], error: Exception, max_attempts: Optional[int]
+    ) -> List[Dict[str, Any]]:
+        """二分拆批：能写入的部分照常写入，单独写入仍失败的消息转入死信文件"""
+        if len(batch) == 1:
+            logger.error(
+                f"聊天消息无法写入，转入死信文件 - 类型: {type(error).__name__}, 消息: {str(error)}",
+                extra={"user_id": batch[0]["user_id"], "session_id": batch[0]["session_id"]}
+            )
+            self._append(self._dead_letter_path(), batch)
+            return []
+        middle = len(batch) // 2
+        remaining = await self._flush(batch[:middle], max_attempts)
+        return remaining + await self._flush(batch[middle:], max_attempts)
+
+    def _spool(self, batch: List[Dict[str, Any]]) -> None:
+        """关闭时仍无法写入数据库的消息写入本进程的spool文件，下次启动时重新入队"""
+        if not self.spool_dir:
+            logger.error("聊天消息无法写入且未配置spool目录", extra={"count": len(batch)})
+            return
+        path = os.path.join(self.spool_dir, f"{SPOOL_PREFIX}{os.getpid()}-{time.time_ns()}{SPOOL_SUFFIX}")
+        self._append(path, batch)
+        logger.warning("聊天消息暂存到spool文件，下次启动时写入", extra={"count": len(batch), "path": path})
+
+    def _dead_letter_path(self) -> Optional[str]:
+        if not self.spool_dir:
+            return None
+        return os.path.join(self.spool_dir, f"{DEAD_LETTER_PREFIX}{os.getpid()}{SPOOL_SUFFIX}")
+
+    def _append(self, path: Optional[str], batch: List[Dict[str, Any]]) -> None:
+        if path is None:
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for message in batch:
+                f.write(json.dumps({**message, "created_at": message["created_at"].isoformat()}, ensure_ascii=False))
+                f.write("\n")
+
+    def _load_spool(self) -> List[Dict[str, Any]]:
+        """读取并删除此前关闭时暂存的消息（按写入时间排序）
+
+        多个worker同时启动时，先把文件重命名为本进程认领的名称，重命名失败说明已被其他worker认领。
+        """
+        if not self.spool_dir or not os.path.isdir(self.spool_dir):
+            return []
+        messages = []
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not (name.startswith(SPOOL_PREFIX) and name.endswith(SPOOL_SUFFIX)):
+                continue
+            path = os.path.join(self.spool_dir, name)
+            claimed = f"{path}.{os.getpid()}.claimed"
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue
+            with open(claimed, encoding="utf-8") as f:
+                messages.extend(json.loads(line) for line in f if line.strip())
+            os.remove(claimed)
+        for message in messages:
+            message["created_at"] = datetime.fromisoformat(message["created_at"])
+        messages.sort(key=lambda message: message["created_at"])
+        if messages:
+            logger.info("重新写入spool文件中暂存的聊天消息", extra={"count": len(messages)})
+        return messages
+
+    @staticmethod
+    def _write(batch: List[Dict[str, Any]]) -> None:
+        db = SessionLocal()
+        try:
+            db.execute(insert(ChatMessage), batch)
+            sessions: Dict[int, set] = {}
+            for message in batch:
+                sessions.setdefault(message["user_id"], set()).add(message["session_id"])
+            for user_id, session_ids in sessions.items():
+                record_change(db, "chat_sessions", user_id, "updated", session_ids)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+chat_message_writer = ChatMessageWriter(
+    batch_size=settings.CHAT_WRITE_BATCH_SIZE,
+    flush_interval=settings.CHAT_WRITE_FLUSH_INTERVAL,
+    max_backoff=settings.CHAT_WRITE_MAX_BACKOFF,
+    spool_dir=settings.CHAT_WRITE_SPOOL_DIR,
+)
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 头像缩略图尺寸（正方形边长，像素）
+AVATAR_THUMBNAIL_SIZES = (64, 128, 256)
+THUMBNAIL_QUALITY = 80
+
+
+def thumbnail_path(original_path: str, size: int) -> str:
+    """原图对应的缩略图路径：与原图同目录，<原文件名>_<尺寸>.webp"""
+    stem = os.path.splitext(original_path)[0]
+    return f"{stem}_{size}.webp"
+
+
+def generate_thumbnails(original_path: str, sizes=AVATAR_THUMBNAIL_SIZES) -> Dict[int, str]:
+    """生成居中裁剪的正方形WebP缩略图，返回 {尺寸: 文件路径}
+
+    图片无法解析时抛出 PIL.UnidentifiedImageError。
+    """
+    results = {}
+    with Image.open(original_path) as image:
+        image.seek(0)  # GIF只取第一帧
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("P", "LA") else "RGB")
+
+        for size in sorted(sizes, reverse=True):
+            path = thumbnail_path(original_path, size)
+            ImageOps.fit(image, (size, size), Image.LANCZOS).save(
+                path, "WEBP", quality=THUMBNAIL_QUALITY, method=4
+            )
+            results[size] = path
+    return results
+
+
+class ImageService:
+    """图片处理服务
+
+    解码、缩放和编码都是CPU密集操作，放到独立的线程池中执行，避免阻塞事件循环。
+    Pillow在这些操作中会释放GIL，线程池即可利用多核。
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image")
+        return self._executor
+
+    async def create_thumbnails(self, original_path: str, sizes=AVATAR_THUMBNAIL_SIZES) -> Dict[int, str]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, generate_thumbnails, original_path, sizes)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+image_service = ImageService(max_workers=settings.IMAGE_WORKERS)
@@ -1,6 +1,8 @@
+import time
 import httpx
 from typing import List, Dict, Any, Optional
 from app.core.config import settings
+from app.core.metrics import VENDOR_CALLS, VENDOR_LATENCY
 from app.core.redis import RedisCache
 
 
@@ -28,6 +30,7 @@ class OpenAIService:
         # 尝试从缓存获取
         cached_response = self.cache.get(cache_key)
         if cached_response:
+            VENDOR_CALLS.labels(endpoint="chat_completions", outcome="cache_hit").inc()
             return cached_response
 
         headers = {
@@ -43,15 +46,23 @@ class OpenAIService:
             **kwargs
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                headers=headers,
-                json=data,
-                timeout=120.0  # 增加超时时间到120秒，支持知识库数据
-            )
-            response.raise_for_status()
-            result = response.json()
+        start = time.perf_counter()
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await client.post(
+                    f"{self.base_url}/chat/completions",
+                    headers=headers,
+                    json=data,
+                    timeout=120.0  # 增加超时时间到120秒，支持知识库数据
+                )
+                response.raise_for_status()
+                result = response.json()
+        except Exception:
+            VENDOR_CALLS.labels(endpoint="chat_completions", outcome="error").inc()
+            raise
+        finally:
+            VENDOR_LATENCY.labels(endpoint="chat_completions").observe(time.perf_counter() - start)
+        VENDOR_CALLS.labels(endpoint="chat_completions", outcome="success").inc()
 
         # 缓存结果
         self.cache.set(cache_key, result, expire=300)  # 5分钟缓存
@@ -0,0 +1,144 @@
+"""
+离线计算条目相似度（item-item协同过滤）
+
+由收藏构建稀疏的 用户×条目 矩阵（权重见 app.db.entertainment.favorite_weight），按列归一化后
+相乘得到条目间的余弦相似度，每个条目只保存top-K邻居。请求中推荐时只需合并用户收藏条目的邻居列表。
+
+增量计算：每个条目保存一份收藏摘要，摘要变化（收藏增删、状态或评分变化）的条目及与其共同被收藏、
+或邻居列表中包含它们的条目需要重新计算，其余条目的邻居列表保持不变。需要numpy和scipy。
+"""
+import hashlib
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.entertainment import entertainment_neighbor, favorite_signature, favorite_weight
+from app.models.entertainment import Favorite
+
+logger = logging.getLogger(__name__)
+
+# 每次相乘的条目行数，限制中间结果的内存
+SIMILARITY_CHUNK_SIZE = 1000
+
+
+@dataclass
+class RecomputeResult:
+    items: int = 0  # 有收藏的条目数
+    changed: int = 0  # 收藏摘要变化的条目数
+    recomputed: int = 0  # 重新计算邻居列表的条目数
+    neighbors: int = 0  # 写入的邻居数
+    elapsed_seconds: float = 0.0
+
+
+def _load_interactions(db: Session) -> Dict[Tuple[int, int], float]:
+    """{(用户ID, 条目ID): 权重}，同一用户重复收藏同一条目时取最大权重"""
+    weights: Dict[Tuple[int, int], float] = {}
+    for user_id, entertainment_id, status, rating in db.execute(
+        select(Favorite.user_id, Favorite.entertainment_id, Favorite.status, Favorite.rating)
+    ):
+        key = (user_id, entertainment_id)
+        weights[key] = max(weights.get(key, 0.0), favorite_weight(status, rating))
+    return weights
+
+
+def _signatures(weights: Dict[Tuple[int, int], float]) -> Dict[int, str]:
+    by_item: Dict[int, List[Tuple[int, float]]] = {}
+    for (user_id, entertainment_id), weight in weights.items():
+        by_item.setdefault(entertainment_id, []).append((user_id, weight))
+    return {
+        entertainment_id: hashlib.sha1(repr(sorted(entries)).encode("ascii")).hexdigest()
+        for entertainment_id, entries in by_item.items()
+    }
+
+
+def _top_k(indices: np.ndarray, data: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """稀疏行（列下标和得分）中得分最高的k列，按得分降序"""
+    if len(data) > k:
+        keep = np.argpartition(-data, k - 1)[:k]
+        indices, data = indices[keep], data[keep]
+    order = np.argsort(-data, kind="stable")
+    return indices[order], data[order]
+
+
+def _neighbor_rows(
+    db: Session, weights: Dict[Tuple[int, int], float], changed: Set[int], removed: Set[int], full: bool, top_k: int
+) -> Tuple[List[int], List[Dict[str, Any]]]:
+    """计算受影响条目的top-K邻居，返回 (重新计算的条目ID, 邻居行)"""
+    items = sorted({id for _, id in weights})
+    item_index = {id: index for index, id in enumerate(items)}
+    users = {user_id: index for index, user_id in enumerate(sorted({user_id for user_id, _ in weights}))}
+    matrix = sparse.csc_matrix(
+        (
+            np.fromiter(weights.values(), dtype=np.float64, count=len(weights)),
+            (
+                np.fromiter((users[user_id] for user_id, _ in weights), dtype=np.int64, count=len(weights)),
+                np.fromiter((item_index[id] for _, id in weights), dtype=np.int64, count=len(weights)),
+            ),
+        ),
+        shape=(len(users), len(items)),
+    )
+    # 按列L2归一化，列向量的内积即余弦相似度
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    normalized = (matrix @ sparse.diags(1.0 / norms)).tocsc()
+
+    # 需要重新计算的条目：收藏变化的条目、与其共同被收藏的条目、邻居列表中包含变化条目的条目
+    if full:
+        affected = list(range(len(items)))
+    else:
+        changed_columns = [item_index[id] for id in changed]
+        co_favorited = normalized[:, changed_columns].T @ normalized
+        stale = entertainment_neighbor.listed_by(db, neighbor_ids=changed | removed)
+        affected = sorted(
+            set(changed_columns) | set(co_favorited.indices.tolist()) | {item_index[id] for id in stale if id in item_index}
+        )
+
+    rows = []
+    transposed = normalized.T.tocsr()
+    for chunk_start in range(0, len(affected), SIMILARITY_CHUNK_SIZE):
+        chunk = affected[chunk_start:chunk_start + SIMILARITY_CHUNK_SIZE]
+        similarities = (transposed[chunk] @ normalized).tocsr()
+        for offset, column in enumerate(chunk):
+            row = slice(similarities.indptr[offset], similarities.indptr[offset + 1])
+            indices, data = similarities.indices[row], similarities.data[row]
+            others = (indices != column) & (data > 0)
+            neighbor_columns, scores = _top_k(indices[others], data[others], top_k)
+            rows.extend(
+                {"entertainment_id": items[column], "neighbor_id": items[neighbor], "score": score}
+                for neighbor, score in zip(neighbor_columns.tolist(), scores.tolist())
+            )
+    return [items[column] for column in affected], rows
+
+
+def recompute_similarities(db: Session, *, full: bool = False, top_k: Optional[int] = None) -> RecomputeResult:
+    """重新计算收藏变化所影响的条目的邻居列表（full为True时全部重新计算），只flush，由调用方提交"""
+    start = time.perf_counter()
+    top_k = top_k or settings.RECOMMENDATION_NEIGHBORS
+    result = RecomputeResult()
+
+    weights = _load_interactions(db)
+    signatures = _signatures(weights)
+    stored = favorite_signature.get_all(db)
+    removed = set(stored) - set(signatures)
+    changed = set(signatures) if full else {id for id, value in signatures.items() if stored.get(id) != value}
+    result.items, result.changed = len(signatures), len(changed) + len(removed)
+    if not changed and not removed and not full:
+        result.elapsed_seconds = time.perf_counter() - start
+        return result
+
+    recomputed_ids, rows = _neighbor_rows(db, weights, changed, removed, full, top_k) if weights else ([], [])
+    recomputed_ids += sorted(removed)
+    # 全量计算时清空整张邻居表，不残留任何已失效的列表
+    entertainment_neighbor.replace(db, entertainment_ids=None if full else recomputed_ids, rows=rows)
+    favorite_signature.replace(db, signatures={id: signatures[id] for id in changed}, removed=sorted(removed))
+
+    result.recomputed, result.neighbors = len(recomputed_ids), len(rows)
+    result.elapsed_seconds = time.perf_counter() - start
+    logger.info("条目相似度计算完成", extra={**asdict(result), "full": full})
+    return result
@@ -0,0 +1,191 @@
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from dateutil.rrule import rrule, rrulestr
+
+from app.utils.timezone import as_utc, from_local_naive, get_zone, local_date, to_local_naive
+
+# 日程只支持按天及以上粒度重复，避免单个规则在一个窗口内展开出大量实例
+ALLOWED_FREQS = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+MAX_RECURRENCE_COUNT = 5000
+# 单次查询最多展开的时间范围
+MAX_EXPANSION_DAYS = 366
+DST_MARGIN = timedelta(days=1)
+
+# 规则在用户时区的本地时间上展开（每周一9点在夏令时切换后仍是9点），
+# UNTIL统一按本地时间理解，Z后缀在规范化时去掉
+_UNTIL_UTC_RE = re.compile(r"(UNTIL=\d{8}(?:T\d{6})?)Z")
+
+# 实例字典中的时间字段（从缓存读出后需要还原为datetime）
+OCCURRENCE_DATETIME_FIELDS = (
+    "start_time", "end_time", "reminder_time", "occurrence_start", "created_at", "updated_at"
+)
+OCCURRENCE_DATE_FIELDS = ("local_date",)
+# 单次实例修改（ScheduleException）可以覆盖的字段
+EXCEPTION_OVERRIDE_FIELDS = ("title", "description", "start_time", "end_time", "location", "is_completed")
+
+
+def _rule_parts(text: str) -> Dict[str, str]:
+    parts = {}
+    for part in text.split(";"):
+        name, sep, value = part.partition("=")
+        if not sep:
+            raise ValueError(f"无效的重复规则片段: {part}")
+        parts[name] = value
+    return parts
+
+
+def parse_rrule(text: str, dtstart: datetime) -> rrule:
+    """解析规范化后的RRULE，dtstart为不带时区的本地时间"""
+    try:
+        rule = rrulestr(text, dtstart=dtstart)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"无效的重复规则: {e}") from e
+    if not isinstance(rule, rrule):
+        raise ValueError("只支持单条RRULE")
+    return rule
+
+
+def normalize_rrule(value: str) -> str:
+    """校验并规范化RRULE（如 FREQ=WEEKLY;BYDAY=MO,WE），去掉 RRULE: 前缀和UNTIL的Z后缀"""
+    text = value.strip().upper()
+    if text.startswith("RRULE:"):
+        text = text[len("RRULE:"):]
+    if not text or "\n" in text or ":" in text:
+        raise ValueError("只支持单条RRULE，不能包含DTSTART、EXDATE等属性")
+    text = _UNTIL_UTC_RE.sub(r"\1", text)
+
+    parts = _rule_parts(text)
+    if parts.get("FREQ") not in ALLOWED_FREQS:
+        raise ValueError(f"FREQ必须是 {', '.join(ALLOWED_FREQS)} 之一")
+    if "COUNT" in parts and "UNTIL" in parts:
+        raise ValueError("COUNT和UNTIL不能同时使用")
+    if "COUNT" in parts and not (parts["COUNT"].isdigit() and 0 < int(parts["COUNT"]) <= MAX_RECURRENCE_COUNT):
+        raise ValueError(f"COUNT必须在1到{MAX_RECURRENCE_COUNT}之间")
+
+    parse_rrule(text, datetime(2000, 1, 1))
+    return text
+
+
+def recurrence_until(text: Optional[str], start_time: datetime, tz: Optional[ZoneInfo] = None) -> Optional[datetime]:
+    """重复规则最后一个实例的开始时间（UTC）；单次日程返回None，无限重复也返回None"""
+    if not text:
+        return None
+    parts = _rule_parts(text)
+    if "COUNT" not in parts and "UNTIL" not in parts:
+        return None
+    tz = tz or get_zone(None)
+    dtstart = to_local_naive(start_time, tz)
+    try:
+        last = parse_rrule(text, dtstart)[-1]
+    except IndexError:
+        # UNTIL早于开始时间，没有任何实例
+        last = dtstart
+    return from_local_naive(last, tz)
+
+
+def is_occurrence(schedule, original_start: datetime, tz: Optional[ZoneInfo] = None) -> bool:
+    """original_start是否为重复日程的某个实例的开始时间"""
+    tz = tz or get_zone(None)
+    rule = parse_rrule(schedule.rrule, to_local_naive(schedule.start_time, tz))
+    return to_local_naive(original_start, tz) in rule
+
+
+def _base_fields(schedule) -> Dict[str, Any]:
+    return {
+        "id": schedule.id,
+        "user_id": schedule.user_id,
+        "title": schedule.title,
+        "description": schedule.description,
+        "location": schedule.location,
+        "category": schedule.category,
+        "priority": schedule.priority,
+        "is_all_day": bool(schedule.is_all_day),
+        "is_completed": bool(schedule.is_completed),
+        "rrule": schedule.rrule,
+        "created_at": as_utc(schedule.created_at),
+        "updated_at": as_utc(schedule.updated_at),
+        "is_exception": False,
+    }
+
+
+def single_occurrence(schedule) -> Dict[str, Any]:
+    """单次日程对应的实例"""
+    return {
+        **_base_fields(schedule),
+        "start_time": as_utc(schedule.start_time),
+        "end_time": as_utc(schedule.end_time),
+        "reminder_time": as_utc(schedule.reminder_time),
+        "occurrence_start": as_utc(schedule.start_time),
+        "local_date": schedule.local_date,
+    }
+
+
+def expand_schedule(schedule, start: datetime, end: datetime, tz: Optional[ZoneInfo] = None) -> List[Dict[str, Any]]:
+    """展开重复日程在[start, end)内开始的实例，应用单次修改和取消
+
+    规则按用户时区的本地时间展开，只计算窗口内的实例，开销与窗口内实例数和该规则的例外数成正比。
+    """
+    tz = tz or get_zone(None)
+    dtstart = to_local_naive(schedule.start_time, tz)
+    window_start, window_end = as_utc(start), as_utc(end)
+    duration = as_utc(schedule.end_time) - as_utc(schedule.start_time) if schedule.end_time else None
+    reminder_offset = (
+        as_utc(schedule.reminder_time) - as_utc(schedule.start_time) if schedule.reminder_time else None
+    )
+    exceptions = {as_utc(exc.original_start): exc for exc in schedule.exceptions}
+    base = _base_fields(schedule)
+
+    def occurrence(original: datetime) -> Dict[str, Any]:
+        return {
+            **base,
+            "start_time": original,
+            "end_time": original + duration if duration is not None else None,
+            "reminder_time": original + reminder_offset if reminder_offset is not None else None,
+            "occurrence_start": original,
+            "local_date": local_date(original, tz),
+        }
+
+    rule = parse_rrule(schedule.rrule, dtstart)
+    occurrences = []
+    # 本地时间窗口前后各放宽一天，夏令时切换附近的实例再按UTC精确过滤
+    for local_start in rule.between(
+        to_local_naive(window_start, tz) - DST_MARGIN, to_local_naive(window_end, tz) + DST_MARGIN, inc=True
+    ):
+        original = from_local_naive(local_start, tz)
+        if window_start <= original < window_end and original not in exceptions:
+            occurrences.append(occurrence(original))
+
+    # 被修改的实例可能移入或移出窗口，按修改后的开始时间判断
+    for original, exc in exceptions.items():
+        if exc.is_cancelled:
+            continue
+        item = occurrence(original)
+        for field in EXCEPTION_OVERRIDE_FIELDS:
+            value = getattr(exc, field)
+            if value is not None:
+                item[field] = as_utc(value) if isinstance(value, datetime) else value
+        if exc.start_time is not None:
+            item["local_date"] = local_date(item["start_time"], tz)
+            if exc.end_time is None and duration is not None:
+                item["end_time"] = item["start_time"] + duration
+            if reminder_offset is not None:
+                item["reminder_time"] = item["start_time"] + reminder_offset
+        item["is_exception"] = True
+        if window_start <= item["start_time"] < window_end:
+            occurrences.append(item)
+
+    return occurrences
+
+
+def decode_occurrence(item: Dict[str, Any]) -> Dict[str, Any]:
+    """把缓存中序列化为字符串的时间字段还原为datetime"""
+    for field in OCCURRENCE_DATETIME_FIELDS:
+        if isinstance(item.get(field), str):
+            item[field] = datetime.fromisoformat(item[field])
+    for field in OCCURRENCE_DATE_FIELDS:
+        if isinstance(item.get(field), str):
+            item[field] = date.fromisoformat(item[field])
+    return item
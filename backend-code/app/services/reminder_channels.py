@@ -0,0 +1,129 @@
+import hashlib
+import hmac
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.services.change_feed import change_feed
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Reminder:
+    """一次待投递的提醒（单次日程或重复日程的某个实例）"""
+    schedule_id: int
+    user_id: int
+    title: str
+    location: Optional[str]
+    start_time: datetime
+    remind_at: datetime
+    occurrence_start: datetime
+
+    @property
+    def delivery_id(self) -> str:
+        """投递的幂等键，重试或故障转移后重复投递时保持不变"""
+        return f"{self.schedule_id}:{self.occurrence_start.isoformat()}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.delivery_id,
+            "schedule_id": self.schedule_id,
+            "user_id": self.user_id,
+            "title": self.title,
+            "location": self.location,
+            "start_time": self.start_time.isoformat(),
+            "remind_at": self.remind_at.isoformat(),
+            "occurrence_start": self.occurrence_start.isoformat(),
+        }
+
+
+class ReminderChannel:
+    """提醒投递渠道接口，send()失败时抛出异常，由调度器重试"""
+
+    name = "base"
+
+    async def send(self, reminder: Reminder) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class LogChannel(ReminderChannel):
+    """只写日志，用于开发环境和排查"""
+
+    name = "log"
+
+    async def send(self, reminder: Reminder) -> None:
+        logger.info(f"日程提醒: {reminder.title}", extra=reminder.to_dict())
+
+
+class WebhookChannel(ReminderChannel):
+    """以JSON POST投递到外部地址
+
+    X-LifeLog-Delivery 为幂等键，接收方应按它去重（投递语义是至少一次）；
+    配置了密钥时 X-LifeLog-Signature 为请求体的HMAC-SHA256签名。
+    """
+
+    name = "webhook"
+
+    def __init__(self, url: str, secret: Optional[str] = None, timeout: float = 10.0):
+        self.url = url
+        self.secret = secret
+        self._client = httpx.AsyncClient(timeout=timeout)
+
+    async def send(self, reminder: Reminder) -> None:
+        body = json.dumps(reminder.to_dict(), ensure_ascii=False).encode("utf-8")
+        headers = {
+            "Content-Type": "application/json",
+            "X-LifeLog-Event": "schedule.reminder",
+            "X-LifeLog-Delivery": reminder.delivery_id,
+        }
+        if self.secret:
+            digest = hmac.new(self.secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+            headers["X-LifeLog-Signature"] = f"sha256={digest}"
+        response = await self._client.post(self.url, content=body, headers=headers)
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class SSEChannel(ReminderChannel):
+    """经用户事件流推送（GET /api/schedule/reminders/stream 或 /api/changes/stream）
+
+    事件经Redis pub/sub分发，客户端连接在任意副本上都能收到；用户不在线时提醒不会保留，
+    离线提醒应同时配置webhook渠道。
+    """
+
+    name = "sse"
+
+    async def send(self, reminder: Reminder) -> None:
+        if not await change_feed.publish_async(reminder.user_id, {"type": "reminder", **reminder.to_dict()}):
+            raise RuntimeError("提醒事件发布失败")
+
+
+sse_channel = SSEChannel()
+
+
+def create_channels(names: str) -> List[ReminderChannel]:
+    """按逗号分隔的渠道名创建投递渠道"""
+    channels: List[ReminderChannel] = []
+    for name in filter(None, (part.strip().lower() for part in names.split(","))):
+        if name == "log":
+            channels.append(LogChannel())
+        elif name == "webhook":
+            if not settings.REMINDER_WEBHOOK_URL:
+                raise ValueError("使用webhook提醒渠道时必须配置REMINDER_WEBHOOK_URL")
+            channels.append(WebhookChannel(settings.REMINDER_WEBHOOK_URL, settings.REMINDER_WEBHOOK_SECRET))
+        elif name == "sse":
+            channels.append(sse_channel)
+        else:
+            raise ValueError(f"不支持的提醒渠道: {name}")
+    return channels
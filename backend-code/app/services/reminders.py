@@ -0,0 +1,363 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.core.leader import AdvisoryLock
+from app.core.metrics import REMINDER_DELIVERIES
+from app.models.schedule import Schedule
+from app.models.user import User
+from app.services.change_feed import change_feed
+from app.services.recurrence import expand_schedule
+from app.services.reminder_channels import Reminder, ReminderChannel, create_channels
+from app.utils.timezone import as_utc, get_zone
+
+logger = logging.getLogger(__name__)
+
+# 写入触发的重新加载至少间隔多少秒，批量写入时合并为一次
+REFILL_DEBOUNCE_SECONDS = 1.0
+# 日程写入后广播给所有副本的信号，领导者收到后重新加载（写入可能由非领导者副本处理）
+REFILL_SIGNAL = "reminders_refill"
+RETRY_BASE_DELAY = 2.0
+RETRY_MAX_DELAY = 300.0
+
+
+def load_reminders(db: Session, start: datetime, end: datetime) -> List[Reminder]:
+    """提醒时间在(start, end]内且尚未发送的提醒，按提醒时间升序
+
+    单次日程走 reminder_time 索引；重复日程取出设置了提醒的规则，按用户时区展开窗口内的实例。
+    schedules.reminder_sent_until 是每个日程已发送提醒的水位，水位及之前的提醒不再加载。
+    """
+    start, end = as_utc(start), as_utc(end)
+    reminders: List[Reminder] = []
+
+    singles = db.query(Schedule).filter(
+        Schedule.rrule.is_(None),
+        Schedule.reminder_time > start,
+        Schedule.reminder_time <= end,
+        or_(Schedule.is_completed.is_(None), Schedule.is_completed == False),
+        or_(Schedule.reminder_sent_until.is_(None), Schedule.reminder_time > Schedule.reminder_sent_until),
+    )
+    for schedule_obj in singles:
+        start_time = as_utc(schedule_obj.start_time)
+        reminders.append(Reminder(
+            schedule_id=schedule_obj.id,
+            user_id=schedule_obj.user_id,
+            title=schedule_obj.title,
+            location=schedule_obj.location,
+            start_time=start_time,
+            remind_at=as_utc(schedule_obj.reminder_time),
+            occurrence_start=start_time,
+        ))
+
+    # 第一个实例的提醒晚于窗口的规则不会有窗口内的提醒
+    rules = (
+        db.query(Schedule, User.timezone)
+        .join(User, User.id == Schedule.user_id)
+        .options(selectinload(Schedule.exceptions))
+        .filter(Schedule.rrule.isnot(None), Schedule.reminder_time.isnot(None), Schedule.reminder_time <= end)
+    )
+    for rule, tz_name in rules:
+        offset = as_utc(rule.reminder_time) - as_utc(rule.start_time)
+        if rule.recurrence_until is not None and as_utc(rule.recurrence_until) + offset <= start:
+            continue
+        watermark = as_utc(rule.reminder_sent_until)
+        # 提醒时间在(start, end]内的实例，开始时间在(start - offset, end - offset]内
+        for item in expand_schedule(rule, start - offset, end - offset + timedelta(seconds=1), get_zone(tz_name)):
+            remind_at = item["reminder_time"]
+            if not start < remind_at <= end or item["is_completed"]:
+                continue
+            if watermark is not None and remind_at <= watermark:
+                continue
+            reminders.append(Reminder(
+                schedule_id=rule.id,
+                user_id=rule.user_id,
+                title=item["title"],
+                location=item["location"],
+                start_time=item["start_time"],
+                remind_at=remind_at,
+                occurrence_start=item["occurrence_start"],
+            ))
+
+    reminders.sort(key=lambda reminder: (reminder.remind_at, reminder.schedule_id))
+    return reminders
+
+
+def mark_delivered(db: Session, reminder: Reminder) -> None:
+    """把日程的提醒水位推进到该提醒的时间（不回退，不修改updated_at）
+
+    水位之前的提醒不再加载，调用方必须保证该日程更早的提醒都已投递完成（见ReminderDispatcher._complete）。
+    """
+    table = Schedule.__table__
+    db.execute(
+        update(table)
+        .where(
+            table.c.id == reminder.schedule_id,
+            or_(table.c.reminder_sent_until.is_(None), table.c.reminder_sent_until < reminder.remind_at)
+        )
+        .values(reminder_sent_until=reminder.remind_at, updated_at=table.c.updated_at)
+    )
+    db.commit()
+
+
+@dataclass
+class _Delivery:
+    reminder: Reminder
+    channels: List[ReminderChannel]  # 尚未投递成功的渠道
+    attempts: int = 0
+    due_at: datetime = field(init=False)
+
+    def __post_init__(self):
+        self.due_at = self.reminder.remind_at
+
+
+class ReminderDispatcher:
+    """进程内的日程提醒调度器
+
+    只把未来lookahead秒内（以及catchup秒内错过）的提醒从数据库加载到按提醒时间排序的堆中，
+    睡眠到堆顶到期再投递，不逐分钟轮询全表。日程写入后调用notify()触发重新加载（经change_feed的信号
+    广播到所有副本，由领导者处理），另外每隔refill_interval秒按时间窗口重新加载一次。
+
+    投递语义为至少一次：所有渠道成功后才推进数据库中的发送水位，进程在两者之间退出时会重复投递，
+    接收方按Reminder.delivery_id去重。重复日程的水位只推进到连续完成的前缀：较晚的实例先完成而
+    更早的实例仍在重试时，暂不推进水位，否则重启后更早的实例会被水位跳过而丢失。
+    多副本部署时只有持有advisory lock的副本投递。
+    """
+
+    def __init__(
+        self,
+        channels: str = "log",
+        lookahead: float = 300,
+        refill_interval: float = 60,
+        catchup: float = 3600,
+        max_retries: int = 5,
+        lock_key: int = 0,
+    ):
+        self.channel_names = channels
+        self.lookahead = timedelta(seconds=lookahead)
+        self.refill_interval = refill_interval
+        self.catchup = timedelta(seconds=catchup)
+        self.max_retries = max_retries
+        self._lock = AdvisoryLock(engine, lock_key)
+        self._channels: Optional[List[ReminderChannel]] = None
+        self._heap: List[Tuple[datetime, int, _Delivery]] = []
+        self._retrying: Dict[str, _Delivery] = {}
+        # 已完成投递、但同一日程还有更早的提醒未完成而暂不推进水位的提醒 {日程ID: {delivery_id: 提醒}}
+        self._held: Dict[int, Dict[str, Reminder]] = {}
+        self._seq = itertools.count()
+        self._dirty = True
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        """在当前事件循环中启动调度任务（重复调用无副作用）"""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        if self._channels is None:
+            self._channels = create_channels(self.channel_names)
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._dirty = True
+        change_feed.on_signal(REFILL_SIGNAL, self._notify_local)
+        self._task = loop.create_task(self._run())
+
+    def notify(self) -> None:
+        """日程写入后调用，唤醒本进程和其他副本的调度器重新加载提醒窗口；可在任意线程中调用"""
+        self._notify_local()
+        if settings.REMINDER_ENABLED:
+            change_feed.signal(REFILL_SIGNAL)
+
+    def _notify_local(self) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed() or self._task is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+    async def stop(self) -> None:
+        """停止调度并释放领导权，未投递的提醒由下一个领导者（或重启后）补发"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._heap.clear()
+        await asyncio.to_thread(self._lock.release)
+        for channel in self._channels or ():
+            await channel.close()
+
+    def _wake(self) -> None:
+        self._dirty = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_refill = last_refill = 0.0
+        is_leader = False
+        while True:
+            now = loop.time()
+            if now >= next_refill or (self._dirty and is_leader and now - last_refill >= REFILL_DEBOUNCE_SECONDS):
+                is_leader = await self._check_leader()
+                if is_leader:
+                    await self._refill()
+                    last_refill = loop.time()
+                else:
+                    self._heap.clear()
+                    self._held.clear()
+                next_refill = loop.time() + self.refill_interval
+
+            if is_leader:
+                await self._dispatch_due()
+
+            timeout = next_refill - loop.time()
+            if is_leader and self._heap:
+                due_in = (self._heap[0][0] - datetime.now(timezone.utc)).total_seconds()
+                timeout = min(timeout, due_in)
+            if self._dirty and is_leader:
+                timeout = min(timeout, last_refill + REFILL_DEBOUNCE_SECONDS - loop.time())
+            await self._sleep(max(timeout, 0))
+
+    async def _sleep(self, timeout: float) -> None:
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _check_leader(self) -> bool:
+        try:
+            return await asyncio.to_thread(self._lock.acquire)
+        except Exception as e:
+            logger.error(f"获取提醒调度领导权失败 - 类型: {type(e).__name__}, 消息: {str(e)}")
+            return False
+
+    async def _refill(self) -> None:
+        """按[现在 - catchup, 现在 + lookahead]重建堆，保留正在重试的提醒"""
+        self._dirty = False
+        now = datetime.now(timezone.utc)
+        try:
+            reminders = await asyncio.to_thread(self._load, now - self.catchup, now + self.lookahead)
+        except Exception as e:
+            logger.error(f"加载日程提醒失败 - 类型: {type(e).__name__}, 消息: {str(e)}")
+            return
+
+        heap = [(delivery.due_at, next(self._seq), delivery) for delivery in self._retrying.values()]
+        held = {delivery_id for reminders_held in self._held.values() for delivery_id in reminders_held}
+        for reminder in reminders:
+            if reminder.delivery_id not in self._retrying and reminder.delivery_id not in held:
+                delivery = _Delivery(reminder, list(self._channels))
+                heap.append((delivery.due_at, next(self._seq), delivery))
+        heapq.heapify(heap)
+        self._heap = heap
+
+    async def _dispatch_due(self) -> None:
+        while self._heap and self._heap[0][0] <= datetime.now(timezone.utc):
+            _, _, delivery = heapq.heappop(self._heap)
+            await self._deliver(delivery)
+
+    async def _deliver(self, delivery: _Delivery) -> None:
+        reminder = delivery.reminder
+        failed = []
+        for channel in delivery.channels:
+            try:
+                await channel.send(reminder)
+                REMINDER_DELIVERIES.labels(channel=channel.name, result="ok").inc()
+            except Exception as e:
+                REMINDER_DELIVERIES.labels(channel=channel.name, result="error").inc()
+                logger.warning(
+                    f"日程提醒投递失败 - 渠道: {channel.name}, 类型: {type(e).__name__}, 消息: {str(e)}",
+                    extra={"delivery_id": reminder.delivery_id, "attempt": delivery.attempts + 1}
+                )
+                failed.append(channel)
+
+        if failed:
+            delivery.attempts += 1
+            if delivery.attempts < self.max_retries:
+                # 只重试失败的渠道，指数退避
+                delivery.channels = failed
+                delay = min(RETRY_BASE_DELAY * 2 ** (delivery.attempts - 1), RETRY_MAX_DELAY)
+                delivery.due_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+                self._retrying[reminder.delivery_id] = delivery
+                heapq.heappush(self._heap, (delivery.due_at, next(self._seq), delivery))
+                return
+            logger.error(
+                "日程提醒重试次数已用尽，放弃投递",
+                extra={"delivery_id": reminder.delivery_id, "channels": [channel.name for channel in failed]}
+            )
+
+        self._retrying.pop(reminder.delivery_id, None)
+        await self._complete(reminder)
+
+    def _has_pending_before(self, schedule_id: int, remind_at: datetime) -> bool:
+        """同一日程是否还有更早的提醒在等待投递或重试"""
+        return any(
+            delivery.reminder.schedule_id == schedule_id and delivery.reminder.remind_at < remind_at
+            for _, _, delivery in self._heap
+        )
+
+    async def _complete(self, reminder: Reminder) -> None:
+        """提醒投递完成（成功或放弃）：把水位推进到没有更早的未完成提醒的最晚一个已完成提醒"""
+        held = self._held.setdefault(reminder.schedule_id, {})
+        held[reminder.delivery_id] = reminder
+        ready = [item for item in held.values() if not self._has_pending_before(reminder.schedule_id, item.remind_at)]
+        if not ready:
+            return
+        latest = max(ready, key=lambda item: item.remind_at)
+        try:
+            await asyncio.to_thread(self._mark, latest)
+        except Exception as e:
+            # 水位未推进，下次加载时会重复投递
+            logger.error(
+                f"记录提醒发送状态失败 - 类型: {type(e).__name__}, 消息: {str(e)}",
+                extra={"delivery_id": latest.delivery_id}
+            )
+        for item in ready:
+            held.pop(item.delivery_id, None)
+        if not held:
+            del self._held[reminder.schedule_id]
+
+    @staticmethod
+    def _load(start: datetime, end: datetime) -> List[Reminder]:
+        db = SessionLocal()
+        try:
+            return load_reminders(db, start, end)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _mark(reminder: Reminder) -> None:
+        db = SessionLocal()
+        try:
+            mark_delivered(db, reminder)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+reminder_dispatcher = ReminderDispatcher(
+    channels=settings.REMINDER_CHANNELS,
+    lookahead=settings.REMINDER_LOOKAHEAD_SECONDS,
+    refill_interval=settings.REMINDER_REFILL_INTERVAL,
+    catchup=settings.REMINDER_CATCHUP_SECONDS,
+    max_retries=settings.REMINDER_MAX_RETRIES,
+    lock_key=settings.REMINDER_LOCK_KEY,
+)
@@ -0,0 +1,314 @@
+import logging
+import os
+import shutil
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterable, AsyncIterator, Iterator, Optional
+from urllib.parse import quote
+
+import anyio
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# S3分片上传的最小分片为5MB
+S3_PART_SIZE = 8 * 1024 * 1024
+
+
+def attachment_disposition(filename: str) -> str:
+    """下载文件的Content-Disposition，非ASCII文件名按RFC 5987编码"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+@dataclass
+class BlobInfo:
+    key: str
+    size: int
+    modified: datetime
+
+
+class BlobStorage:
+    """文件存储后端接口
+
+    key是命名空间内的相对路径（如 avatars/avatar_xxx.png），与具体后端无关。
+    """
+
+    async def put_file(self, key: str, path: str, content_type: Optional[str] = None,
+                       cache_control: Optional[str] = None) -> None:
+        """把本地文件存入key，完成后源文件被移走或删除"""
+        raise NotImplementedError
+
+    async def put_stream(self, key: str, chunks: AsyncIterable[bytes], content_type: Optional[str] = None,
+                         cache_control: Optional[str] = None) -> None:
+        """把异步字节流写入key，不在内存中缓存完整内容"""
+        raise NotImplementedError
+
+    def iter_bytes(self, key: str) -> AsyncIterator[bytes]:
+        """按块读取key的内容，不存在时抛出FileNotFoundError"""
+        raise NotImplementedError
+
+    async def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    async def delete(self, *keys: str) -> None:
+        """删除对象，忽略不存在的key"""
+        raise NotImplementedError
+
+    def list(self, prefix: str = "") -> Iterator[BlobInfo]:
+        """列出prefix下的对象（同步，供清理脚本使用）"""
+        raise NotImplementedError
+
+    def url(self, key: str, download_name: Optional[str] = None) -> Optional[str]:
+        """客户端可直接下载的地址（公开地址或预签名URL）；返回None表示需要由应用自行返回内容"""
+        return None
+
+
+class LocalStorage(BlobStorage):
+    """本地磁盘存储，适用于单机部署或挂载了共享卷的多副本部署"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        if os.path.commonpath([os.path.abspath(path), os.path.abspath(self.root)]) != os.path.abspath(self.root):
+            raise ValueError(f"非法的存储路径: {key}")
+        return path
+
+    async def put_file(self, key, path, content_type=None, cache_control=None):
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        await anyio.to_thread.run_sync(shutil.move, path, target)
+
+    async def put_stream(self, key, chunks, content_type=None, cache_control=None):
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp = f"{target}.part"
+        try:
+            async with await anyio.open_file(temp, "wb") as f:
+                async for chunk in chunks:
+                    await f.write(chunk)
+            os.replace(temp, target)
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+    async def iter_bytes(self, key):
+        async with await anyio.open_file(self.path(key), "rb") as f:
+            while chunk := await f.read(CHUNK_SIZE):
+                yield chunk
+
+    async def exists(self, key):
+        return os.path.isfile(self.path(key))
+
+    async def delete(self, *keys):
+        for key in keys:
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+
+    def list(self, prefix=""):
+        directory = self.path(prefix) if prefix else self.root
+        if not os.path.isdir(directory):
+            return
+        for dirpath, _, filenames in os.walk(directory):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                stat = os.stat(path)
+                yield BlobInfo(
+                    key=os.path.relpath(path, self.root).replace(os.sep, "/"),
+                    size=stat.st_size,
+                    modified=datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+                )
+
+
+class S3Storage(BlobStorage):
+    """S3兼容对象存储（AWS S3、MinIO、OSS/COS的S3接口等）
+
+    下载通过预签名URL（或public_base_url指向的CDN/公开桶地址）直接从对象存储获取，
+    字节不经过API进程。boto3为同步客户端，所有调用放到线程池中执行。
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 access_key_id: Optional[str] = None, secret_access_key: Optional[str] = None,
+                 region: Optional[str] = None, public_base_url: Optional[str] = None,
+                 presign_expires: int = 3600):
+        try:
+            import boto3
+        except ImportError as e:
+            raise RuntimeError("使用S3存储需要安装boto3: pip install boto3") from e
+
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            region_name=region,
+        )
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.public_base_url = public_base_url.rstrip("/") if public_base_url else None
+        self.presign_expires = presign_expires
+
+    def object_key(self, key: str) -> str:
+        return f"{self.prefix}{key.lstrip('/')}"
+
+    @staticmethod
+    def _extra_args(content_type, cache_control) -> dict:
+        extra = {}
+        if content_type:
+            extra["ContentType"] = content_type
+        if cache_control:
+            extra["CacheControl"] = cache_control
+        return extra
+
+    async def put_file(self, key, path, content_type=None, cache_control=None):
+        # upload_file在文件较大时自动使用分片上传，按块读取磁盘
+        await anyio.to_thread.run_sync(
+            lambda: self.client.upload_file(
+                path, self.bucket, self.object_key(key),
+                ExtraArgs=self._extra_args(content_type, cache_control)
+            )
+        )
+        os.remove(path)
+
+    async def put_stream(self, key, chunks, content_type=None, cache_control=None):
+        object_key = self.object_key(key)
+        extra = self._extra_args(content_type, cache_control)
+        buffer = bytearray()
+        upload_id = None
+        parts = []
+
+        async def upload_part():
+            nonlocal upload_id
+            if upload_id is None:
+                response = await anyio.to_thread.run_sync(
+                    lambda: self.client.create_multipart_upload(Bucket=self.bucket, Key=object_key, **extra)
+                )
+                upload_id = response["UploadId"]
+            body, number = bytes(buffer), len(parts) + 1
+            buffer.clear()
+            response = await anyio.to_thread.run_sync(
+                lambda: self.client.upload_part(
+                    Bucket=self.bucket, Key=object_key, UploadId=upload_id, PartNumber=number, Body=body
+                )
+            )
+            parts.append({"ETag": response["ETag"], "PartNumber": number})
+
+        try:
+            async for chunk in chunks:
+                buffer.extend(chunk)
+                if len(buffer) >= S3_PART_SIZE:
+                    await upload_part()
+
+            if upload_id is None:
+                # 内容不足一个分片，直接单次上传
+                body = bytes(buffer)
+                await anyio.to_thread.run_sync(
+                    lambda: self.client.put_object(Bucket=self.bucket, Key=object_key, Body=body, **extra)
+                )
+                return
+
+            if buffer:
+                await upload_part()
+            await anyio.to_thread.run_sync(
+                lambda: self.client.complete_multipart_upload(
+                    Bucket=self.bucket, Key=object_key, UploadId=upload_id,
+                    MultipartUpload={"Parts": parts}
+                )
+            )
+        except BaseException:
+            if upload_id is not None:
+                await anyio.to_thread.run_sync(
+                    lambda: self.client.abort_multipart_upload(
+                        Bucket=self.bucket, Key=object_key, UploadId=upload_id
+                    )
+                )
+            raise
+
+    async def iter_bytes(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            response = await anyio.to_thread.run_sync(
+                lambda: self.client.get_object(Bucket=self.bucket, Key=self.object_key(key))
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                raise FileNotFoundError(key) from e
+            raise
+        body = response["Body"]
+        try:
+            while chunk := await anyio.to_thread.run_sync(body.read, CHUNK_SIZE):
+                yield chunk
+        finally:
+            body.close()
+
+    async def exists(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            await anyio.to_thread.run_sync(
+                lambda: self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+            )
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404", "NotFound"):
+                return False
+            raise
+
+    async def delete(self, *keys):
+        if not keys:
+            return
+        objects = [{"Key": self.object_key(key)} for key in keys]
+        await anyio.to_thread.run_sync(
+            lambda: self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": objects, "Quiet": True})
+        )
+
+    def list(self, prefix=""):
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.object_key(prefix)):
+            for item in page.get("Contents", []):
+                yield BlobInfo(
+                    key=item["Key"][len(self.prefix):],
+                    size=item["Size"],
+                    modified=item["LastModified"],
+                )
+
+    def url(self, key, download_name=None):
+        if self.public_base_url and not download_name:
+            return f"{self.public_base_url}/{self.object_key(key)}"
+        params = {"Bucket": self.bucket, "Key": self.object_key(key)}
+        if download_name:
+            params["ResponseContentDisposition"] = attachment_disposition(download_name)
+        return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=self.presign_expires)
+
+
+def create_storage(namespace: str, local_root: str) -> BlobStorage:
+    """按配置创建存储后端；namespace在S3中作为对象前缀，本地存储使用local_root目录"""
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            bucket=settings.S3_BUCKET,
+            prefix=namespace,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            region=settings.S3_REGION,
+            public_base_url=settings.S3_PUBLIC_BASE_URL,
+            presign_expires=settings.S3_PRESIGN_EXPIRES,
+        )
+    if settings.STORAGE_BACKEND != "local":
+        raise ValueError(f"不支持的存储后端: {settings.STORAGE_BACKEND}")
+    return LocalStorage(local_root)
+
+
+# 上传文件（头像等，通过 /uploads/<key> 访问）和日记导出文件（仅本人可下载）
+upload_storage = create_storage("uploads", settings.UPLOAD_DIR)
+export_storage = create_storage("exports", settings.EXPORT_DIR)
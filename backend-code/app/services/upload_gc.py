@@ -0,0 +1,74 @@
+import logging
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.services.storage import BlobStorage, export_storage, upload_storage
+
+logger = logging.getLogger(__name__)
+
+AVATAR_PREFIX = "avatars/"
+UPLOADS_URL_PREFIX = "/uploads/"
+# 单次批量删除的对象数（S3 DeleteObjects的上限为1000）
+DELETE_BATCH_SIZE = 1000
+
+# 派生文件后缀：缩略图 _<尺寸>.webp、预压缩 .br/.gz、上传中的临时文件 .part
+_DERIVED_SUFFIX_RE = re.compile(r"(_\d+\.webp)?(\.br|\.gz|\.part)?$")
+
+
+def avatar_stem(name: str) -> str:
+    """文件所属头像的主干名（去掉缩略图、预压缩后缀和扩展名）"""
+    name = _DERIVED_SUFFIX_RE.sub("", os.path.basename(name), count=1)
+    return os.path.splitext(name)[0]
+
+
+async def collect_orphaned_avatars(
+    db: Session,
+    storage: BlobStorage = upload_storage,
+    prefix: str = AVATAR_PREFIX,
+    grace_seconds: int = 3600,
+    dry_run: bool = False,
+) -> List[str]:
+    """删除没有被任何 users.avatar_url 引用的头像文件及其派生文件，返回被删除（或将删除）的key
+
+    修改时间在grace_seconds以内的文件跳过，避免误删正在上传、尚未写入数据库的头像。
+    """
+    referenced = {
+        avatar_stem(url)
+        for (url,) in db.query(User.avatar_url).filter(User.avatar_url.like(f"{UPLOADS_URL_PREFIX}%"))
+    }
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+
+    orphaned = [
+        blob.key for blob in storage.list(prefix)
+        if avatar_stem(blob.key) not in referenced and blob.modified <= cutoff
+    ]
+    if not dry_run:
+        for start in range(0, len(orphaned), DELETE_BATCH_SIZE):
+            await storage.delete(*orphaned[start:start + DELETE_BATCH_SIZE])
+
+    logger.info("孤立头像清理完成", extra={"removed": len(orphaned), "dry_run": dry_run})
+    return orphaned
+
+
+async def collect_expired_exports(
+    storage: BlobStorage = export_storage,
+    ttl_seconds: int = 24 * 3600,
+    dry_run: bool = False,
+) -> List[str]:
+    """删除修改时间早于ttl_seconds的导出文件（含写入中断残留的 .part），返回被删除（或将删除）的key
+
+    导出文件只在导出请求中下载一次（或通过预签名URL下载），ttl_seconds应大于预签名URL的有效期。
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=ttl_seconds)
+    expired = [blob.key for blob in storage.list() if blob.modified <= cutoff]
+    if not dry_run:
+        for start in range(0, len(expired), DELETE_BATCH_SIZE):
+            await storage.delete(*expired[start:start + DELETE_BATCH_SIZE])
+
+    logger.info("过期导出文件清理完成", extra={"removed": len(expired), "dry_run": dry_run})
+    return expired
@@ -0,0 +1,90 @@
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import REDIS_OPERATIONS
+from app.core.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "collection_version:{user_id}:{resource}"
+# 计数器的过期时间：递增和删除都失败时，旧版本号最多在这段时间内继续匹配旧的ETag
+VERSION_TTL_SECONDS = 24 * 3600
+
+
+def _initial_version() -> int:
+    """计数器的初始值取当前毫秒数：Redis数据丢失或进程重启后，新版本号仍大于之前发出的版本号"""
+    return time.time_ns() // 1_000_000
+
+
+class CollectionVersions:
+    """按 (用户, 资源) 维护的版本计数器，事务提交后由变更采集递增，用于生成ETag
+
+    redis模式下计数器在多个worker间共享；local模式保存在进程内，只适用于单worker部署。
+    读取失败时返回None，调用方不应返回304。递增失败时删除计数器，下次读取时以当前毫秒数重新初始化，
+    旧的ETag不再匹配。
+    """
+
+    def __init__(self, backend: str = "redis"):
+        self.backend = backend
+        self._local: Dict[Tuple[int, str], int] = {}
+        self._lock = threading.Lock()
+
+    def bump(self, keys: Iterable[Tuple[int, str]]) -> None:
+        keys = list(keys)
+        if not keys:
+            return
+        if self.backend == "local":
+            with self._lock:
+                for key in keys:
+                    self._local[key] = self._local.get(key, _initial_version()) + 1
+            return
+        names = [VERSION_KEY.format(user_id=user_id, resource=resource) for user_id, resource in keys]
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            for name in names:
+                pipe.set(name, _initial_version(), nx=True)
+                pipe.incr(name)
+                pipe.expire(name, VERSION_TTL_SECONDS)
+            pipe.execute()
+            REDIS_OPERATIONS.labels(operation="incr", result="ok").inc()
+        except Exception as e:
+            REDIS_OPERATIONS.labels(operation="incr", result="error").inc()
+            logger.warning(f"集合版本递增失败，删除计数器 - 类型: {type(e).__name__}, 消息: {str(e)}")
+            self._invalidate(names)
+
+    @staticmethod
+    def _invalidate(names: List[str]) -> None:
+        try:
+            redis_client.delete(*names)
+            REDIS_OPERATIONS.labels(operation="delete", result="ok").inc()
+        except Exception as e:
+            REDIS_OPERATIONS.labels(operation="delete", result="error").inc()
+            logger.error(
+                f"集合版本删除失败，旧ETag在计数器过期前可能仍被接受 - 类型: {type(e).__name__}, 消息: {str(e)}",
+                extra={"keys": names}
+            )
+
+    def get(self, user_id: int, resources: Iterable[str]) -> Optional[List[int]]:
+        """读取多个资源的当前版本，尚无版本时初始化"""
+        resources = list(resources)
+        if self.backend == "local":
+            with self._lock:
+                return [self._local.setdefault((user_id, resource), _initial_version()) for resource in resources]
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            for resource in resources:
+                name = VERSION_KEY.format(user_id=user_id, resource=resource)
+                pipe.set(name, _initial_version(), nx=True, ex=VERSION_TTL_SECONDS)
+                pipe.get(name)
+            values = pipe.execute()[1::2]
+            REDIS_OPERATIONS.labels(operation="get", result="hit").inc()
+            return [int(value) for value in values]
+        except Exception:
+            REDIS_OPERATIONS.labels(operation="get", result="error").inc()
+            return None
+
+
+collection_versions = CollectionVersions(settings.CHANGE_FEED_BACKEND)
@@ -1,10 +1,16 @@
-from fastapi import Depends, HTTPException, status
+import hashlib
+from typing import Callable, List, Literal, Optional, Sequence
+
+from fastapi import Depends, HTTPException, Query, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.security import verify_token
+from app.core.metrics import span
 from app.models.user import User
 from app.db.user import get_user_by_username
+from app.services.versions import collection_versions
 
 security = HTTPBearer()
 
@@ -15,10 +21,10 @@ def get_current_user(
 ) -> User:
     """获取当前用户"""
     token = credentials.credentials
-    payload = verify_token(token)
-    username = payload.get("sub")
-
-    user = get_user_by_username(db, username)
+    with span("auth"):
+        payload = verify_token(token)
+        username = payload.get("sub")
+        user = get_user_by_username(db, username)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -42,4 +48,64 @@ def get_current_superuser(current_user: User = Depends(get_current_user)) -> Use
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match按弱比较匹配（忽略W/前缀）"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def conditional_get(*resources: str) -> Callable[..., None]:
+    """集合读取接口的条件GET依赖
+
+    弱ETag由当前用户相关资源的版本号、查询参数和应用版本生成。If-None-Match匹配时直接返回304，
+    不执行列表查询和序列化；版本号在读取数据之前获取，读取期间发生的写入会在下次请求时生效。
+    """
+    def dependency(
+        request: Request,
+        response: Response,
+        current_user: User = Depends(get_current_active_user)
+    ) -> None:
+        if not settings.CHANGE_FEED_ENABLED:
+            return
+        versions = collection_versions.get(current_user.id, resources)
+        if versions is None:
+            return
+        digest = hashlib.sha1(
+            f"{settings.VERSION}|{current_user.id}|{versions}|{request.url.query}".encode("utf-8")
+        ).hexdigest()[:20]
+        etag = f'W/"{digest}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+
+    return dependency
+
+
+def field_selection(allowed: Sequence[str], summary: Sequence[str]) -> Callable[..., Optional[List[str]]]:
+    """列表接口的稀疏字段集依赖，返回要加载的字段（总是包含id），None表示完整字段
+
+    ?view=summary 返回预定义的摘要字段，?fields=a,b 返回指定字段（优先于view）。
+    CRUD层据此只查询这些列，路由用RowSerializer按字段集输出，响应中不出现未请求的字段。
+    """
+    def dependency(
+        view: Literal["full", "summary"] = Query("full", description="full返回完整字段，summary只返回摘要字段"),
+        fields: Optional[str] = Query(None, description=f"逗号分隔的字段列表，可选: {', '.join(allowed)}"),
+    ) -> Optional[List[str]]:
+        if fields:
+            selected = [name.strip() for name in fields.split(",") if name.strip()]
+            unknown = sorted(set(selected) - set(allowed))
+            if unknown:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"不支持的字段: {', '.join(unknown)}")
+            return list(dict.fromkeys(["id", *selected]))
+        if view == "summary":
+            return list(summary)
+        return None
+
+    return dependency
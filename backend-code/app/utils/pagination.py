@@ -0,0 +1,26 @@
+"""
+keyset分页游标：把上一页最后一条的排序键编码为不透明字符串，下一页从该位置之后继续
+"""
+import base64
+import json
+from typing import Any, List, Sequence
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    data = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """解码游标，应为size个数值；格式不对时抛出ValueError"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("无效的游标") from exc
+    if (
+        not isinstance(values, list)
+        or len(values) != size
+        or not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values)
+    ):
+        raise ValueError("无效的游标")
+    return values
@@ -0,0 +1,67 @@
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+DEFAULT_TIMEZONE = "UTC"
+
+
+def validate_timezone(name: str) -> str:
+    """校验IANA时区名（如 Asia/Shanghai），供Pydantic校验器使用"""
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"未知的时区: {name}")
+    return name
+
+
+def get_zone(name: Optional[str]) -> ZoneInfo:
+    """按名称获取时区，为空或无效时使用UTC"""
+    try:
+        return ZoneInfo(name or DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def as_utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """转换为不带时区的UTC时间（SQLite读出的时间不带时区，按UTC处理）"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """转换为带时区的UTC时间"""
+    if value is None:
+        return None
+    return as_utc_naive(value).replace(tzinfo=timezone.utc)
+
+
+def to_local_naive(value: datetime, tz: ZoneInfo) -> datetime:
+    """转换为用户时区的本地时间（不带时区）"""
+    return as_utc(value).astimezone(tz).replace(tzinfo=None)
+
+
+def from_local_naive(value: datetime, tz: ZoneInfo) -> datetime:
+    """用户时区的本地时间转换为带时区的UTC时间"""
+    return value.replace(tzinfo=tz).astimezone(timezone.utc)
+
+
+def local_date(value: Optional[datetime], tz: ZoneInfo) -> Optional[date]:
+    """时间点在用户时区中的日期"""
+    if value is None:
+        return None
+    return as_utc(value).astimezone(tz).date()
+
+
+def local_today(tz: ZoneInfo) -> date:
+    return datetime.now(tz).date()
+
+
+def local_day_start(day: date, tz: ZoneInfo) -> datetime:
+    """用户时区中某天0点对应的UTC时间"""
+    return from_local_naive(datetime.combine(day, time.min), tz)
+
+
+def week_start(day: date) -> date:
+    """所在周的周一"""
+    return day - timedelta(days=day.weekday())
@@ -0,0 +1,3 @@
+"""
+性能压测套件：本地模拟供应商、合成数据和场景定义，入口见 benchmarks/run.py
+"""
@@ -0,0 +1,109 @@
+"""
+本地模拟的OpenAI兼容供应商
+
+在当前进程的后台线程中启动一个uvicorn服务，实现 /chat/completions（支持stream）
+和 /models，延迟可配置，用于在不访问真实供应商的情况下压测AI相关接口。
+"""
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+STUDY_PLAN_CONTENT = json.dumps({
+    "title": "压测学习计划",
+    "priority": "Medium",
+    "tasks": [
+        {"title": "阅读基础资料", "duration": "30m"},
+        {"title": "完成练习", "duration": "1h"},
+        {"title": "复习总结", "duration": "30m"}
+    ]
+}, ensure_ascii=False)
+
+CHAT_CONTENT = "这是模拟供应商返回的回复，用于性能测试。" * 4
+
+
+def create_app(latency_ms: float = 200, jitter_ms: float = 50, stream_chunks: int = 8) -> FastAPI:
+    app = FastAPI()
+
+    async def simulated_latency():
+        delay = max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "fake-model")
+        system_prompt = next((m["content"] for m in body.get("messages", []) if m["role"] == "system"), "")
+        content = STUDY_PLAN_CONTENT if "学习计划" in system_prompt else CHAT_CONTENT
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+        if body.get("stream"):
+            async def stream():
+                step = max(1, len(content) // stream_chunks)
+                for i in range(0, len(content), step):
+                    await asyncio.sleep(latency_ms / 1000 / stream_chunks)
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": content[i:i + step]}, "finish_reason": None}]
+                    }
+                    yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(stream(), media_type="text/event-stream")
+
+        await simulated_latency()
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 50, "completion_tokens": 50, "total_tokens": 100}
+        }
+
+    @app.get("/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "gpt-3.5-turbo", "object": "model"}]}
+
+    return app
+
+
+class FakeVendor:
+    """在后台线程中运行模拟供应商"""
+
+    def __init__(self, latency_ms: float = 200, jitter_ms: float = 50, stream_chunks: int = 8):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        config = uvicorn.Config(
+            create_app(latency_ms, jitter_ms, stream_chunks),
+            host="127.0.0.1",
+            port=self.port,
+            log_level="warning",
+            access_log=False,
+        )
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "FakeVendor":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+性能压测入口
+
+在临时目录中创建全新的SQLite数据库并写入合成数据，启动本地模拟供应商，
+通过ASGI直接在进程内调用应用，统计每个场景的RPS和延迟分位数，
+并与保存的基线对比以发现性能回退。
+
+用法（在backend-code目录下）：
+    python -m benchmarks.run                          # 运行全部场景
+    python -m benchmarks.run -s chat -s history -n 500 -c 20
+    python -m benchmarks.run --save-baseline          # 把本次结果保存为基线
+
+基线与机器相关，不提交到仓库：在同一台机器（或同一个CI任务）上先用 --save-baseline 生成再对比。
+每个场景连同运行参数一起保存，参数不一致时拒绝对比（返回2）。
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, "benchmarks", "baseline.json")
+
+
+def percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_scenario(client, scenario, users: list, requests: int, concurrency: int, seed_value: int) -> dict:
+    """以固定并发执行场景，返回RPS和延迟统计（毫秒）"""
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker(worker_id: int):
+        nonlocal errors
+        rng = random.Random(seed_value + worker_id)
+        for i in counter:
+            user = users[i % len(users)]
+            start = time.perf_counter()
+            try:
+                response = await scenario(client, user, rng)
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "rps": round(requests / elapsed, 2),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2),
+    }
+
+
+def run_params(args) -> dict:
+    """影响压测结果的运行参数，随每个场景保存到基线中"""
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "users": args.users,
+        "diaries": args.diaries,
+        "chat_messages": args.chat_messages,
+        "catalogue": args.catalogue,
+        "favorites": args.favorites,
+        "vendor_latency_ms": args.vendor_latency_ms,
+        "vendor_jitter_ms": args.vendor_jitter_ms,
+        "seed": args.seed,
+    }
+
+
+def mismatched_params(results: dict, baseline: dict) -> list:
+    """返回运行参数与基线不一致（或基线未记录参数）的场景"""
+    return [
+        name for name, current in results.items()
+        if name in baseline and baseline[name].get("params") != current["params"]
+    ]
+
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    """返回回退列表：RPS下降或p95/p99上升超过容忍比例"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {previous['rps']} -> {current['rps']}")
+        for key in ("p95_ms", "p99_ms"):
+            if current[key] > previous[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {previous[key]} -> {current[key]}")
+        if current["errors"] > previous.get("errors", 0):
+            regressions.append(f"{name}: errors {previous.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="LifeLog AI 后端性能压测")
+    parser.add_argument("-s", "--scenario", action="append", dest="scenarios",
+                        help="要运行的场景（可重复），默认全部")
+    parser.add_argument("-n", "--requests", type=int, default=200, help="每个场景的请求数")
+    parser.add_argument("-c", "--concurrency", type=int, default=10, help="并发虚拟用户数")
+    parser.add_argument("--users", type=int, default=20, help="合成用户数量")
+    parser.add_argument("--diaries", type=int, default=50, help="每个用户的日记数量")
+    parser.add_argument("--chat-messages", type=int, default=40, help="每个用户的聊天记录数量")
+    parser.add_argument("--catalogue", type=int, default=2000, help="娱乐目录条目数量")
+    parser.add_argument("--favorites", type=int, default=200, help="每个用户的收藏数量")
+    parser.add_argument("--vendor-latency-ms", type=float, default=200, help="模拟供应商的平均延迟")
+    parser.add_argument("--vendor-jitter-ms", type=float, default=50, help="模拟供应商的延迟抖动")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线文件路径")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果写入基线文件")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的性能波动比例")
+    parser.add_argument("--output", help="把本次结果写入JSON文件")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    args.baseline = os.path.abspath(args.baseline)
+    if args.output:
+        args.output = os.path.abspath(args.output)
+
+    # 应用在导入时读取配置并创建数据库引擎，必须先准备好环境
+    workdir = tempfile.mkdtemp(prefix="lifelog_bench_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("METRICS_ENABLED", "False")
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(workdir)  # 导出文件和上传目录写在临时目录中
+
+    import httpx
+    from app.core.database import Base, SessionLocal, engine
+    from app.core.security import create_access_token
+    from benchmarks.fake_vendor import FakeVendor
+    from benchmarks.scenarios import SCENARIOS
+    from benchmarks.seed import seed
+    import main as app_main
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f"未知场景: {', '.join(unknown)}（可选: {', '.join(SCENARIOS)}）")
+        return 2
+
+    vendor = FakeVendor(latency_ms=args.vendor_latency_ms, jitter_ms=args.vendor_jitter_ms).start()
+    try:
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        try:
+            users = seed(
+                db,
+                users=args.users,
+                diaries_per_user=args.diaries,
+                chat_messages_per_user=args.chat_messages,
+                catalogue_items=args.catalogue,
+                favorites_per_user=args.favorites,
+                vendor_url=vendor.base_url,
+                seed_value=args.seed,
+            )
+        finally:
+            db.close()
+        for user in users:
+            token = create_access_token({"sub": user["username"]})
+            user["headers"] = {"Authorization": f"Bearer {token}"}
+
+        async def run_all() -> dict:
+            transport = httpx.ASGITransport(app=app_main.app)
+            # ASGITransport不发送lifespan事件，手动执行启动/关闭钩子（如后写队列的启动与清空）
+            async with app_main.app.router.lifespan_context(app_main.app), \
+                    httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+                results = {}
+                params = run_params(args)
+                for name in names:
+                    results[name] = await run_scenario(
+                        client, SCENARIOS[name], users, args.requests, args.concurrency, args.seed
+                    )
+                    results[name]["params"] = params
+                    r = results[name]
+                    print(
+                        f"{name:<14} rps={r['rps']:>8}  p50={r['p50_ms']:>8}ms  p95={r['p95_ms']:>8}ms  "
+                        f"p99={r['p99_ms']:>8}ms  errors={r['errors']}",
+                        flush=True
+                    )
+                return results
+
+        results = asyncio.run(run_all())
+    finally:
+        vendor.stop()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"基线已保存: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"❌ 未找到基线文件: {args.baseline}，使用 --save-baseline 生成")
+        return 2
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    missing = [name for name in results if name not in baseline]
+    if missing:
+        print(f"⚠️ 基线中没有以下场景，未做对比: {', '.join(missing)}")
+    mismatched = mismatched_params(results, baseline)
+    if mismatched:
+        print(f"❌ 以下场景的运行参数与基线不一致，无法对比: {', '.join(mismatched)}，请用相同参数运行或重新生成基线")
+        return 2
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print("❌ 发现性能回退:")
+        for line in regressions:
+            print(f"   {line}")
+        return 1
+    print("✅ 与基线相比没有性能回退")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
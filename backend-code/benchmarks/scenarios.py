@@ -0,0 +1,122 @@
+"""
+压测场景
+
+每个场景是一个协程：接收 httpx.AsyncClient、当前虚拟用户和随机数生成器，
+发出一次（或一组）请求并返回最后的响应，状态码>=400视为失败。
+"""
+import json
+import random
+
+import httpx
+
+from benchmarks.seed import BENCH_PASSWORD, CATALOGUE_WORDS, DIARY_KEYWORDS
+
+
+async def login(client: httpx.AsyncClient, user: dict, rng: random.Random) -> httpx.Response:
+    return await client.post(
+        "/api/auth/login",
+        json={"username": user["username"], "password": BENCH_PASSWORD},
+    )
+
+
+async def chat(client: httpx.AsyncClient, user: dict, rng: random.Random) -> httpx.Response:
+    return await client.post(
+        "/api/ai/chat",
+        headers=user["headers"],
+        json={"message": f"帮我总结一下最近的{rng.choice(DIARY_KEYWORDS)}情况", "session_id": user["session_id"]},
+    )
+
+
+async def history(client: httpx.AsyncClient, user: dict, rng: random.Random) -> httpx.Response:
+    return await client.get(f"/api/ai/chat/history/{user['session_id']}", headers=user["headers"])
+
+
+async def diary_list(client: httpx.AsyncClient, user: dict, rng: random.Random) -> httpx.Response:
+    return await client.get("/api/diary/", headers=user["headers"], params={"limit": 50})
+
+
+async def diary_list_summary(client: httpx.AsyncClient, user: dict, rng: random.Random) -> httpx.Response:
+    return await client.get("/api/diary/", headers=user["headers"], params={"limit": 50, "view": "summary"})
+
+
+async def diary_search(client: httpx.AsyncClient, user: dict, rng: random.Random) -> httpx.Response:
+    return await client.get(
+        "/api/diary/",
+        headers=user["headers"],
+        params={"keyword": rng.choice(DIARY_KEYWORDS), "limit": 20},
+    )
+
+
+async def diary_tag(client: httpx.AsyncClient, user: dict, rng: random.Random) -> httpx.Response:
+    """按标签筛选日记，并获取标签云"""
+    response = await client.get(
+        "/api/diary/", headers=user["headers"], params={"tag": rng.choice(DIARY_KEYWORDS), "limit": 20}
+    )
+    if response.status_code >= 400:
+        return response
+    return await client.get("/api/diary/tags", headers=user["headers"])
+
+
+async def entertainment_browse(client: httpx.AsyncClient, user: dict, rng: random.Random) -> httpx.Response:
+    """按评分浏览电影目录的前两页（第二页通过游标取得）"""
+    response = await client.get("/api/entertainment/movies", headers=user["headers"], params={"limit": 20})
+    if response.status_code >= 400 or not response.json()["next_cursor"]:
+        return response
+    return await client.get(
+        "/api/entertainment/movies", headers=user["headers"],
+        params={"limit": 20, "cursor": response.json()["next_cursor"]}
+    )
+
+
+async def entertainment_search(client: httpx.AsyncClient, user: dict, rng: random.Random) -> httpx.Response:
+    keyword = rng.choice(CATALOGUE_WORDS) + rng.choice(CATALOGUE_WORDS)[0]
+    return await client.get(
+        f"/api/entertainment/{rng.choice(['movies', 'books', 'games', 'music'])}",
+        headers=user["headers"], params={"search": keyword, "limit": 20}
+    )
+
+
+async def favorites_list(client: httpx.AsyncClient, user: dict, rng: random.Random) -> httpx.Response:
+    """一页200条收藏（内嵌条目摘要），以及按状态筛选的一页"""
+    response = await client.get("/api/entertainment/favorites", headers=user["headers"], params={"limit": 200})
+    if response.status_code >= 400:
+        return response
+    return await client.get(
+        "/api/entertainment/favorites", headers=user["headers"],
+        params={"status": rng.choice(["want", "watching", "finished"]), "limit": 50}
+    )
+
+
+async def import_export(client: httpx.AsyncClient, user: dict, rng: random.Random) -> httpx.Response:
+    exported = await client.get("/api/diary/export", headers=user["headers"])
+    if exported.status_code >= 400:
+        return exported
+    # 重新导入前10篇（均为重复日记），数据量保持不变
+    payload = json.loads(exported.content)
+    payload["diaries"] = payload["diaries"][:10]
+    files = {"file": ("bench.json", json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json")}
+    return await client.post("/api/diary/import", headers=user["headers"], files=files)
+
+
+async def study_plan(client: httpx.AsyncClient, user: dict, rng: random.Random) -> httpx.Response:
+    return await client.post(
+        "/api/ai/generate-study-plan",
+        headers=user["headers"],
+        json={"prompt": f"我想学习{rng.choice(DIARY_KEYWORDS)}"},
+    )
+
+
+SCENARIOS = {
+    "login": login,
+    "chat": chat,
+    "history": history,
+    "diary_list": diary_list,
+    "diary_list_summary": diary_list_summary,
+    "diary_search": diary_search,
+    "diary_tag": diary_tag,
+    "entertainment_browse": entertainment_browse,
+    "entertainment_search": entertainment_search,
+    "favorites_list": favorites_list,
+    "import_export": import_export,
+    "study_plan": study_plan,
+}
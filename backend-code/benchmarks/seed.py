@@ -0,0 +1,146 @@
+"""
+生成压测用的合成数据：用户、默认助手配置、日记、目标、日程、聊天记录、娱乐目录和收藏
+
+使用固定随机种子，保证每次压测的数据分布一致。
+"""
+import json
+import random
+from datetime import datetime, timedelta
+
+from app.core.security import get_password_hash
+from app.db.diary import make_excerpt, tag as tag_crud
+from app.models import AssistantConfig, ChatMessage, Diary, Entertainment, Favorite, Goal, Schedule, User
+
+BENCH_PASSWORD = "bench-password"
+DIARY_KEYWORDS = ["学习", "运动", "读书", "工作", "旅行", "电影", "编程", "音乐"]
+MOODS = ["happy", "sad", "neutral", "excited", "tired"]
+ENTERTAINMENT_TYPES = ["movie", "book", "game", "music"]
+CATALOGUE_WORDS = ["星际", "穿越", "银河", "城市", "少年", "夏天", "旅程", "秘密", "王国", "海洋", "记忆", "远方"]
+GENRES = ["科幻", "剧情", "悬疑", "动画", "历史", "爱情"]
+
+
+def _paragraph(rng: random.Random, words: int) -> str:
+    return "".join(rng.choice(DIARY_KEYWORDS) + rng.choice("，。的了在是") for _ in range(words))
+
+
+def seed(
+    db,
+    *,
+    users: int = 20,
+    diaries_per_user: int = 50,
+    goals_per_user: int = 5,
+    schedules_per_user: int = 20,
+    chat_messages_per_user: int = 40,
+    catalogue_items: int = 2000,
+    favorites_per_user: int = 200,
+    vendor_url: str,
+    seed_value: int = 42,
+) -> list:
+    """写入合成数据，返回每个用户的 {"id", "username", "session_id"}"""
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    hashed_password = get_password_hash(BENCH_PASSWORD)  # bcrypt较慢，所有用户共用一个哈希
+    seeded = []
+
+    for index in range(users):
+        user = User(
+            username=f"bench_user_{index}",
+            email=f"bench_user_{index}@example.com",
+            hashed_password=hashed_password,
+            full_name=f"Bench User {index}",
+        )
+        db.add(user)
+        db.flush()
+
+        config = AssistantConfig(
+            user_id=user.id,
+            name="压测助手",
+            prompt="你是一个有用的AI助手。",
+            model="gpt-3.5-turbo",
+            is_default=True,
+            config={"vendor_url": vendor_url, "api_key": "bench-key"},
+        )
+        db.add(config)
+        db.flush()
+
+        diary_tags = []
+        for d in range(diaries_per_user):
+            created_at = now - timedelta(days=d, minutes=rng.randint(0, 600))
+            content = _paragraph(rng, rng.randint(80, 400))
+            tags = rng.sample(DIARY_KEYWORDS, 2)
+            diary = Diary(
+                user_id=user.id,
+                title=f"{rng.choice(DIARY_KEYWORDS)}日记 {d}",
+                content=content,
+                excerpt=make_excerpt(content),
+                mood=rng.choice(MOODS),
+                tags=json.dumps(tags, ensure_ascii=False),
+                created_at=created_at,
+                local_date=created_at.date(),
+            )
+            db.add(diary)
+            diary_tags.append((diary, tags))
+        db.flush()
+        tag_crud.link(db, user_id=user.id, diary_tags={diary.id: tags for diary, tags in diary_tags})
+
+        for g in range(goals_per_user):
+            db.add(Goal(
+                user_id=user.id,
+                title=f"目标 {g}",
+                description=_paragraph(rng, 20),
+                target_value=100,
+                current_value=rng.randint(0, 100),
+                unit="分钟",
+            ))
+
+        for s in range(schedules_per_user):
+            start = now + timedelta(hours=rng.randint(-72, 168))
+            db.add(Schedule(
+                user_id=user.id,
+                title=f"日程 {s}",
+                description=_paragraph(rng, 10),
+                start_time=start,
+                end_time=start + timedelta(hours=1),
+                local_date=start.date(),
+            ))
+
+        session_id = f"bench-session-{index}"
+        for m in range(chat_messages_per_user):
+            role = "user" if m % 2 == 0 else "assistant"
+            db.add(ChatMessage(
+                user_id=user.id,
+                assistant_config_id=config.id,
+                session_id=session_id,
+                role=role,
+                content=_paragraph(rng, rng.randint(10, 60)),
+                tokens_used=0 if role == "user" else rng.randint(50, 300),
+                model=None if role == "user" else "gpt-3.5-turbo",
+                created_at=now - timedelta(minutes=chat_messages_per_user - m),
+            ))
+
+        seeded.append({"id": user.id, "username": user.username, "session_id": session_id})
+
+    for i in range(catalogue_items):
+        db.add(Entertainment(
+            title="".join(rng.sample(CATALOGUE_WORDS, rng.randint(1, 3))) + f" {i}",
+            type=ENTERTAINMENT_TYPES[i % len(ENTERTAINMENT_TYPES)],
+            description=_paragraph(rng, rng.randint(10, 40)),
+            rating=None if rng.random() < 0.1 else round(rng.uniform(1, 10), 1),
+            year=rng.randint(1980, 2026),
+            genre=rng.choice(GENRES),
+        ))
+    db.flush()
+
+    if catalogue_items:
+        for user in seeded:
+            for entertainment_id in rng.sample(range(1, catalogue_items + 1), min(favorites_per_user, catalogue_items)):
+                db.add(Favorite(
+                    user_id=user["id"],
+                    entertainment_id=entertainment_id,
+                    status=rng.choice(["want", "watching", "finished"]),
+                    rating=rng.choice([None, 3.0, 4.0, 5.0]),
+                    notes=_paragraph(rng, 5),
+                ))
+
+    db.commit()
+    return seeded
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+列表响应序列化耗时对比
+
+用内存中的ORM对象（不访问数据库）比较两条路径把N行编码为响应体的耗时：
+    pydantic  FastAPI常规流程：响应模型校验（from_attributes）+ 转换为JSON对象 + json.dumps
+    fast      RowSerializer映射为字典 + ORJSONResponse编码
+两条路径的输出逐字节比对，不一致时返回非0。
+
+用法（在backend-code目录下）：
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --rows 5000 --repeat 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_rows(count: int, seed_value: int):
+    from app.models import ChatMessage, Diary
+    from benchmarks.seed import DIARY_KEYWORDS, MOODS, _paragraph
+    from app.db.diary import make_excerpt
+
+    rng = random.Random(seed_value)
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    diaries, messages = [], []
+    for i in range(count):
+        content = _paragraph(rng, rng.randint(80, 400))
+        created_at = now - timedelta(days=i, minutes=rng.randint(0, 600))
+        diaries.append(Diary(
+            id=i + 1, user_id=1, title=f"{rng.choice(DIARY_KEYWORDS)}日记 {i}", content=content,
+            excerpt=make_excerpt(content), mood=rng.choice(MOODS),
+            tags=f'["{rng.choice(DIARY_KEYWORDS)}", "{rng.choice(DIARY_KEYWORDS)}"]',
+            is_private=True, created_at=created_at, updated_at=None, local_date=created_at.date(),
+        ))
+        messages.append(ChatMessage(
+            id=i + 1, user_id=1, session_id="bench", assistant_config_id=1, role=rng.choice(["user", "assistant"]),
+            content=_paragraph(rng, rng.randint(10, 60)), tokens_used=rng.randint(10, 500), model="bench-model",
+            created_at=created_at,
+        ))
+    return diaries, messages
+
+
+def time_call(func, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"mean_ms": round(statistics.fmean(samples), 2), "min_ms": round(min(samples), 2)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="列表响应序列化耗时对比")
+    parser.add_argument("--rows", type=int, default=1000, help="每次序列化的行数")
+    parser.add_argument("--repeat", type=int, default=30, help="每条路径重复次数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, BACKEND_DIR)
+    from typing import List
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from app.core.responses import ORJSONResponse, RowSerializer
+    from app.schemas.chat import ChatMessageResponse
+    from app.schemas.diary import DiaryListItem
+
+    diaries, messages = make_rows(args.rows, args.seed)
+    loop = asyncio.new_event_loop()
+    failed = False
+    print(f"{args.rows} 行，每条路径 {args.repeat} 次")
+    for name, schema, rows in (("diary", DiaryListItem, diaries), ("chat_message", ChatMessageResponse, messages)):
+        field = create_response_field(name="Response", type_=List[schema], mode="serialization")
+        serializer = RowSerializer(schema)
+
+        def pydantic_path():
+            content = loop.run_until_complete(serialize_response(field=field, response_content=rows))
+            return JSONResponse(content).body
+
+        def fast_path():
+            return ORJSONResponse(serializer(rows)).body
+
+        if pydantic_path() != fast_path():
+            print(f"{name}: 两条路径输出不一致")
+            failed = True
+            continue
+        before = time_call(pydantic_path, args.repeat)
+        after = time_call(fast_path, args.repeat)
+        print(
+            f"{name:<14} pydantic mean={before['mean_ms']:>8.2f}ms min={before['min_ms']:>8.2f}ms  "
+            f"fast mean={after['mean_ms']:>8.2f}ms min={after['min_ms']:>8.2f}ms  "
+            f"x{before['mean_ms'] / after['mean_ms']:.1f}"
+        )
+    loop.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
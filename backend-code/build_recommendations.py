@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+离线计算娱乐推荐的条目相似度
+根据收藏计算每个条目的top-K相似条目，默认只重新计算收藏发生变化所影响的条目，可通过cron定期执行，例如每10分钟一次：
+    */10 * * * * cd /app && python build_recommendations.py
+需要numpy和scipy。
+"""
+
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.recommender import recompute_similarities
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线计算娱乐推荐的条目相似度")
+    parser.add_argument("--full", action="store_true", help="全部重新计算（默认增量）")
+    parser.add_argument("--top-k", type=int, default=settings.RECOMMENDATION_NEIGHBORS, help="每个条目保存的相似条目数")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = recompute_similarities(db, full=args.full, top_k=args.top_k)
+        db.commit()
+    finally:
+        db.close()
+
+    print(
+        f"✅ 计算完成：{result.items} 个条目有收藏，{result.changed} 个发生变化，重新计算 {result.recomputed} 个，"
+        f"写入 {result.neighbors} 个相似条目，耗时 {result.elapsed_seconds:.2f} 秒"
+    )
+
+
+if __name__ == "__main__":
+    main()
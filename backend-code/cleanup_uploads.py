@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+清理孤立的头像文件和过期的导出文件
+删除头像存储（本地 uploads/avatars 或对象存储）中没有被任何用户 avatar_url 引用的
+原图、缩略图和预压缩文件，以及导出存储中超过保留时间（EXPORT_TTL_SECONDS）的日记导出文件，
+可通过cron定期执行，例如每天一次：
+    0 4 * * * cd /app && python cleanup_uploads.py
+"""
+
+import argparse
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.storage import export_storage, upload_storage
+from app.services.upload_gc import AVATAR_PREFIX, collect_expired_exports, collect_orphaned_avatars
+
+
+def main():
+    parser = argparse.ArgumentParser(description="清理孤立的头像文件和过期的导出文件")
+    parser.add_argument("--prefix", default=AVATAR_PREFIX, help="头像在存储中的前缀")
+    parser.add_argument("--grace-seconds", type=int, default=3600, help="跳过最近修改过的文件（秒）")
+    parser.add_argument("--export-ttl-seconds", type=int, default=settings.EXPORT_TTL_SECONDS,
+                        help="删除早于该时间的导出文件（秒），0为不清理")
+    parser.add_argument("--dry-run", action="store_true", help="只列出将被删除的文件")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        removed = asyncio.run(
+            collect_orphaned_avatars(db, upload_storage, args.prefix, args.grace_seconds, args.dry_run)
+        )
+    finally:
+        db.close()
+
+    for path in removed:
+        print(f"   {'将删除' if args.dry_run else '已删除'}: {path}")
+    print(f"✅ 共{'发现' if args.dry_run else '清理'} {len(removed)} 个孤立文件")
+
+    if args.export_ttl_seconds > 0:
+        expired = asyncio.run(collect_expired_exports(export_storage, args.export_ttl_seconds, args.dry_run))
+        for path in expired:
+            print(f"   {'将删除' if args.dry_run else '已删除'}: {path}")
+        print(f"✅ 共{'发现' if args.dry_run else '清理'} {len(expired)} 个过期导出文件")
+
+
+if __name__ == "__main__":
+    main()
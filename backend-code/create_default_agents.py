@@ -8,21 +8,19 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from sqlalchemy import func
 from app.core.database import get_db
-from app.models.agent import agent
+from app.db.base import CRUDBase
+from app.models.agent import Agent, agent
 from app.models.user import User
 from app.schemas.agent import AgentCreate
 
-def create_default_agents_for_user(db, user_id: int):
-    """为指定用户创建默认Agent"""
-    
-    # 检查用户是否已有Agent
-    existing_agents = agent.get_by_user(db, user_id=user_id)
-    if existing_agents:
-        print(f"   ✅ 用户{user_id}已有 {len(existing_agents)} 个Agent")
-        return existing_agents
+# 种子数据在一个事务中批量写入
+agent_bulk = CRUDBase(Agent)
+
+def default_agent_rows(user_id: int):
+    """指定用户的默认Agent（列值字典）"""
     
-    # 创建默认Agent
     default_agents = [
         AgentCreate(
             name="学习助手",
@@ -105,19 +103,7 @@ def create_default_agents_for_user(db, user_id: int):
         )
     ]
     
-    created_agents = []
-    for agent_data in default_agents:
-        try:
-            agent_dict = agent_data.dict()
-            agent_dict["user_id"] = user_id
-            
-            new_agent = agent.create(db, obj_in=agent_dict)
-            created_agents.append(new_agent)
-            print(f"   ✅ 创建Agent成功: {new_agent.name}")
-        except Exception as e:
-            print(f"   ❌ 创建Agent失败: {str(e)}")
-    
-    return created_agents
+    return [{**agent_data.dict(), "user_id": user_id} for agent_data in default_agents]
 
 def main():
     """主函数"""
@@ -134,16 +120,24 @@ def main():
             print("   ⚠️  没有找到任何用户")
             return
         
-        success_count = 0
+        # 一次查出已有Agent的用户，只为其余用户创建
+        agent_counts = dict(
+            db.query(Agent.user_id, func.count(Agent.id)).group_by(Agent.user_id).all()
+        )
+        rows = []
         for user in users:
             print(f"\n   👤 处理用户: {user.username} (ID: {user.id})")
             
-            created_agents = create_default_agents_for_user(db, user.id)
-            if created_agents:
-                success_count += 1
+            if user.id in agent_counts:
+                print(f"   ✅ 用户{user.id}已有 {agent_counts[user.id]} 个Agent")
+                continue
+            rows.extend(default_agent_rows(user.id))
+        
+        created_count = agent_bulk.bulk_create(db, rows)
+        db.commit()
         
         print(f"\n🎉 处理完成!")
-        print(f"   ✅ 成功处理: {success_count}/{len(users)} 个用户")
+        print(f"   ✅ 创建Agent: {created_count} 个")
         
         # 验证结果
         print("\n🔍 验证结果:")
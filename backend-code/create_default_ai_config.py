@@ -10,20 +10,14 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app.core.database import get_db
 from app.db.assistant import assistant_config
+from app.models.assistant import AssistantConfig
 from app.models.user import User
 from app.schemas.assistant import AssistantConfigCreate
 import json
 
-def create_default_config_for_user(db, user_id: int):
-    """为指定用户创建默认AI配置"""
+def default_config_row(user_id: int):
+    """指定用户的默认AI配置（列值字典）"""
     
-    # 检查用户是否已有默认配置
-    existing_default = assistant_config.get_default_by_user(db, user_id=user_id)
-    if existing_default:
-        print(f"   ✅ 用户{user_id}已有默认配置: {existing_default.name}")
-        return existing_default
-    
-    # 创建默认配置
     default_config_data = AssistantConfigCreate(
         name="默认AI助手",
         model="gpt-3.5-turbo",
@@ -68,18 +62,7 @@ def create_default_config_for_user(db, user_id: int):
         }
     )
     
-    try:
-        # 创建配置
-        new_config = assistant_config.create_with_user(
-            db=db, 
-            obj_in=default_config_data, 
-            user_id=user_id
-        )
-        print(f"   ✅ 为用户{user_id}创建默认配置成功: {new_config.name}")
-        return new_config
-    except Exception as e:
-        print(f"   ❌ 为用户{user_id}创建默认配置失败: {str(e)}")
-        return None
+    return {**default_config_data.dict(), "user_id": user_id}
 
 def main():
     """主函数"""
@@ -96,37 +79,39 @@ def main():
             print("   ⚠️  没有找到任何用户")
             return
         
-        success_count = 0
+        # 一次查出全部用户的现有AI配置
+        existing_configs = {}
+        for config in db.query(
+            AssistantConfig.id, AssistantConfig.user_id, AssistantConfig.name, AssistantConfig.is_default
+        ).order_by(AssistantConfig.id):
+            existing_configs.setdefault(config.user_id, []).append(config)
+        
+        new_rows = []
+        default_updates = []
         for user in users:
             print(f"\n   👤 处理用户: {user.username} (ID: {user.id})")
             
-            # 检查该用户现有的AI配置
-            existing_configs = db.query(assistant_config.model).filter(
-                assistant_config.model.user_id == user.id
-            ).all()
-            
-            print(f"   📋 现有配置数量: {len(existing_configs)}")
+            configs = existing_configs.get(user.id, [])
+            print(f"   📋 现有配置数量: {len(configs)}")
             
             # 如果有配置但没有默认的，将第一个设为默认
-            if existing_configs and not any(config.is_default for config in existing_configs):
-                print("   🔧 将第一个现有配置设为默认...")
-                first_config = existing_configs[0]
-                first_config.is_default = True
-                db.commit()
-                print(f"   ✅ 已将配置 '{first_config.name}' 设为默认")
-                success_count += 1
+            if configs and not any(config.is_default for config in configs):
+                print(f"   🔧 将第一个现有配置 '{configs[0].name}' 设为默认")
+                default_updates.append({"id": configs[0].id, "is_default": True})
             # 如果没有任何配置，创建默认配置
-            elif not existing_configs:
-                print("   🔧 创建新的默认配置...")
-                new_config = create_default_config_for_user(db, user.id)
-                if new_config:
-                    success_count += 1
+            elif not configs:
+                print("   🔧 创建新的默认配置")
+                new_rows.append(default_config_row(user.id))
             else:
                 print("   ✅ 用户已有默认配置")
-                success_count += 1
+        
+        # 批量写入，一起提交
+        updated_count = assistant_config.bulk_update(db, default_updates)
+        created_count = assistant_config.bulk_create(db, new_rows)
+        db.commit()
         
         print(f"\n🎉 处理完成!")
-        print(f"   ✅ 成功处理: {success_count}/{len(users)} 个用户")
+        print(f"   ✅ 设为默认: {updated_count} 个，新建默认配置: {created_count} 个")
         
         # 验证结果
         print("\n🔍 验证结果:")
@@ -1,19 +1,34 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
+from fastapi.responses import RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from typing import List, Optional
 import uvicorn
 import os
 
-from app.api.routes import auth, users, settings, entertainment, goals, diary, schedule, ai, agents, upload
+from app.api.routes import auth, users, settings, entertainment, goals, diary, schedule, ai, agents, upload, changes
+from app.api.routes.upload import MULTIPART_OVERHEAD
 from app.core.config import settings as app_settings
+from app.core.limits import RequestSizeLimitMiddleware
+from app.core.logger import setup_logging, shutdown_logging, RequestIDMiddleware
+from app.core.metrics import MetricsMiddleware, metrics_authorized, render_metrics
+from app.core.responses import ORJSONResponse
+from app.core.static import CachedStaticFiles
+from app.services.change_feed import change_feed
+from app.services.chat_writer import chat_message_writer
+from app.services.image_service import image_service
+from app.services.reminders import reminder_dispatcher
+from app.services.storage import upload_storage
+
+# 日志在应用创建前配置一次，之后所有模块直接使用logging.getLogger(__name__)
+setup_logging()
 
 app = FastAPI(
     title="LifeLog AI API",
     description="智能生活日志助手后端服务",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -30,8 +45,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "ETag"],
+)
+
+# 请求耗时统计中间件
+if app_settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# 上传接口的请求体大小限制：在multipart解析读完整个请求体之前拒绝超限的上传
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    limits={"/api/upload/": app_settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD}
 )
 
+# 请求ID中间件，为每条日志关联请求ID
+app.add_middleware(RequestIDMiddleware)
+
 # Include all routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
@@ -43,13 +72,57 @@ app.include_router(schedule.router, prefix="/api/schedule", tags=["schedule"])
 app.include_router(ai.router, prefix="/api/ai", tags=["ai"])
 app.include_router(agents.router, prefix="/api/agents", tags=["agents"])
 app.include_router(upload.router, prefix="/api/upload", tags=["upload"])
+app.include_router(changes.router, prefix="/api/changes", tags=["changes"])
 
 # 静态文件服务
-uploads_dir = "uploads"
-if not os.path.exists(uploads_dir):
-    os.makedirs(uploads_dir)
+if app_settings.STORAGE_BACKEND == "local":
+    uploads_dir = app_settings.UPLOAD_DIR
+    if not os.path.exists(uploads_dir):
+        os.makedirs(uploads_dir)
+
+    app.mount(
+        "/uploads",
+        CachedStaticFiles(directory=uploads_dir, precompressed=app_settings.UPLOADS_PRECOMPRESSED),
+        name="uploads"
+    )
+else:
+    @app.get("/uploads/{key:path}", include_in_schema=False)
+    async def uploads_redirect(key: str):
+        """对象存储模式下重定向到公开地址或预签名URL，文件内容不经过API进程"""
+        return RedirectResponse(
+            upload_storage.url(key),
+            status_code=307,
+            headers={"Cache-Control": f"private, max-age={app_settings.S3_PRESIGN_EXPIRES // 2}"}
+        )
+
+@app.on_event("startup")
+async def on_startup():
+    chat_message_writer.start()
+    change_feed.start()
+    if app_settings.REMINDER_ENABLED:
+        reminder_dispatcher.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # 先写完队列中的聊天消息，再关闭日志
+    await chat_message_writer.stop()
+    await reminder_dispatcher.stop()
+    await change_feed.stop()
+    image_service.shutdown()
+    shutdown_logging()
+
+
+if app_settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics(request: Request):
+        """Prometheus指标；设置了METRICS_TOKEN时需携带Bearer令牌，否则只允许本机访问"""
+        client_host = request.client.host if request.client else None
+        if not metrics_authorized(request.headers.get("authorization"), client_host):
+            raise HTTPException(status_code=403, detail="无权访问监控指标")
+        data, content_type = render_metrics()
+        return Response(content=data, media_type=content_type)
 
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
 @app.get("/")
 async def root():
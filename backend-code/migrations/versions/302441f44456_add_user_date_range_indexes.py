@@ -0,0 +1,28 @@
+"""Add user/date range indexes for goals and schedules
+
+Revision ID: 302441f44456
+Revises: d3af256831b1
+Create Date: 2026-10-19 15:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '302441f44456'
+down_revision = 'd3af256831b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_schedules_user_id_start_time', 'schedules', ['user_id', 'start_time'], unique=False)
+    op.create_index('ix_goals_user_id_created_at', 'goals', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_goal_logs_goal_id_created_at', 'goal_logs', ['goal_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_goal_logs_goal_id_created_at', table_name='goal_logs')
+    op.drop_index('ix_goals_user_id_created_at', table_name='goals')
+    op.drop_index('ix_schedules_user_id_start_time', table_name='schedules')
@@ -0,0 +1,29 @@
+"""Add schedule reminder watermark and reminder_time index
+
+Revision ID: 5e2b8c41d7a9
+Revises: ad7f25f18ce4
+Create Date: 2026-10-19 18:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2b8c41d7a9'
+down_revision = 'ad7f25f18ce4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('schedules', sa.Column('reminder_sent_until', sa.DateTime(timezone=True), nullable=True))
+    # 已有的提醒视为已处理，上线时不补发历史提醒
+    op.execute("UPDATE schedules SET reminder_sent_until = CURRENT_TIMESTAMP WHERE reminder_time IS NOT NULL")
+    op.create_index('ix_schedules_reminder_time', 'schedules', ['reminder_time'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_schedules_reminder_time', table_name='schedules')
+    with op.batch_alter_table('schedules') as batch_op:
+        batch_op.drop_column('reminder_sent_until')
@@ -0,0 +1,45 @@
+"""Add diary excerpt for summary list views
+
+Revision ID: 7c1d9e4a2b36
+Revises: 5e2b8c41d7a9
+Create Date: 2026-10-19 20:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1d9e4a2b36'
+down_revision = '5e2b8c41d7a9'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+# 与 app.db.diary.EXCERPT_LENGTH 保持一致（迁移不依赖应用代码）
+EXCERPT_LENGTH = 120
+
+
+def _excerpt(content):
+    text = " ".join(content.split())
+    if len(text) <= EXCERPT_LENGTH:
+        return text
+    return text[:EXCERPT_LENGTH] + "…"
+
+
+def upgrade() -> None:
+    op.add_column('diaries', sa.Column('excerpt', sa.String(length=200), nullable=True))
+
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, content FROM diaries WHERE content IS NOT NULL")).fetchall()
+    update = sa.text("UPDATE diaries SET excerpt = :excerpt WHERE id = :id")
+    for start in range(0, len(rows), BACKFILL_BATCH_SIZE):
+        conn.execute(update, [
+            {"id": id, "excerpt": _excerpt(content)}
+            for id, content in rows[start:start + BACKFILL_BATCH_SIZE]
+        ])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('diaries') as batch_op:
+        batch_op.drop_column('excerpt')
@@ -0,0 +1,26 @@
+"""Add favorites (user_id, status, created_at) index
+
+Revision ID: a9d3e7c5f1b8
+Revises: f1a4c6e9b8d2
+Create Date: 2026-10-20 02:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d3e7c5f1b8'
+down_revision = 'f1a4c6e9b8d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_favorites_user_id_status_created_at', 'favorites', ['user_id', 'status', 'created_at'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_favorites_user_id_status_created_at', table_name='favorites')
@@ -0,0 +1,63 @@
+"""Add user timezone and local date columns
+
+Revision ID: ad7f25f18ce4
+Revises: dca8ff7029d2
+Create Date: 2026-10-19 17:05:00.000000
+
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ad7f25f18ce4'
+down_revision = 'dca8ff7029d2'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _as_utc_date(value):
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def _backfill(conn, table: str, column: str) -> None:
+    """已有用户的时区都是UTC，本地日期即UTC日期"""
+    rows = conn.execute(sa.text(f"SELECT id, {column} FROM {table} WHERE {column} IS NOT NULL")).fetchall()
+    update = sa.text(f"UPDATE {table} SET local_date = :local_date WHERE id = :id")
+    for start in range(0, len(rows), BACKFILL_BATCH_SIZE):
+        conn.execute(update, [
+            {"id": id, "local_date": _as_utc_date(value)}
+            for id, value in rows[start:start + BACKFILL_BATCH_SIZE]
+        ])
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('timezone', sa.String(length=50), server_default='UTC', nullable=False))
+    op.add_column('schedules', sa.Column('local_date', sa.Date(), nullable=True))
+    op.add_column('diaries', sa.Column('local_date', sa.Date(), nullable=True))
+
+    conn = op.get_bind()
+    _backfill(conn, 'schedules', 'start_time')
+    _backfill(conn, 'diaries', 'created_at')
+
+    op.create_index('ix_schedules_user_id_local_date', 'schedules', ['user_id', 'local_date'], unique=False)
+    op.create_index('ix_diaries_user_id_local_date', 'diaries', ['user_id', 'local_date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_diaries_user_id_local_date', table_name='diaries')
+    op.drop_index('ix_schedules_user_id_local_date', table_name='schedules')
+    with op.batch_alter_table('diaries') as batch_op:
+        batch_op.drop_column('local_date')
+    with op.batch_alter_table('schedules') as batch_op:
+        batch_op.drop_column('local_date')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('timezone')
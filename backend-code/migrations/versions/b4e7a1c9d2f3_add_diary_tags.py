@@ -0,0 +1,93 @@
+"""Add normalised diary tags with per-user counts
+
+Revision ID: b4e7a1c9d2f3
+Revises: 7c1d9e4a2b36
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4e7a1c9d2f3'
+down_revision = '7c1d9e4a2b36'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+# 与 app.db.diary.TAG_MAX_LENGTH 保持一致（迁移不依赖应用代码）
+TAG_MAX_LENGTH = 50
+
+
+def _tag_names(value):
+    """解析日记的标签JSON，规则与 app.db.diary.normalize_tags 相同；无法解析的值视为没有标签"""
+    try:
+        names = json.loads(value)
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(names, list):
+        return []
+    return list(dict.fromkeys(
+        name.strip()[:TAG_MAX_LENGTH] for name in names if isinstance(name, str) and name.strip()
+    ))
+
+
+def _execute_batches(conn, statement, rows) -> None:
+    for start in range(0, len(rows), BACKFILL_BATCH_SIZE):
+        conn.execute(statement, rows[start:start + BACKFILL_BATCH_SIZE])
+
+
+def upgrade() -> None:
+    tags = op.create_table(
+        'tags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('diary_count', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'name', name='uq_tags_user_id_name')
+    )
+    op.create_index(op.f('ix_tags_id'), 'tags', ['id'], unique=False)
+    op.create_index('ix_tags_user_id_diary_count', 'tags', ['user_id', 'diary_count'], unique=False)
+    diary_tags = op.create_table(
+        'diary_tags',
+        sa.Column('diary_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['diary_id'], ['diaries.id'], ),
+        sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ),
+        sa.PrimaryKeyConstraint('diary_id', 'tag_id')
+    )
+    op.create_index('ix_diary_tags_tag_id_diary_id', 'diary_tags', ['tag_id', 'diary_id'], unique=False)
+
+    # 由diaries.tags中的JSON回填标签、关联和每个标签的日记数
+    conn = op.get_bind()
+    counts = {}
+    links = []
+    for diary_id, user_id, value in conn.execute(
+        sa.text("SELECT id, user_id, tags FROM diaries WHERE tags IS NOT NULL")
+    ):
+        for name in _tag_names(value):
+            key = (user_id, name)
+            counts[key] = counts.get(key, 0) + 1
+            links.append((diary_id, key))
+    if not counts:
+        return
+    _execute_batches(conn, tags.insert(), [
+        {"user_id": user_id, "name": name, "diary_count": count} for (user_id, name), count in counts.items()
+    ])
+    tag_ids = {(user_id, name): id for id, user_id, name in conn.execute(sa.text("SELECT id, user_id, name FROM tags"))}
+    _execute_batches(conn, diary_tags.insert(), [
+        {"diary_id": diary_id, "tag_id": tag_ids[key]} for diary_id, key in links
+    ])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_diary_tags_tag_id_diary_id', table_name='diary_tags')
+    op.drop_table('diary_tags')
+    op.drop_index('ix_tags_user_id_diary_count', table_name='tags')
+    op.drop_index(op.f('ix_tags_id'), table_name='tags')
+    op.drop_table('tags')
@@ -0,0 +1,66 @@
+"""Add entertainment browse index and full-text search index
+
+Revision ID: d2a6f8b3c1e5
+Revises: b4e7a1c9d2f3
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a6f8b3c1e5'
+down_revision = 'b4e7a1c9d2f3'
+branch_labels = None
+depends_on = None
+
+# 与 app.models.entertainment 中的定义保持一致（迁移不依赖应用代码）
+UNRATED = -1
+SQLITE_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS entertainment_fts USING fts5("
+    "title, genre, description, content='entertainment', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS entertainment_fts_ai AFTER INSERT ON entertainment BEGIN "
+    "INSERT INTO entertainment_fts(rowid, title, genre, description) "
+    "VALUES (new.id, new.title, new.genre, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS entertainment_fts_ad AFTER DELETE ON entertainment BEGIN "
+    "INSERT INTO entertainment_fts(entertainment_fts, rowid, title, genre, description) "
+    "VALUES ('delete', old.id, old.title, old.genre, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS entertainment_fts_au AFTER UPDATE OF title, genre, description ON entertainment BEGIN "
+    "INSERT INTO entertainment_fts(entertainment_fts, rowid, title, genre, description) "
+    "VALUES ('delete', old.id, old.title, old.genre, old.description); "
+    "INSERT INTO entertainment_fts(rowid, title, genre, description) "
+    "VALUES (new.id, new.title, new.genre, new.description); END",
+)
+POSTGRES_SEARCH_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_entertainment_search_trgm ON entertainment USING gin "
+    "((title || ' ' || coalesce(genre, '') || ' ' || coalesce(description, '')) gin_trgm_ops)",
+)
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_entertainment_type_rating_id', 'entertainment',
+        ['type', sa.text(f'coalesce(rating, {UNRATED})'), 'id'], unique=False
+    )
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_SEARCH_DDL:
+            op.execute(statement)
+        # 外部内容表由已有数据重建索引
+        op.execute("INSERT INTO entertainment_fts(entertainment_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        for statement in POSTGRES_SEARCH_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('entertainment_fts_ai', 'entertainment_fts_ad', 'entertainment_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS entertainment_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_entertainment_search_trgm")
+    op.drop_index('ix_entertainment_type_rating_id', table_name='entertainment')
@@ -0,0 +1,115 @@
+"""Add goal log aggregates
+
+Revision ID: d3af256831b1
+Revises: b97bdc53643b
+Create Date: 2026-10-19 15:10:00.000000
+
+"""
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3af256831b1'
+down_revision = 'b97bdc53643b'
+branch_labels = None
+depends_on = None
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).date()
+    return value
+
+
+def upgrade() -> None:
+    op.add_column('goals', sa.Column('log_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('goals', sa.Column('log_sum', sa.Float(), server_default='0', nullable=False))
+    op.add_column('goals', sa.Column('last_value', sa.Float(), nullable=True))
+    op.add_column('goals', sa.Column('last_logged_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('goals', sa.Column('last_log_date', sa.Date(), nullable=True))
+    op.add_column('goals', sa.Column('current_streak', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('goals', sa.Column('longest_streak', sa.Integer(), server_default='0', nullable=False))
+
+    rollups = op.create_table('goal_log_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('goal_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=10), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('sum', sa.Float(), nullable=False),
+    sa.Column('min_value', sa.Float(), nullable=True),
+    sa.Column('max_value', sa.Float(), nullable=True),
+    sa.Column('last_value', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['goal_id'], ['goals.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('goal_id', 'period', 'period_start', name='uq_goal_log_rollups_goal_period')
+    )
+    op.create_index(op.f('ix_goal_log_rollups_id'), 'goal_log_rollups', ['id'], unique=False)
+
+    # 根据已有打卡记录回填聚合值，有打卡记录的目标current_value设为打卡值之和
+    conn = op.get_bind()
+    logs = conn.execute(sa.text(
+        "SELECT goal_id, value, created_at FROM goal_logs ORDER BY goal_id, created_at, id"
+    ))
+    goals = OrderedDict()
+    rollup_rows = OrderedDict()
+    for goal_id, value, created_at in logs:
+        day = _as_date(created_at)
+        stats = goals.setdefault(goal_id, {
+            "log_count": 0, "log_sum": 0.0, "last_value": None, "last_logged_at": None,
+            "last_log_date": None, "current_streak": 0, "longest_streak": 0,
+        })
+        if stats["last_log_date"] != day:
+            if stats["last_log_date"] == day - timedelta(days=1):
+                stats["current_streak"] += 1
+            else:
+                stats["current_streak"] = 1
+        stats["longest_streak"] = max(stats["longest_streak"], stats["current_streak"])
+        stats["log_count"] += 1
+        stats["log_sum"] += value
+        stats["last_value"] = value
+        stats["last_logged_at"] = created_at
+        stats["last_log_date"] = day
+
+        for period, start in (("day", day), ("week", day - timedelta(days=day.weekday()))):
+            row = rollup_rows.get((goal_id, period, start))
+            if row is None:
+                rollup_rows[(goal_id, period, start)] = {
+                    "goal_id": goal_id, "period": period, "period_start": start, "count": 1, "sum": value,
+                    "min_value": value, "max_value": value, "last_value": value,
+                }
+            else:
+                row["count"] += 1
+                row["sum"] += value
+                row["min_value"] = min(row["min_value"], value)
+                row["max_value"] = max(row["max_value"], value)
+                row["last_value"] = value
+
+    update = sa.text(
+        "UPDATE goals SET current_value = :log_sum, log_count = :log_count, log_sum = :log_sum, last_value = :last_value, "
+        "last_logged_at = :last_logged_at, last_log_date = :last_log_date, "
+        "current_streak = :current_streak, longest_streak = :longest_streak WHERE id = :goal_id"
+    )
+    for goal_id, stats in goals.items():
+        conn.execute(update, {**stats, "goal_id": goal_id})
+    if rollup_rows:
+        op.bulk_insert(rollups, list(rollup_rows.values()))
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_goal_log_rollups_id'), table_name='goal_log_rollups')
+    op.drop_table('goal_log_rollups')
+    with op.batch_alter_table('goals') as batch_op:
+        batch_op.drop_column('longest_streak')
+        batch_op.drop_column('current_streak')
+        batch_op.drop_column('last_log_date')
+        batch_op.drop_column('last_logged_at')
+        batch_op.drop_column('last_value')
+        batch_op.drop_column('log_sum')
+        batch_op.drop_column('log_count')
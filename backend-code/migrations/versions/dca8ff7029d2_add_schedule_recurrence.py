@@ -0,0 +1,54 @@
+"""Add schedule recurrence rules and exceptions
+
+Revision ID: dca8ff7029d2
+Revises: 302441f44456
+Create Date: 2026-10-19 16:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'dca8ff7029d2'
+down_revision = '302441f44456'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('schedules', sa.Column('rrule', sa.String(length=500), nullable=True))
+    op.add_column('schedules', sa.Column('recurrence_until', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        'ix_schedules_user_id_recurring', 'schedules', ['user_id', 'recurrence_until'], unique=False,
+        postgresql_where=sa.text('rrule IS NOT NULL'),
+        sqlite_where=sa.text('rrule IS NOT NULL'),
+    )
+
+    op.create_table('schedule_exceptions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('schedule_id', sa.Integer(), nullable=False),
+    sa.Column('original_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('is_cancelled', sa.Boolean(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('start_time', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('end_time', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('location', sa.String(length=200), nullable=True),
+    sa.Column('is_completed', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['schedule_id'], ['schedules.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('schedule_id', 'original_start', name='uq_schedule_exceptions_schedule_start')
+    )
+    op.create_index(op.f('ix_schedule_exceptions_id'), 'schedule_exceptions', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_schedule_exceptions_id'), table_name='schedule_exceptions')
+    op.drop_table('schedule_exceptions')
+    op.drop_index('ix_schedules_user_id_recurring', table_name='schedules')
+    with op.batch_alter_table('schedules') as batch_op:
+        batch_op.drop_column('recurrence_until')
+        batch_op.drop_column('rrule')
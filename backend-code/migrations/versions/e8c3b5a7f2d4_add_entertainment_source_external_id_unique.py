@@ -0,0 +1,41 @@
+"""Add unique index on entertainment (source, external_id)
+
+Revision ID: e8c3b5a7f2d4
+Revises: d2a6f8b3c1e5
+Create Date: 2026-10-20 00:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8c3b5a7f2d4'
+down_revision = 'd2a6f8b3c1e5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 已有的重复条目保留ID最小的一条，收藏改为指向保留的条目后删除其余条目
+    duplicates = sa.text(
+        "SELECT e.id, k.keep_id FROM entertainment e JOIN ("
+        "  SELECT source, external_id, min(id) AS keep_id FROM entertainment"
+        "  WHERE source IS NOT NULL AND external_id IS NOT NULL"
+        "  GROUP BY source, external_id HAVING count(*) > 1"
+        ") k ON e.source = k.source AND e.external_id = k.external_id "
+        "WHERE e.id <> k.keep_id"
+    )
+    conn = op.get_bind()
+    rows = [{"id": id, "keep_id": keep_id} for id, keep_id in conn.execute(duplicates)]
+    if rows:
+        conn.execute(sa.text("UPDATE favorites SET entertainment_id = :keep_id WHERE entertainment_id = :id"), rows)
+        conn.execute(sa.text("DELETE FROM entertainment WHERE id = :id"), rows)
+
+    op.create_index(
+        'uq_entertainment_source_external_id', 'entertainment', ['source', 'external_id'], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_entertainment_source_external_id', table_name='entertainment')
@@ -0,0 +1,44 @@
+"""Add offline item-item similarity tables for entertainment recommendations
+
+Revision ID: f1a4c6e9b8d2
+Revises: e8c3b5a7f2d4
+Create Date: 2026-10-20 01:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a4c6e9b8d2'
+down_revision = 'e8c3b5a7f2d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'entertainment_neighbors',
+        sa.Column('entertainment_id', sa.Integer(), nullable=False),
+        sa.Column('neighbor_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['entertainment_id'], ['entertainment.id'], ),
+        sa.ForeignKeyConstraint(['neighbor_id'], ['entertainment.id'], ),
+        sa.PrimaryKeyConstraint('entertainment_id', 'neighbor_id')
+    )
+    op.create_index(
+        'ix_entertainment_neighbors_neighbor_id', 'entertainment_neighbors', ['neighbor_id'], unique=False
+    )
+    op.create_table(
+        'entertainment_favorite_signatures',
+        sa.Column('entertainment_id', sa.Integer(), nullable=False),
+        sa.Column('signature', sa.String(length=40), nullable=False),
+        sa.ForeignKeyConstraint(['entertainment_id'], ['entertainment.id'], ),
+        sa.PrimaryKeyConstraint('entertainment_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('entertainment_favorite_signatures')
+    op.drop_index('ix_entertainment_neighbors_neighbor_id', table_name='entertainment_neighbors')
+    op.drop_table('entertainment_neighbors')
@@ -0,0 +1,72 @@
+"""
+测试夹具：每个测试使用独立的临时SQLite数据库，变更推送使用进程内后端，不依赖Redis
+"""
+import os
+import sys
+import tempfile
+
+# 应用在导入时读取配置并创建数据库引擎，必须先准备好环境
+_workdir = tempfile.mkdtemp(prefix="lifelog_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'default.db')}"
+os.environ["CHANGE_FEED_BACKEND"] = "local"
+os.environ["REMINDER_ENABLED"] = "False"
+os.environ["METRICS_ENABLED"] = "False"
+os.environ["LOG_LEVEL"] = "WARNING"
+os.environ["CHAT_WRITE_SPOOL_DIR"] = os.path.join(_workdir, "chat_spool")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+import app.models  # noqa: F401  注册全部模型
+from app.core.database import Base, SessionLocal
+from app.core.security import create_access_token, get_password_hash
+from app.models.user import User
+
+
+@pytest.fixture
+def engine(tmp_path):
+    test_engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=test_engine)
+    SessionLocal.configure(bind=test_engine)
+    yield test_engine
+    test_engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def _create_user(db, username: str, timezone: str = "UTC") -> User:
+    user = User(
+        username=username, email=f"{username}@example.com",
+        hashed_password=get_password_hash("password"), timezone=timezone
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def user(db) -> User:
+    return _create_user(db, "alice")
+
+
+@pytest.fixture
+def other_user(db) -> User:
+    return _create_user(db, "bob")
+
+
+@pytest.fixture
+def auth_headers(user):
+    return {"Authorization": f"Bearer {create_access_token({'sub': user.username})}"}
+
+
+@pytest.fixture
+def client(engine):
+    import main
+    return TestClient(main.app)
@@ -0,0 +1,13 @@
+from benchmarks.run import mismatched_params, parse_args, run_params
+
+
+def _result(**overrides):
+    params = run_params(parse_args([]))
+    params.update(overrides)
+    return {"rps": 100.0, "p95_ms": 10.0, "p99_ms": 12.0, "errors": 0, "params": params}
+
+
+def test_scenarios_with_different_run_params_are_not_compared():
+    baseline = {"chat": _result(), "history": _result(), "legacy": {"rps": 100.0}}
+    results = {"chat": _result(), "history": _result(vendor_latency_ms=500), "legacy": _result()}
+    assert mismatched_params(results, baseline) == ["history", "legacy"]
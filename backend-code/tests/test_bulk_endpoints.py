@@ -0,0 +1,83 @@
+from app.core.security import create_access_token
+from app.models.goal import Goal
+from app.models.schedule import Schedule
+
+
+def _headers(user):
+    return {"Authorization": f"Bearer {create_access_token({'sub': user.username})}"}
+
+
+def _goals(client, headers, payload):
+    response = client.post("/api/goals/bulk", json=payload, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_bulk_create_returns_rows_in_request_order(client, auth_headers):
+    # 可选列为None的位置各不相同，不能被拆成多条INSERT而打乱顺序
+    payload = [
+        {"title": "a", "target_value": 10},
+        {"title": "b", "unit": "km"},
+        {"title": "c"},
+        {"title": "d", "target_value": 5, "unit": "h", "description": "x"},
+    ]
+    created = _goals(client, auth_headers, payload)
+    assert [goal["title"] for goal in created] == ["a", "b", "c", "d"]
+    assert [goal["unit"] for goal in created] == [None, "km", None, "h"]
+    assert sorted(goal["id"] for goal in created) == [goal["id"] for goal in created]
+
+
+def test_bulk_update_with_a_foreign_id_changes_nothing(client, db, user, other_user, auth_headers):
+    own = _goals(client, auth_headers, [{"title": "mine"}])[0]
+    foreign = _goals(client, _headers(other_user), [{"title": "theirs"}])[0]
+
+    response = client.put(
+        "/api/goals/bulk",
+        json=[{"id": own["id"], "title": "changed"}, {"id": foreign["id"], "title": "stolen"}],
+        headers=auth_headers,
+    )
+    assert response.status_code == 404
+    db.expire_all()
+    assert db.get(Goal, own["id"]).title == "mine"
+    assert db.get(Goal, foreign["id"]).title == "theirs"
+
+
+def test_bulk_complete_and_delete_only_touch_own_rows(client, db, other_user, auth_headers):
+    own = _goals(client, auth_headers, [{"title": "mine"}])[0]
+    foreign = _goals(client, _headers(other_user), [{"title": "theirs"}])[0]
+    response = client.post("/api/goals/bulk/complete", json={"ids": [own["id"], foreign["id"]]}, headers=auth_headers)
+    assert response.json() == {"count": 1}
+
+    schedules = [
+        client.post("/api/schedule/bulk", json=[{"title": "s", "start_time": "2026-03-01T09:00:00Z"}], headers=headers).json()[0]
+        for headers in (auth_headers, _headers(other_user))
+    ]
+    response = client.post(
+        "/api/schedule/bulk/delete", json={"ids": [schedule["id"] for schedule in schedules]}, headers=auth_headers
+    )
+    assert response.json() == {"count": 1}
+
+    db.expire_all()
+    assert db.get(Goal, foreign["id"]).is_completed is False
+    assert db.get(Schedule, schedules[0]["id"]) is None
+    assert db.get(Schedule, schedules[1]["id"]) is not None
+
+
+def test_sync_with_a_foreign_id_is_rolled_back(client, db, user, other_user, auth_headers):
+    foreign = client.post(
+        "/api/schedule/bulk", json=[{"title": "theirs", "start_time": "2026-03-01T09:00:00Z"}],
+        headers=_headers(other_user),
+    ).json()[0]
+
+    response = client.post(
+        "/api/schedule/sync",
+        json={
+            "create": [{"title": "new", "start_time": "2026-03-02T09:00:00Z"}],
+            "update": [{"id": foreign["id"], "title": "stolen"}],
+        },
+        headers=auth_headers,
+    )
+    assert response.status_code == 404
+    db.expire_all()
+    assert db.query(Schedule).filter(Schedule.user_id == user.id).count() == 0
+    assert db.get(Schedule, foreign["id"]).title == "theirs"
@@ -0,0 +1,67 @@
+import io
+
+import pytest
+
+from app.core.config import settings
+from app.db.entertainment import entertainment
+from app.models.entertainment import Entertainment
+from app.services.catalogue_import import ingest_catalogue, iter_records
+
+
+@pytest.fixture(autouse=True)
+def no_search_cache(monkeypatch):
+    monkeypatch.setattr(settings, "ENTERTAINMENT_SEARCH_CACHE_TTL", 0)
+
+
+def _record(external_id, title, source="imdb", rating=None):
+    return {"external_id": external_id, "title": title, "type": "movie", "source": source, "rating": rating}
+
+
+def _catalogue(db):
+    db.expire_all()
+    return sorted(
+        (row.source, row.external_id, row.title, row.rating)
+        for row in db.query(Entertainment)
+    )
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 100])
+def test_duplicate_keys_keep_the_last_record(db, batch_size):
+    records = [
+        _record("tt1", "First"),
+        _record("tt2", "Second"),
+        _record("tt1", "First (fixed)", rating=8.1),
+        _record("tt1", "First", source="tmdb"),
+        None,
+        {"external_id": "tt3", "type": "movie", "source": "imdb"},
+    ]
+    result = ingest_catalogue(db, records, batch_size=batch_size)
+    db.commit()
+
+    assert (result.processed, result.skipped) == (6, 2)
+    assert _catalogue(db) == [
+        ("imdb", "tt1", "First (fixed)", 8.1),
+        ("imdb", "tt2", "Second", None),
+        ("tmdb", "tt1", "First", None),
+    ]
+
+
+def test_reimport_updates_in_place_and_keeps_search_in_sync(db):
+    ingest_catalogue(db, [_record("tt1", "Old title"), _record("tt2", "Other")])
+    db.commit()
+    ids = {row.external_id: row.id for row in db.query(Entertainment)}
+
+    csv_file = io.StringIO("external_id,title,type,source,rating\ntt1,Brand new title,movie,imdb,7.5\n")
+    result = ingest_catalogue(db, iter_records(csv_file, "csv"))
+    db.commit()
+
+    assert result.upserted == 1
+    updated = db.get(Entertainment, ids["tt1"])
+    assert (updated.title, updated.rating) == ("Brand new title", 7.5)
+    assert updated.updated_at is not None
+    assert db.query(Entertainment).count() == 2
+
+    found, _ = entertainment.search_by_keyword(db, keyword="Brand new", entertainment_type="movie")
+    assert [item.id for item in found] == [ids["tt1"]]
+    found, _ = entertainment.search_by_keyword(db, keyword="Old title", entertainment_type="movie")
+    assert found == []
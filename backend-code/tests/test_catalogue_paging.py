@@ -0,0 +1,73 @@
+import pytest
+
+from app.core.config import settings
+from app.models.entertainment import UNRATED, Entertainment
+
+# 评分有并列和空值，翻页时按 (评分, id) 降序不能重复或遗漏
+_RATINGS = [8.0, None, 9.5, 8.0, 7.0, 8.0, None, 9.5, 6.5, 8.0, 7.0, None, 9.0]
+
+
+@pytest.fixture
+def catalogue(db, monkeypatch):
+    monkeypatch.setattr(settings, "ENTERTAINMENT_SEARCH_CACHE_TTL", 0)
+    movies = [
+        Entertainment(title=f"Star {i}" if i % 3 else f"Moon {i}", type="movie", rating=rating)
+        for i, rating in enumerate(_RATINGS)
+    ]
+    db.add_all(movies + [Entertainment(title="Star book", type="book", rating=10)])
+    db.commit()
+    return movies
+
+
+def _pages(client, headers, limit, **params):
+    ids, cursor, pages = [], None, 0
+    while True:
+        query = dict(params, limit=limit, **({"cursor": cursor} if cursor else {}))
+        response = client.get("/api/entertainment/movies", params=query, headers=headers)
+        assert response.status_code == 200
+        body = response.json()
+        assert len(body["items"]) <= limit
+        ids += [item["id"] for item in body["items"]]
+        pages += 1
+        cursor = body["next_cursor"]
+        if not cursor:
+            return ids, pages
+
+
+def test_browse_pages_cover_the_type_once_in_rating_order(client, auth_headers, catalogue):
+    expected = [m.id for m in sorted(
+        catalogue, key=lambda m: (UNRATED if m.rating is None else m.rating, m.id), reverse=True
+    )]
+    for limit in (1, 4, 13, 50):
+        ids, pages = _pages(client, auth_headers, limit)
+        assert ids == expected
+        assert pages == max(1, -(-len(expected) // limit))
+
+
+@pytest.mark.parametrize("keyword", ["Star", "St"])
+def test_search_pages_match_a_single_page(client, auth_headers, catalogue, keyword):
+    # 3个字符以上走全文索引，更短的关键词走LIKE
+    single, _ = _pages(client, auth_headers, 100, search=keyword)
+    assert sorted(single) == sorted(m.id for m in catalogue if m.title.startswith("Star"))
+    paged, pages = _pages(client, auth_headers, 3, search=keyword)
+    assert paged == single
+    assert pages > 1
+
+
+def test_rows_inserted_between_pages_do_not_shift_the_cursor(client, db, auth_headers, catalogue):
+    response = client.get("/api/entertainment/movies", params={"limit": 5}, headers=auth_headers)
+    first = response.json()
+    db.add(Entertainment(title="New hit", type="movie", rating=10))
+    db.commit()
+
+    response = client.get(
+        "/api/entertainment/movies", params={"limit": 100, "cursor": first["next_cursor"]}, headers=auth_headers
+    )
+    ids = [item["id"] for item in first["items"]] + [item["id"] for item in response.json()["items"]]
+    assert sorted(ids) == sorted(m.id for m in catalogue)
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "WzFd", "WyJhIiwgMV0"])
+def test_invalid_cursor_is_rejected(client, auth_headers, catalogue, cursor):
+    response = client.get("/api/entertainment/movies", params={"cursor": cursor}, headers=auth_headers)
+    assert response.status_code == 400
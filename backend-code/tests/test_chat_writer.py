@@ -0,0 +1,126 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import OperationalError
+
+from app.models.chat import ChatMessage
+from app.services.chat_writer import ChatMessageWriter, SPOOL_PREFIX, DEAD_LETTER_PREFIX
+
+_BASE_TIME = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def _message(user_id: int, index: int, **overrides):
+    return {
+        "user_id": user_id, "session_id": "s1", "assistant_config_id": None, "role": "user",
+        "content": f"m{index}", "tokens_used": 0, "model": None,
+        "created_at": _BASE_TIME + timedelta(seconds=index), **overrides,
+    }
+
+
+def _writer(tmp_path, **kwargs) -> ChatMessageWriter:
+    options = {"batch_size": 3, "flush_interval": 0.01, "max_retries": 2, "max_backoff": 0.02}
+    options.update(kwargs)
+    return ChatMessageWriter(spool_dir=str(tmp_path / "spool"), **options)
+
+
+def _contents(db):
+    db.expire_all()
+    return [content for (content,) in db.query(ChatMessage.content).order_by(ChatMessage.id)]
+
+
+def _locked():
+    return OperationalError("INSERT INTO chat_messages", {}, Exception("database is locked"))
+
+
+def test_messages_written_in_enqueue_order(db, user, tmp_path):
+    writer = _writer(tmp_path)
+
+    async def run():
+        for i in range(10):
+            writer.enqueue(_message(user.id, i))
+        await asyncio.sleep(0.2)
+        await writer.stop()
+
+    asyncio.run(run())
+    assert _contents(db) == [f"m{i}" for i in range(10)]
+
+
+def test_transient_errors_are_retried_until_written(db, user, tmp_path, monkeypatch):
+    writer = _writer(tmp_path)
+    failures = {"left": 3}
+    original = ChatMessageWriter._write
+
+    def flaky(batch):
+        if failures["left"]:
+            failures["left"] -= 1
+            raise _locked()
+        original(batch)
+
+    monkeypatch.setattr(writer, "_write", flaky)
+
+    async def run():
+        for i in range(5):
+            writer.enqueue(_message(user.id, i))
+        await asyncio.sleep(0.5)
+        await writer.stop()
+
+    asyncio.run(run())
+    assert failures["left"] == 0
+    assert _contents(db) == [f"m{i}" for i in range(5)]
+
+
+def test_permanent_error_dead_letters_only_the_bad_message(db, user, tmp_path):
+    writer = _writer(tmp_path, batch_size=10)
+
+    async def run():
+        for i in range(6):
+            # role为NULL违反非空约束，重试无法成功
+            writer.enqueue(_message(user.id, i, role=None) if i == 2 else _message(user.id, i))
+        await asyncio.sleep(0.2)
+        writer.enqueue(_message(user.id, 6))
+        await asyncio.sleep(0.2)
+        await writer.stop()
+
+    asyncio.run(run())
+    assert _contents(db) == ["m0", "m1", "m3", "m4", "m5", "m6"]
+    dead_letter = tmp_path / "spool" / f"{DEAD_LETTER_PREFIX}{os.getpid()}.ndjson"
+    assert [json.loads(line)["content"] for line in dead_letter.read_text(encoding="utf-8").splitlines()] == ["m2"]
+
+
+def test_unwritten_messages_are_spooled_and_replayed(db, user, tmp_path, monkeypatch):
+    down = _writer(tmp_path)
+
+    def unavailable(batch):
+        raise _locked()
+
+    monkeypatch.setattr(down, "_write", unavailable)
+
+    async def shutdown_while_down():
+        down.start()
+        for i in range(4):
+            down.enqueue(_message(user.id, i))
+        await down.stop()
+
+    asyncio.run(shutdown_while_down())
+    spool_dir = tmp_path / "spool"
+    assert [name for name in os.listdir(spool_dir) if name.startswith(SPOOL_PREFIX)]
+    assert _contents(db) == []
+
+    async def restart():
+        writer = _writer(tmp_path)
+        writer.start()
+        await asyncio.sleep(0.2)
+        await writer.stop()
+
+    asyncio.run(restart())
+    assert _contents(db) == ["m0", "m1", "m2", "m3"]
+    assert not [name for name in os.listdir(spool_dir) if name.startswith(SPOOL_PREFIX)]
+
+
+def test_spool_files_are_claimed_by_one_worker(tmp_path, user):
+    first, second = _writer(tmp_path), _writer(tmp_path)
+    first._spool([_message(user.id, 0), _message(user.id, 1)])
+    assert [m["content"] for m in first._load_spool()] == ["m0", "m1"]
+    assert second._load_spool() == []
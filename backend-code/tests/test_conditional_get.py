@@ -0,0 +1,94 @@
+import pytest
+
+from app.services import change_feed, versions
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.ops.append((name, args, kwargs))
+
+    def execute(self):
+        if self.redis.fail_incr and any(name == "incr" for name, _, _ in self.ops):
+            raise ConnectionError("redis timeout")
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.ops]
+
+
+class FakeRedis:
+    """进程内的Redis替身，只实现集合版本和发布用到的命令"""
+
+    def __init__(self):
+        self.data = {}
+        self.fail_incr = False
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+    def set(self, name, value, nx=False, ex=None):
+        if nx and name in self.data:
+            return None
+        self.data[name] = str(value)
+        return True
+
+    def get(self, name):
+        return self.data.get(name)
+
+    def incr(self, name):
+        self.data[name] = str(int(self.data[name]) + 1)
+        return int(self.data[name])
+
+    def expire(self, name, seconds):
+        return name in self.data
+
+    def delete(self, *names):
+        return sum(self.data.pop(name, None) is not None for name in names)
+
+    def publish(self, channel, data):
+        return 0
+
+
+@pytest.fixture(params=["local", "redis"])
+def backend(request, monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(versions, "redis_client", fake)
+    monkeypatch.setattr(change_feed, "redis_client", fake)
+    monkeypatch.setattr(versions.collection_versions, "backend", request.param)
+    monkeypatch.setattr(versions.collection_versions, "_local", {})
+    monkeypatch.setattr(change_feed.change_feed, "backend", request.param)
+    return fake
+
+
+def _etag(client, headers):
+    response = client.get("/api/diary/", headers=headers)
+    assert response.status_code == 200
+    return response.headers["etag"]
+
+
+def test_unchanged_collection_returns_304(client, auth_headers, backend):
+    etag = _etag(client, auth_headers)
+    response = client.get("/api/diary/", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_write_invalidates_old_etag_before_response(client, auth_headers, backend):
+    etag = _etag(client, auth_headers)
+    created = client.post("/api/diary/", headers=auth_headers, json={"title": "t", "content": "c"})
+    assert created.status_code == 200
+    response = client.get("/api/diary/", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert [item["title"] for item in response.json()] == ["t"]
+
+
+def test_failed_bump_invalidates_old_etag(client, auth_headers, backend):
+    if versions.collection_versions.backend != "redis":
+        pytest.skip("只有redis模式会递增失败")
+    etag = _etag(client, auth_headers)
+    backend.fail_incr = True
+    client.post("/api/diary/", headers=auth_headers, json={"title": "t", "content": "c"})
+    backend.fail_incr = False
+    response = client.get("/api/diary/", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
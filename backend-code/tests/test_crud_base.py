@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.db.assistant import assistant_config
+from app.db.goal import goal
+from app.models.assistant import AssistantConfig
+from app.models.goal import Goal, GoalLog
+
+
+def test_update_keeps_pending_changes_on_the_object(db, user):
+    config = AssistantConfig(user_id=user.id, name="old", prompt="p")
+    db.add(config)
+    db.commit()
+
+    config.description = "set on the object"
+    updated = assistant_config.update(db, db_obj=config, obj_in={"name": "new"})
+    db.commit()
+
+    assert updated is config
+    db.expire_all()
+    stored = db.get(AssistantConfig, config.id)
+    assert (stored.name, stored.description) == ("new", "set on the object")
+    assert stored.updated_at is not None
+
+
+def _goal_rows(user_id: int, titles):
+    return [{"user_id": user_id, "title": title, "unit": "km" if i % 2 else None} for i, title in enumerate(titles)]
+
+
+def test_bulk_create_inserts_all_batches_in_order(db, user, other_user):
+    rows = _goal_rows(user.id, "abcde") + _goal_rows(other_user.id, "f")
+    assert goal.bulk_create(db, rows, batch_size=2) == 6
+    db.commit()
+
+    stored = db.query(Goal).order_by(Goal.id).all()
+    assert [(g.title, g.unit, g.user_id) for g in stored] == [
+        (row["title"], row["unit"], row["user_id"]) for row in rows
+    ]
+
+
+def test_bulk_update_and_delete_across_batches(db, user):
+    goal.bulk_create(db, _goal_rows(user.id, "abcde"))
+    db.flush()
+    ids = [id for (id,) in db.query(Goal.id).order_by(Goal.id)]
+    db.add_all(GoalLog(goal_id=id, value=1) for id in ids)
+    db.commit()
+
+    assert goal.bulk_update(db, [{"id": id, "title": f"t{id}"} for id in ids], batch_size=2) == 5
+    assert goal.bulk_delete(db, ids[:3], batch_size=2) == 3
+    db.commit()
+
+    db.expire_all()
+    assert [(g.id, g.title) for g in db.query(Goal).order_by(Goal.id)] == [(id, f"t{id}") for id in ids[3:]]
+    # 级联的打卡记录随目标一起删除
+    assert sorted(log.goal_id for log in db.query(GoalLog)) == ids[3:]
+
+
+def test_bulk_update_of_a_missing_id_raises(db, user):
+    with pytest.raises(StaleDataError):
+        goal.bulk_update(db, [{"id": 999, "title": "x"}])
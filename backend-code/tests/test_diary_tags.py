@@ -0,0 +1,60 @@
+from sqlalchemy import func
+
+from app.models.diary import DiaryTag, Tag
+
+
+def _create(client, headers, title, tags):
+    response = client.post("/api/diary/", json={"title": title, "content": title, "tags": tags}, headers=headers)
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def _counts(client, headers):
+    response = client.get("/api/diary/tags", headers=headers)
+    assert response.status_code == 200
+    return {item["name"]: item["count"] for item in response.json()}
+
+
+def _titles(client, headers, *tags):
+    response = client.get("/api/diary/", params={"tag": list(tags)}, headers=headers)
+    return sorted(item["title"] for item in response.json())
+
+
+def test_tag_counts_follow_updates_and_deletes(client, db, user, auth_headers):
+    first = _create(client, auth_headers, "a", ["work", "  work ", "travel"])
+    second = _create(client, auth_headers, "b", ["work", "food"])
+    _create(client, auth_headers, "c", ["food"])
+    assert _counts(client, auth_headers) == {"work": 2, "travel": 1, "food": 2}
+    assert _titles(client, auth_headers, "work", "food") == ["b"]
+
+    response = client.put(f"/api/diary/item/{first}", json={"tags": ["travel", "music"]}, headers=auth_headers)
+    assert response.status_code == 200
+    assert _counts(client, auth_headers) == {"work": 1, "travel": 1, "food": 2, "music": 1}
+    assert _titles(client, auth_headers, "work") == ["b"]
+
+    # 只改正文不影响标签
+    client.put(f"/api/diary/item/{second}", json={"content": "changed"}, headers=auth_headers)
+    assert client.delete(f"/api/diary/item/{second}", headers=auth_headers).status_code == 204
+    assert _counts(client, auth_headers) == {"travel": 1, "food": 1, "music": 1}
+    assert _titles(client, auth_headers, "food") == ["c"]
+
+    # 预先维护的计数与关联表一致
+    db.expire_all()
+    actual = dict(
+        db.query(Tag.name, func.count(DiaryTag.diary_id))
+        .outerjoin(DiaryTag, DiaryTag.tag_id == Tag.id)
+        .filter(Tag.user_id == user.id)
+        .group_by(Tag.name)
+        .all()
+    )
+    assert actual == dict(db.query(Tag.name, Tag.diary_count).filter(Tag.user_id == user.id).all())
+
+
+def test_tags_are_scoped_per_user(client, other_user, auth_headers):
+    from app.core.security import create_access_token
+
+    other_headers = {"Authorization": f"Bearer {create_access_token({'sub': other_user.username})}"}
+    _create(client, auth_headers, "a", ["shared"])
+    _create(client, other_headers, "b", ["shared"])
+    assert _counts(client, auth_headers) == {"shared": 1}
+    assert _titles(client, other_headers, "shared") == ["b"]
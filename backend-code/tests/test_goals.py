@@ -0,0 +1,72 @@
+import importlib
+from datetime import date, datetime, timezone
+
+import pytest
+
+from app.db.goal import goal_log
+from app.models.goal import Goal, GoalLogRollup
+from app.schemas.goal import GoalLogCreate
+from tests.conftest import _create_user
+
+# app.db 中的 goal 是CRUD实例，与模块同名
+goal_module = importlib.import_module("app.db.goal")
+
+# 洛杉矶（UTC-8）：03:00Z 是前一天晚上，20:00Z 是当天中午
+_LOGGED_AT = [
+    datetime(2026, 3, 2, 3, 0, tzinfo=timezone.utc),
+    datetime(2026, 3, 2, 20, 0, tzinfo=timezone.utc),
+    datetime(2026, 3, 4, 7, 30, tzinfo=timezone.utc),
+]
+
+
+@pytest.fixture
+def goal_obj(db):
+    user = _create_user(db, "carol", timezone="America/Los_Angeles")
+    obj = Goal(user_id=user.id, title="run", target_value=100)
+    db.add(obj)
+    db.commit()
+    return obj
+
+
+def _log_at(db, monkeypatch, goal_id: int, logged_at: datetime, value: float) -> None:
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return logged_at
+
+    monkeypatch.setattr(goal_module, "datetime", FrozenDatetime)
+    goal_log.create_with_goal(db, obj_in=GoalLogCreate(value=value), goal_id=goal_id)
+
+
+def _aggregates(db, goal_id: int):
+    goal_obj = db.get(Goal, goal_id)
+    rollups = db.query(GoalLogRollup).filter(GoalLogRollup.goal_id == goal_id).all()
+    return (
+        goal_obj.log_count, goal_obj.log_sum, goal_obj.last_value, goal_obj.last_log_date,
+        goal_obj.current_streak, goal_obj.longest_streak, goal_obj.current_value,
+        sorted((r.period, r.period_start, r.count, r.sum, r.min_value, r.max_value, r.last_value) for r in rollups),
+    )
+
+
+def test_streaks_and_rollups_use_the_users_local_date(db, goal_obj, monkeypatch):
+    for logged_at, value in zip(_LOGGED_AT[:2], (1, 2)):
+        _log_at(db, monkeypatch, goal_obj.id, logged_at, value)
+    db.commit()
+
+    days = goal_log.get_rollups(db, goal_id=goal_obj.id, period="day")
+    assert [(r.period_start, r.sum) for r in days] == [(date(2026, 3, 1), 1), (date(2026, 3, 2), 2)]
+    assert (goal_obj.current_streak, goal_obj.last_log_date) == (2, date(2026, 3, 2))
+
+
+def test_rebuild_matches_incremental_aggregates(db, goal_obj, monkeypatch):
+    for logged_at, value in zip(_LOGGED_AT, (1, 2, 5)):
+        _log_at(db, monkeypatch, goal_obj.id, logged_at, value)
+    db.commit()
+    incremental = _aggregates(db, goal_obj.id)
+
+    goal_log.rebuild_aggregates(db, goal_id=goal_obj.id)
+    db.commit()
+    db.expire_all()
+    assert _aggregates(db, goal_obj.id) == incremental
+    # 三次打卡在洛杉矶是连续三天（按UTC为3月2日两次、3月4日一次）
+    assert incremental[4:6] == (3, 3)
@@ -0,0 +1,24 @@
+from unittest import mock
+
+from app.core.leader import AdvisoryLock
+
+
+def _lock(execute):
+    engine = mock.Mock()
+    engine.dialect.name = "postgresql"
+    conn = engine.connect.return_value.execution_options.return_value
+    conn.execute.side_effect = execute
+    return AdvisoryLock(engine, 1), conn
+
+
+def test_failed_unlock_discards_the_connection_instead_of_pooling_it():
+    def execute(statement, params=None):
+        if "unlock" in str(statement):
+            raise RuntimeError("connection reset")
+        return mock.Mock(scalar=mock.Mock(return_value=True))
+
+    lock, conn = _lock(execute)
+    assert lock.acquire()
+    lock.release()
+    conn.invalidate.assert_called_once()
+    assert lock._conn is None
@@ -0,0 +1,54 @@
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, metrics_authorized
+
+
+def _count(name: str, route: str) -> float:
+    return REGISTRY.get_sample_value(f"{name}_count", {"method": "GET", "route": route, "status": "200"}) or 0.0
+
+
+def test_streaming_responses_are_kept_out_of_the_latency_histogram():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics-test/plain")
+    async def plain():
+        return {"ok": True}
+
+    @app.get("/metrics-test/stream")
+    async def stream():
+        async def events():
+            yield "data: 1\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    client = TestClient(app)
+    before = {
+        (name, route): _count(name, route)
+        for name in ("http_request_duration_seconds", "http_stream_duration_seconds")
+        for route in ("/metrics-test/plain", "/metrics-test/stream")
+    }
+    assert client.get("/metrics-test/plain").status_code == 200
+    assert client.get("/metrics-test/stream").status_code == 200
+
+    delta = {key: _count(*key) - value for key, value in before.items()}
+    assert delta == {
+        ("http_request_duration_seconds", "/metrics-test/plain"): 1,
+        ("http_request_duration_seconds", "/metrics-test/stream"): 0,
+        ("http_stream_duration_seconds", "/metrics-test/plain"): 0,
+        ("http_stream_duration_seconds", "/metrics-test/stream"): 1,
+    }
+
+
+def test_metrics_require_token_or_loopback(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", None)
+    assert metrics_authorized(None, "127.0.0.1")
+    assert not metrics_authorized(None, "10.0.0.5")
+
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "s3cret")
+    assert metrics_authorized("Bearer s3cret", "10.0.0.5")
+    assert not metrics_authorized("Bearer wrong", "127.0.0.1")
+    assert not metrics_authorized(None, "127.0.0.1")
@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+from app.core.config import settings
+from app.models.entertainment import EntertainmentNeighbor, Entertainment, Favorite
+from app.models.user import User
+from app.services.recommender import recompute_similarities
+
+_STATUSES = ("want", "watching", "finished")
+
+
+@pytest.fixture
+def catalogue(db, monkeypatch):
+    monkeypatch.setattr(settings, "ENTERTAINMENT_SEARCH_CACHE_TTL", 0)
+    items = [Entertainment(title=f"item {i}", type="movie") for i in range(15)]
+    db.add_all(items)
+    # 不需要登录，跳过密码哈希
+    users = [User(username=f"user{i}", email=f"user{i}@example.com", hashed_password="-") for i in range(8)]
+    db.add_all(users)
+    db.commit()
+    return [user.id for user in users], [item.id for item in items]
+
+
+def _neighbors(db):
+    db.expire_all()
+    return {
+        (row.entertainment_id, row.neighbor_id): round(row.score, 9)
+        for row in db.query(EntertainmentNeighbor)
+    }
+
+
+def _mutate(db, rng, user_ids, item_ids):
+    favorites = db.query(Favorite).all()
+    for favorite in rng.sample(favorites, min(3, len(favorites))):
+        action = rng.choice(("delete", "status", "rating"))
+        if action == "delete":
+            db.delete(favorite)
+        elif action == "status":
+            favorite.status = rng.choice(_STATUSES)
+        else:
+            favorite.rating = rng.choice((None, 1.0, 3.5, 5.0))
+    for _ in range(3):
+        db.add(Favorite(
+            user_id=rng.choice(user_ids), entertainment_id=rng.choice(item_ids), status=rng.choice(_STATUSES)
+        ))
+
+
+def test_incremental_recompute_matches_full_recompute(db, catalogue):
+    user_ids, item_ids = catalogue
+    rng = random.Random(7)
+    for user_id in user_ids:
+        for item_id in rng.sample(item_ids, 4):
+            db.add(Favorite(user_id=user_id, entertainment_id=item_id, status=rng.choice(_STATUSES)))
+    db.commit()
+    recompute_similarities(db, full=True, top_k=50)
+    db.commit()
+
+    for round_ in range(6):
+        _mutate(db, rng, user_ids, item_ids)
+        db.commit()
+        if round_ == 3:
+            # 某个条目的收藏全部被删除，它的邻居列表和它在其他列表中的位置都应清除
+            db.query(Favorite).filter(Favorite.entertainment_id == item_ids[0]).delete()
+        db.commit()
+
+        recompute_similarities(db, top_k=50)
+        db.commit()
+        incremental = _neighbors(db)
+        if round_ == 3:
+            assert not any(item_ids[0] in key for key in incremental)
+
+        recompute_similarities(db, full=True, top_k=50)
+        db.commit()
+        assert incremental == _neighbors(db)
+
+
+def test_recompute_without_changes_is_a_no_op(db, catalogue):
+    user_ids, item_ids = catalogue
+    db.add_all(Favorite(user_id=user_id, entertainment_id=item_ids[0]) for user_id in user_ids[:2])
+    db.add(Favorite(user_id=user_ids[0], entertainment_id=item_ids[1]))
+    db.commit()
+    recompute_similarities(db)
+    db.commit()
+
+    result = recompute_similarities(db)
+    assert (result.changed, result.recomputed) == (0, 0)
+    assert set(_neighbors(db)) == {(item_ids[0], item_ids[1]), (item_ids[1], item_ids[0])}
+
+
+def test_lists_that_mention_a_changed_item_are_refreshed(db, catalogue):
+    (alice, bob, *_), (first, second, third, *_) = catalogue
+    db.add_all([
+        Favorite(user_id=alice, entertainment_id=first),
+        Favorite(user_id=alice, entertainment_id=second),
+        Favorite(user_id=bob, entertainment_id=second),
+        Favorite(user_id=bob, entertainment_id=third),
+    ])
+    db.commit()
+    recompute_similarities(db)
+    db.commit()
+    assert (first, second) in _neighbors(db)
+
+    # first与second不再被共同收藏：first的收藏摘要没有变化，但它的邻居列表包含second
+    db.query(Favorite).filter(Favorite.user_id == alice, Favorite.entertainment_id == second).delete()
+    db.commit()
+    recompute_similarities(db)
+    db.commit()
+    assert set(_neighbors(db)) == {(second, third), (third, second)}
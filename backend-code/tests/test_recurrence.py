@@ -0,0 +1,92 @@
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+from app.services.recurrence import expand_schedule, recurrence_until
+from tests.conftest import _create_user
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def _schedule(start_time: datetime, rrule: str, exceptions=(), **fields) -> SimpleNamespace:
+    values = dict(
+        id=1, user_id=1, title="t", description=None, location=None, category=None, priority="medium",
+        is_all_day=False, is_completed=False, rrule=rrule, created_at=None, updated_at=None,
+        start_time=start_time, end_time=None, reminder_time=None, exceptions=list(exceptions),
+    )
+    values.update(fields)
+    return SimpleNamespace(**values)
+
+
+def _utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_weekly_rule_keeps_local_time_across_spring_forward():
+    # 2026-03-08 纽约进入夏令时：本地9点从14:00Z变为13:00Z
+    schedule = _schedule(
+        _utc(2026, 3, 2, 14), "FREQ=WEEKLY;BYDAY=MO",
+        end_time=_utc(2026, 3, 2, 15), reminder_time=_utc(2026, 3, 2, 13, 50),
+    )
+    items = expand_schedule(schedule, _utc(2026, 3, 1), _utc(2026, 3, 20), NEW_YORK)
+
+    assert [item["start_time"] for item in items] == [_utc(2026, 3, 2, 14), _utc(2026, 3, 9, 13), _utc(2026, 3, 16, 13)]
+    assert {item["start_time"].astimezone(NEW_YORK).hour for item in items} == {9}
+    assert all(item["end_time"] - item["start_time"] == timedelta(hours=1) for item in items)
+    assert all(item["start_time"] - item["reminder_time"] == timedelta(minutes=10) for item in items)
+    assert [item["local_date"] for item in items] == [date(2026, 3, 2), date(2026, 3, 9), date(2026, 3, 16)]
+
+
+def test_daily_rule_across_fall_back_and_window_edges():
+    # 2026-11-01 纽约结束夏令时：本地9点从13:00Z变为14:00Z
+    schedule = _schedule(_utc(2026, 10, 30, 13), "FREQ=DAILY;COUNT=4")
+    # 窗口按UTC左闭右开：10-30 13:00Z 在窗口外，11-02 14:00Z 恰好是右端点，也不包含
+    items = expand_schedule(schedule, _utc(2026, 10, 30, 13, 1), _utc(2026, 11, 2, 14), NEW_YORK)
+
+    assert [item["start_time"] for item in items] == [_utc(2026, 10, 31, 13), _utc(2026, 11, 1, 14)]
+    assert recurrence_until(schedule.rrule, schedule.start_time, NEW_YORK) == _utc(2026, 11, 2, 14)
+
+
+def test_moved_exception_is_filtered_by_its_new_start():
+    schedule = _schedule(
+        _utc(2026, 3, 2, 14), "FREQ=WEEKLY;BYDAY=MO",
+        exceptions=[
+            SimpleNamespace(original_start=_utc(2026, 3, 9, 13), is_cancelled=False, title="moved",
+                            description=None, start_time=_utc(2026, 3, 20, 13), end_time=None,
+                            location=None, is_completed=None),
+            SimpleNamespace(original_start=_utc(2026, 3, 16, 13), is_cancelled=True, title=None,
+                            description=None, start_time=None, end_time=None, location=None, is_completed=None),
+        ],
+    )
+    items = expand_schedule(schedule, _utc(2026, 3, 1), _utc(2026, 3, 19), NEW_YORK)
+    assert [item["start_time"] for item in items] == [_utc(2026, 3, 2, 14)]
+
+    items = expand_schedule(schedule, _utc(2026, 3, 19), _utc(2026, 3, 24), NEW_YORK)
+    assert [(item["title"], item["start_time"], item["is_exception"]) for item in items] == [
+        ("t", _utc(2026, 3, 23, 13), False),
+        ("moved", _utc(2026, 3, 20, 13), True),
+    ]
+
+
+def test_occurrences_endpoint_expands_in_the_users_timezone(client, db):
+    from app.core.security import create_access_token
+
+    user = _create_user(db, "dave", timezone="America/New_York")
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': user.username})}"}
+    response = client.post(
+        "/api/schedule/",
+        json={"title": "standup", "start_time": "2026-03-06T14:00:00Z", "rrule": "FREQ=DAILY;COUNT=4"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+
+    response = client.get(
+        "/api/schedule/occurrences",
+        params={"start": "2026-03-01T00:00:00Z", "end": "2026-03-31T00:00:00Z"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    starts = [datetime.fromisoformat(item["start_time"].replace("Z", "+00:00")) for item in response.json()]
+    assert [start.astimezone(NEW_YORK).strftime("%m-%d %H:%M") for start in starts] == [
+        "03-06 09:00", "03-07 09:00", "03-08 09:00", "03-09 09:00",
+    ]
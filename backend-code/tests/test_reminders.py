@@ -0,0 +1,132 @@
+import asyncio
+import heapq
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import settings
+from app.services import change_feed
+from app.services.reminder_channels import Reminder, ReminderChannel, SSEChannel
+from app.services.reminders import REFILL_SIGNAL, ReminderDispatcher, _Delivery
+
+_NOW = datetime(2026, 3, 1, 9, 0, tzinfo=timezone.utc)
+
+
+def _reminder(schedule_id: int = 1, occurrence_start: datetime = _NOW) -> Reminder:
+    return Reminder(
+        schedule_id=schedule_id, user_id=1, title="t", location=None, start_time=occurrence_start,
+        remind_at=occurrence_start - timedelta(minutes=10), occurrence_start=occurrence_start,
+    )
+
+
+class SlowRedis:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel, data):
+        time.sleep(0.3)
+        self.published.append(channel)
+        return 1
+
+
+def test_sse_channel_publishes_off_the_event_loop(monkeypatch):
+    redis = SlowRedis()
+    monkeypatch.setattr(change_feed, "redis_client", redis)
+    monkeypatch.setattr(change_feed.change_feed, "backend", "redis")
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await SSEChannel().send(_reminder())
+        task.cancel()
+        return ticks
+
+    # 发布阻塞0.3秒期间事件循环仍在运行
+    assert asyncio.run(run()) >= 10
+    assert redis.published == ["changes:1"]
+
+
+class RecordingRedis:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel, data):
+        self.published.append(channel)
+        return 0
+
+
+def test_notify_broadcasts_refill_signal_to_other_replicas(monkeypatch):
+    redis = RecordingRedis()
+    monkeypatch.setattr(change_feed, "redis_client", redis)
+    monkeypatch.setattr(change_feed.change_feed, "backend", "redis")
+    monkeypatch.setattr(settings, "REMINDER_ENABLED", True)
+
+    ReminderDispatcher().notify()
+    assert change_feed.change_feed.outbox.drain(2)
+    assert redis.published == [f"{change_feed.SIGNAL_PREFIX}{REFILL_SIGNAL}"]
+
+
+def test_refill_signal_wakes_the_local_dispatcher(monkeypatch):
+    monkeypatch.setattr(change_feed.change_feed, "_signal_handlers", {})
+    dispatcher = ReminderDispatcher()
+    monkeypatch.setattr(dispatcher, "_run", lambda: asyncio.sleep(3600))
+
+    async def run():
+        dispatcher.start()
+        dispatcher._dirty = False
+        # 订阅任务收到其他副本广播的信号时调用登记的处理函数
+        for handler in change_feed.change_feed._signal_handlers[REFILL_SIGNAL]:
+            handler()
+        await asyncio.sleep(0)
+        dispatcher._task.cancel()
+        return dispatcher._dirty
+
+    assert asyncio.run(run())
+
+
+class FlakyChannel(ReminderChannel):
+    name = "flaky"
+
+    def __init__(self, failing):
+        self.failing = set(failing)
+
+    async def send(self, reminder):
+        if reminder.delivery_id in self.failing:
+            raise RuntimeError("unavailable")
+
+
+def test_watermark_waits_for_earlier_occurrence_still_retrying(monkeypatch):
+    earlier, later = _reminder(1, _NOW), _reminder(1, _NOW + timedelta(days=1))
+    channel = FlakyChannel([earlier.delivery_id])
+    dispatcher = ReminderDispatcher()
+    dispatcher._channels = [channel]
+    marks = []
+    monkeypatch.setattr(dispatcher, "_mark", lambda reminder: marks.append(reminder.remind_at))
+    monkeypatch.setattr(dispatcher, "_load", lambda start, end: [earlier, later])
+
+    async def run():
+        for reminder in (earlier, later):
+            delivery = _Delivery(reminder, [channel])
+            heapq.heappush(dispatcher._heap, (delivery.due_at, next(dispatcher._seq), delivery))
+        await dispatcher._dispatch_due()
+        # 较晚的实例已投递，但更早的实例仍在重试，水位不能越过它
+        assert marks == []
+        assert list(dispatcher._retrying) == [earlier.delivery_id]
+
+        # 重新加载窗口时不重复投递已完成的实例
+        await dispatcher._refill()
+        assert [delivery.reminder for _, _, delivery in dispatcher._heap] == [earlier]
+
+        channel.failing.clear()
+        _, _, retry = heapq.heappop(dispatcher._heap)
+        await dispatcher._deliver(retry)
+
+    asyncio.run(run())
+    assert marks == [later.remind_at]
+    assert dispatcher._held == {}
@@ -0,0 +1,31 @@
+import json
+
+from app.api.routes import ai
+from app.models.assistant import AssistantConfig
+
+
+def test_batch_closes_the_request_session_before_streaming(client, db, user, auth_headers, monkeypatch):
+    db.add(AssistantConfig(user_id=user.id, name="default", prompt="p", is_default=True))
+    db.commit()
+    sessions = []
+    identity_sizes = []
+    get_knowledge_context = ai.get_knowledge_context
+
+    async def capture_session(session, user_id, query):
+        sessions.append(session)
+        return await get_knowledge_context(session, user_id, query)
+
+    async def fake_request(ai_service, model, messages):
+        identity_sizes.append(len(sessions[0].identity_map))
+        return {"status": "success", "plan": {}}
+
+    monkeypatch.setattr(ai, "get_knowledge_context", capture_session)
+    monkeypatch.setattr(ai, "request_study_plan", fake_request)
+    response = client.post(
+        "/api/ai/generate-study-plan/batch", json={"prompts": ["a", "b"]}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[-1] == {"done": True, "total": 2, "succeeded": 2}
+    # 推送期间请求的会话已关闭，不再持有用户和助手配置等对象
+    assert identity_sizes == [0, 0]
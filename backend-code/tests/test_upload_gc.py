@@ -0,0 +1,30 @@
+import asyncio
+import os
+import time
+
+from app.services.storage import LocalStorage
+from app.services.upload_gc import collect_expired_exports
+
+
+def _write(root, key: str, age_seconds: float) -> None:
+    path = os.path.join(root, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("{}")
+    mtime = time.time() - age_seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_expired_exports_are_removed(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    _write(tmp_path, "1/old.json", 2 * 3600)
+    _write(tmp_path, "1/old.json.part", 2 * 3600)
+    _write(tmp_path, "2/fresh.json", 60)
+
+    dry = asyncio.run(collect_expired_exports(storage, ttl_seconds=3600, dry_run=True))
+    assert sorted(dry) == ["1/old.json", "1/old.json.part"]
+    assert os.path.exists(tmp_path / "1" / "old.json")
+
+    removed = asyncio.run(collect_expired_exports(storage, ttl_seconds=3600))
+    assert sorted(removed) == sorted(dry)
+    assert [blob.key for blob in storage.list()] == ["2/fresh.json"]
@@ -0,0 +1,67 @@
+import io
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.api.routes.upload import MULTIPART_OVERHEAD
+from app.core.config import settings
+from app.core.limits import RequestSizeLimitMiddleware
+
+LIMIT = 1024
+
+
+@pytest.fixture
+def limited_client():
+    received = []
+    app = FastAPI()
+    app.add_middleware(RequestSizeLimitMiddleware, limits={"/upload": LIMIT})
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        received.append(len(await file.read()))
+        return {"ok": True}
+
+    @app.post("/other")
+    async def other(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    return TestClient(app), received
+
+
+def test_declared_length_over_limit_is_rejected_before_parsing(limited_client):
+    client, received = limited_client
+    response = client.post("/upload", files={"file": ("a.png", b"x" * (LIMIT * 2), "image/png")})
+    assert response.status_code == 413
+    assert received == []
+
+
+def test_streamed_body_over_limit_is_rejected(limited_client):
+    client, received = limited_client
+
+    def chunks():
+        # 分块传输不带Content-Length，只能在接收过程中计数
+        yield b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.png\"\r\n\r\n"
+        for _ in range(10):
+            yield b"x" * 512
+
+    response = client.post(
+        "/upload", content=chunks(), headers={"content-type": "multipart/form-data; boundary=b"}
+    )
+    assert response.status_code == 413
+    assert received == []
+
+
+def test_small_upload_and_other_paths_pass(limited_client):
+    client, received = limited_client
+    assert client.post("/upload", files={"file": ("a.png", b"x" * 100, "image/png")}).status_code == 200
+    assert received == [100]
+    response = client.post("/other", files={"file": ("a.png", b"x" * (LIMIT * 2), "image/png")})
+    assert response.json() == {"size": LIMIT * 2}
+
+
+@pytest.mark.parametrize("size", [settings.MAX_FILE_SIZE + 1, settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD + 1])
+def test_avatar_upload_uses_configured_limit(client, auth_headers, size):
+    body = io.BytesIO(b"x" * size)
+    response = client.post("/api/upload/avatar", headers=auth_headers, files={"file": ("a.png", body, "image/png")})
+    assert response.status_code == 413